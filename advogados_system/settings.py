@@ -94,6 +94,21 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Compartilhado entre os processos (workers, comandos agendados): a agenda
+# compartilhada e as facetas da busca são invalidadas por chaves de versão
+# que precisam ser vistas por todos. A tabela é criada uma vez com
+# `python manage.py createcachetable`.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'cache_sistema',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -140,6 +155,11 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Entrega de anexos protegidos (core/downloads.py): None envia pelo Django em
+# blocos; 'nginx' usa X-Accel-Redirect e 'sendfile' usa X-Sendfile
+ARQUIVOS_PROTEGIDOS_SERVIDOR = None
+ARQUIVOS_PROTEGIDOS_PREFIXO_INTERNO = '/protegido/'
+
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
@@ -147,3 +167,7 @@ EMAIL_HOST_USER = 'josecelsoleite@gmail.com'
 EMAIL_HOST_PASSWORD = 'cepi hkgp syob vaek'
 EMAIL_USE_TLS = True
 DEFAULT_FROM_EMAIL = 'josecelsoleite@gmail.com'
+
+# Lembretes de compromissos (minutos de antecedência) gerados pelo
+# comando `python manage.py lembretes_audiencias`
+AGENDA_LEMBRETES_ANTECEDENCIAS = [24 * 60, 60]
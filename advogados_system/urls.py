@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from processos.views import arquivo_andamento_por_caminho
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -15,4 +16,12 @@ urlpatterns = [
      # API Rest (opcional)
     #path('api/', include('api.urls')),
 ] 
+# Anexos de andamentos nunca saem direto de MEDIA_URL: a rota abaixo vem antes
+# do static() e exige login e acesso ao processo. No servidor web, bloqueie o
+# acesso público a media/andamentos/, media/conteudo/ e media/previas/ (ver
+# core/downloads.py). Prévias só saem pela view própria; aqui dão 404.
+urlpatterns += [
+    path(f"{settings.MEDIA_URL.strip('/')}/{pasta}/<path:caminho>", arquivo_andamento_por_caminho, {'pasta': pasta})
+    for pasta in ('andamentos', 'conteudo', 'previas')
+]
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Audiencia, LogAudiencia
+from .models import Audiencia, LogAudiencia, Forum, CompartilhamentoAgenda
 
 @admin.register(Audiencia)
 class AudienciaAdmin(admin.ModelAdmin):
@@ -7,21 +7,24 @@ class AudienciaAdmin(admin.ModelAdmin):
     list_filter = ('tipo', 'processo', 'cliente', 'criado_por')
     search_fields = ('processo__numero', 'cliente__nome', 'local')
     date_hierarchy = 'data_hora'
-    readonly_fields = ('criado_em', 'atualizado_em')
+    readonly_fields = ('advogado_responsavel', 'forum', 'criado_em', 'atualizado_em')
     
     fieldsets = (
         ('Vinculação', {
             'fields': (('processo', 'cliente'),)
         }),
         ('Detalhes do Compromisso', {
-            'fields': ('data_hora', 'tipo', 'local', 'vara')
+            'fields': ('data_hora', 'duracao', 'tipo', 'local', 'vara', 'forum')
+        }),
+        ('Repetição', {
+            'fields': ('recorrencia', 'intervalo_recorrencia', 'recorrencia_ate')
         }),
         ('Resultado', {
             'fields': ('resultado',),
             'classes': ('collapse',)
         }),
         ('Metadados', {
-            'fields': ('criado_por', 'criado_em', 'atualizado_em'),
+            'fields': ('advogado_responsavel', 'criado_por', 'criado_em', 'atualizado_em'),
             'classes': ('collapse',)
         })
     )
@@ -52,4 +55,18 @@ class LogAudienciaAdmin(admin.ModelAdmin):
         ('Registro', {
             'fields': ('motivo', 'data_alteracao')
         })
-    )
\ No newline at end of file
+    )
+
+@admin.register(Forum)
+class ForumAdmin(admin.ModelAdmin):
+    list_display = ('nome', 'nome_normalizado', 'criado_em')
+    search_fields = ('nome', 'nome_normalizado')
+    readonly_fields = ('nome_normalizado', 'criado_em')
+
+
+@admin.register(CompartilhamentoAgenda)
+class CompartilhamentoAgendaAdmin(admin.ModelAdmin):
+    list_display = ('descricao', 'advogado', 'criado_em', 'revogado_em')
+    list_filter = ('revogado_em',)
+    search_fields = ('descricao', 'advogado__username')
+    readonly_fields = ('token', 'criado_em')
@@ -0,0 +1,93 @@
+# agenda/compartilhamento.py
+"""
+Agenda compartilhada por token (somente leitura).
+
+Correspondentes consultam o link com frequência, então o conteúdo
+renderizado fica no cache (o backend compartilhado de settings.CACHES,
+para que todos os processos vejam as invalidações). Cada escritório tem
+um número de versão no cache, trocado pelos signals sempre que um
+compromisso muda; como a versão entra na chave do conteúdo, a troca
+invalida todos os tokens do escritório de uma vez, sem varrer chaves.
+
+O token em si é conferido no banco a cada acesso (busca pelo índice
+único), de modo que um link revogado deixa de funcionar na hora.
+"""
+
+import uuid
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Audiencia, CompartilhamentoAgenda
+from .recorrencia import expandir, filtro_janela
+
+# Período exibido no link compartilhado
+COMPARTILHAMENTO_DIAS_ANTES = 7
+COMPARTILHAMENTO_DIAS_DEPOIS = 60
+
+# Conteúdo fica no cache até a próxima alteração; o prazo curto limita o
+# atraso caso alguma alteração escape dos signals (ex.: update() em lote)
+COMPARTILHAMENTO_CACHE_SEGUNDOS = 10 * 60
+
+
+def _chave_versao(dono_id):
+    return f'agenda:compartilhada:versao:{dono_id}'
+
+
+def versao_agenda(dono_id):
+    chave = _chave_versao(dono_id)
+    versao = cache.get(chave)
+    if versao is None:
+        # add() não sobrescreve uma versão criada em paralelo
+        cache.add(chave, uuid.uuid4().hex, None)
+        versao = cache.get(chave)
+    return versao
+
+
+def invalidar_agenda(dono_id):
+    if dono_id:
+        cache.set(_chave_versao(dono_id), uuid.uuid4().hex, None)
+
+
+def compartilhamento_por_token(token):
+    """Id do escritório dono do token ativo, ou None."""
+    return CompartilhamentoAgenda.objects.filter(
+        token=token, revogado_em__isnull=True
+    ).values_list('advogado_id', flat=True).first()
+
+
+def chave_conteudo(token, dono_id, formato):
+    # O dia entra na chave porque o período exibido é relativo a hoje
+    hoje = timezone.localdate().isoformat()
+    return f'agenda:compartilhada:{token}:{versao_agenda(dono_id)}:{hoje}:{formato}'
+
+
+def periodo_compartilhado():
+    hoje = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    return (
+        hoje - timedelta(days=COMPARTILHAMENTO_DIAS_ANTES),
+        hoje + timedelta(days=COMPARTILHAMENTO_DIAS_DEPOIS + 1),
+    )
+
+
+def eventos_compartilhados(dono_id, inicio, fim):
+    """
+    Compromissos do período com os dados que o parceiro precisa ver.
+    Nome do cliente e resultado ficam de fora.
+    """
+    compromissos = Audiencia.objects.filter(advogado_responsavel_id=dono_id).filter(
+        filtro_janela(inicio, fim)
+    ).select_related('processo')
+
+    return [
+        {
+            'inicio': timezone.localtime(item.data_hora),
+            'fim': timezone.localtime(item.data_hora_fim),
+            'tipo': item.get_tipo_display(),
+            'local': item.local,
+            'vara': item.vara,
+            'processo': item.processo.numero if item.processo else '',
+        }
+        for item in expandir(compromissos, inicio, fim)
+    ]
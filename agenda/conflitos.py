@@ -0,0 +1,125 @@
+# agenda/conflitos.py
+"""
+Detecção de conflitos de horário entre compromissos do mesmo escritório.
+
+Como nenhum compromisso dura mais que Audiencia.DURACAO_MAXIMA_MINUTOS, todo
+compromisso que se sobrepõe a [inicio, fim) começa dentro de
+(inicio - DURACAO_MAXIMA, fim). Isso permite uma única consulta por intervalo
+no índice (advogado_responsavel, data_hora), tanto no banco quanto na memória.
+Séries recorrentes entram pelas ocorrências calculadas na mesma janela.
+"""
+
+from bisect import bisect_left, bisect_right
+
+from .models import Audiencia
+from .recorrencia import DURACAO_MAXIMA, expandir, filtro_janela
+
+
+def buscar_conflitos(dono, inicio, fim, ignorar_pk=None):
+    """Compromissos (ou ocorrências de séries) do escritório que se sobrepõem a [inicio, fim)."""
+    candidatos = Audiencia.objects.filter(advogado_responsavel=dono).filter(
+        filtro_janela(inicio - DURACAO_MAXIMA, fim)
+    ).select_related('processo', 'cliente')
+    if ignorar_pk is not None:
+        candidatos = candidatos.exclude(pk=ignorar_pk)
+    return [item for item in expandir(candidatos, inicio, fim) if item.data_hora_fim > inicio]
+
+
+def descrever_conflitos(conflitos):
+    return [
+        {
+            'id': compromisso.pk,
+            'inicio': compromisso.data_hora.isoformat(),
+            'fim': compromisso.data_hora_fim.isoformat(),
+            'descricao': str(compromisso),
+        }
+        for compromisso in conflitos
+    ]
+
+
+class IndiceIntervalos:
+    """
+    Intervalos ordenados pelo início, para os fluxos em lote (vários
+    reagendamentos ou importações de uma vez) sem uma consulta por item.
+    """
+
+    def __init__(self, intervalos=()):
+        self._inicios = []
+        self._itens = []
+        self._por_chave = {}
+        # id do compromisso -> chaves no índice (uma, ou uma por ocorrência de série)
+        self._por_compromisso = {}
+        for inicio, fim, chave in sorted(intervalos, key=lambda item: item[0]):
+            self._inicios.append(inicio)
+            self._itens.append((inicio, fim, chave))
+            self._registrar(chave, inicio, fim)
+
+    @staticmethod
+    def _compromisso(chave):
+        return chave[0] if isinstance(chave, tuple) else chave
+
+    def _registrar(self, chave, inicio, fim):
+        self._por_chave[chave] = (inicio, fim)
+        self._por_compromisso.setdefault(self._compromisso(chave), set()).add(chave)
+
+    @classmethod
+    def carregar(cls, dono, inicio, fim):
+        """
+        Carrega com uma consulta os compromissos que podem afetar [inicio, fim).
+        Ocorrências de séries usam a chave (id da série, data da ocorrência).
+        """
+        linhas = Audiencia.objects.filter(advogado_responsavel=dono).filter(
+            filtro_janela(inicio - DURACAO_MAXIMA, fim + DURACAO_MAXIMA)
+        ).only('pk', 'data_hora', 'duracao', 'recorrencia', 'intervalo_recorrencia', 'recorrencia_ate')
+        return cls(
+            (
+                item.data_hora,
+                item.data_hora_fim,
+                (item.serie.pk, item.data_hora) if item.recorrencia else item.pk,
+            )
+            for item in expandir(linhas, inicio - DURACAO_MAXIMA, fim + DURACAO_MAXIMA)
+        )
+
+    def __len__(self):
+        return len(self._itens)
+
+    def __contains__(self, chave):
+        return chave in self._por_chave
+
+    def conflitos(self, inicio, fim, ignorar=None):
+        """Chaves dos intervalos que se sobrepõem a [inicio, fim)."""
+        esquerda = bisect_right(self._inicios, inicio - DURACAO_MAXIMA)
+        direita = bisect_left(self._inicios, fim)
+        return [
+            chave
+            for inicio_item, fim_item, chave in self._itens[esquerda:direita]
+            if fim_item > inicio and chave != ignorar
+        ]
+
+    def inserir(self, inicio, fim, chave):
+        posicao = bisect_right(self._inicios, inicio)
+        self._inicios.insert(posicao, inicio)
+        self._itens.insert(posicao, (inicio, fim, chave))
+        self._registrar(chave, inicio, fim)
+
+    def remover(self, chave):
+        inicio, fim = self._por_chave.pop(chave)
+        chaves = self._por_compromisso[self._compromisso(chave)]
+        chaves.discard(chave)
+        if not chaves:
+            del self._por_compromisso[self._compromisso(chave)]
+        posicao = bisect_left(self._inicios, inicio)
+        while self._itens[posicao][2] != chave:
+            posicao += 1
+        del self._inicios[posicao]
+        del self._itens[posicao]
+
+    def remover_compromisso(self, pk):
+        """Retira o compromisso `pk`; numa série, todas as ocorrências carregadas."""
+        for chave in list(self._por_compromisso.get(pk, ())):
+            self.remover(chave)
+
+    def mover(self, chave, inicio, fim):
+        if chave in self._por_chave:
+            self.remover(chave)
+        self.inserir(inicio, fim, chave)
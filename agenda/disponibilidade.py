@@ -0,0 +1,70 @@
+# agenda/disponibilidade.py
+"""
+Busca de horários livres na agenda do escritório.
+
+Os compromissos do período são lidos com uma única consulta por intervalo e
+percorridos uma vez, em ordem de início, junto com os dias do período.
+"""
+
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from .models import Audiencia
+from .recorrencia import DURACAO_MAXIMA, expandir, filtro_janela
+
+
+def intervalos_ocupados(dono, inicio, fim):
+    """Lista ordenada de (inicio, fim) dos compromissos e ocorrências que tocam [inicio, fim)."""
+    compromissos = Audiencia.objects.filter(advogado_responsavel=dono).filter(
+        filtro_janela(inicio - DURACAO_MAXIMA, fim)
+    ).only('pk', 'data_hora', 'duracao', 'recorrencia', 'intervalo_recorrencia', 'recorrencia_ate')
+    return [
+        (item.data_hora, item.data_hora_fim)
+        for item in expandir(compromissos, inicio - DURACAO_MAXIMA, fim)
+        if item.data_hora_fim > inicio
+    ]
+
+
+def horarios_livres(ocupados, dias, abertura, fechamento, duracao_minima, a_partir_de=None):
+    """
+    Lacunas de pelo menos `duracao_minima` dentro do expediente de cada dia.
+
+    `ocupados` deve estar ordenado pelo início. Os dois ponteiros (dias e
+    intervalos) só avançam, então o custo é linear no total de itens.
+    """
+    fuso = timezone.get_current_timezone()
+    livres = []
+    primeiro = 0
+    total = len(ocupados)
+
+    for dia in dias:
+        abre = timezone.make_aware(datetime.combine(dia, abertura), fuso)
+        fecha = timezone.make_aware(datetime.combine(dia, fechamento), fuso)
+        cursor = max(abre, a_partir_de) if a_partir_de else abre
+        if cursor >= fecha:
+            continue
+
+        while primeiro < total and ocupados[primeiro][1] <= abre:
+            primeiro += 1
+
+        atual = primeiro
+        while atual < total and ocupados[atual][0] < fecha:
+            inicio_ocupado, fim_ocupado = ocupados[atual]
+            if inicio_ocupado - cursor >= duracao_minima:
+                livres.append((cursor, inicio_ocupado))
+            cursor = max(cursor, fim_ocupado)
+            atual += 1
+
+        if fecha - cursor >= duracao_minima:
+            livres.append((cursor, fecha))
+
+    return livres
+
+
+def dias_do_periodo(inicio, fim, incluir_fins_de_semana=False):
+    dia = inicio
+    while dia <= fim:
+        if incluir_fins_de_semana or dia.weekday() < 5:
+            yield dia
+        dia += timedelta(days=1)
@@ -1,14 +1,27 @@
+from datetime import timedelta
+
 from django import forms
+from django.urls import reverse_lazy
+from django.utils import timezone
 from .models import Audiencia
 from clientes.models import Cliente
 from processos.models import Processo
+from core.forms import VersaoFormMixin
 
-class AudienciaForm(forms.ModelForm):
+class AudienciaForm(VersaoFormMixin, forms.ModelForm):
+    ignorar_conflitos = forms.BooleanField(
+        required=False,
+        label="Agendar mesmo com conflito de horário",
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
 
     class Meta:
         model = Audiencia
         # 1. Lista de campos correta, usando apenas strings.
-        fields = ['processo', 'cliente', 'data_hora', 'tipo', 'local', 'vara', 'resultado']
+        fields = [
+            'processo', 'cliente', 'data_hora', 'duracao', 'tipo', 'local', 'vara', 'resultado',
+            'recorrencia', 'intervalo_recorrencia', 'recorrencia_ate',
+        ]
         
         widgets = {
             'processo': forms.Select(attrs={'class': 'form-select'}),
@@ -17,10 +30,19 @@ class AudienciaForm(forms.ModelForm):
                 attrs={'type': 'datetime-local', 'class': 'form-control'},
                 format='%Y-%m-%dT%H:%M'
             ),
+            'duracao': forms.NumberInput(attrs={'class': 'form-control', 'min': 5, 'step': 5}),
             'tipo': forms.Select(attrs={'class': 'form-select tipo-select'}),
             'local': forms.TextInput(attrs={'class': 'form-control'}),
-            'vara': forms.TextInput(attrs={'class': 'form-control'}),
+            'vara': forms.TextInput(attrs={
+                'class': 'form-control',
+                'list': 'foruns-sugestoes',
+                'autocomplete': 'off',
+                'data-autocomplete-url': reverse_lazy('agenda:api_foruns'),
+            }),
             'resultado': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
+            'recorrencia': forms.Select(attrs={'class': 'form-select'}),
+            'intervalo_recorrencia': forms.NumberInput(attrs={'class': 'form-control', 'min': 1}),
+            'recorrencia_ate': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}, format='%Y-%m-%d'),
         }
 
     def __init__(self, *args, **kwargs):
@@ -32,9 +54,10 @@ class AudienciaForm(forms.ModelForm):
         self.fields['cliente'].required = False
 
         # Lógica de filtragem dos dropdowns
+        self.dono = None
         if request:
             from usuarios.utils import advogado_dono
-            dono = advogado_dono(request)
+            dono = self.dono = advogado_dono(request)
             self.fields['processo'].queryset = Processo.objects.filter(advogado_responsavel=dono).order_by('-data_cadastro')
             self.fields['cliente'].queryset = Cliente.objects.filter(advogado_responsavel=dono).order_by('nome')
 
@@ -71,5 +94,25 @@ class AudienciaForm(forms.ModelForm):
                 "Um compromisso precisa estar ligado a um Processo ou a um Cliente.",
                 code='required'
             )
-        
+
+        self._verificar_conflitos(cleaned_data)
         return cleaned_data
+
+    def _verificar_conflitos(self, cleaned_data):
+        data_hora = cleaned_data.get('data_hora')
+        duracao = cleaned_data.get('duracao')
+        if self.dono is None or not data_hora or not duracao or cleaned_data.get('ignorar_conflitos'):
+            return
+
+        from .conflitos import buscar_conflitos
+        fim = data_hora + timedelta(minutes=duracao)
+        conflitos = buscar_conflitos(self.dono, data_hora, fim, ignorar_pk=self.instance.pk)
+        if conflitos:
+            lista = "; ".join(
+                f"{c.data_hora.astimezone(timezone.get_current_timezone()):%d/%m/%Y %H:%M} - {c.get_tipo_display()}"
+                for c in conflitos
+            )
+            raise forms.ValidationError(
+                f"Conflito de horário com: {lista}. Marque a opção para agendar mesmo assim.",
+                code='conflito'
+            )
@@ -0,0 +1,128 @@
+# agenda/ical.py
+"""
+Geração de arquivos iCalendar (RFC 5545) para a assinatura da agenda.
+"""
+
+from datetime import datetime, time, timezone as dt_timezone
+
+from django.utils import timezone
+
+PRODID = '-//Law Innosoft//Agenda//PT-BR'
+UID_DOMINIO = 'law.innosoft.com.br'
+
+
+def escapar(texto):
+    """Escapa texto conforme a seção 3.3.11 da RFC 5545."""
+    texto = str(texto or '')
+    return (
+        texto.replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def dobrar_linha(linha):
+    """Quebra linhas maiores que 75 octetos (continuação começa com espaço)."""
+    dados = linha.encode('utf-8')
+    if len(dados) <= 75:
+        return linha
+
+    partes = []
+    atual = ''
+    limite = 75
+    for caractere in linha:
+        if len((atual + caractere).encode('utf-8')) > limite:
+            partes.append(atual)
+            atual = ' '
+            limite = 75
+        atual += caractere
+    partes.append(atual)
+    return '\r\n'.join(partes)
+
+
+def formatar_utc(data_hora):
+    return data_hora.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def uid_audiencia(audiencia_id):
+    """UID estável: não muda quando o compromisso é editado ou reagendado."""
+    return f'audiencia-{audiencia_id}@{UID_DOMINIO}'
+
+
+FREQUENCIAS = {'DIARIA': 'DAILY', 'SEMANAL': 'WEEKLY', 'MENSAL': 'MONTHLY'}
+
+
+def regra_recorrencia(audiencia):
+    """Linhas RRULE/EXDATE de uma série (o app de calendário expande as ocorrências)."""
+    regra = f"RRULE:FREQ={FREQUENCIAS[audiencia.recorrencia]};INTERVAL={audiencia.intervalo_recorrencia}"
+    if audiencia.recorrencia_ate:
+        ate = timezone.make_aware(datetime.combine(audiencia.recorrencia_ate, time.max))
+        regra += f";UNTIL={formatar_utc(ate)}"
+    linhas = [regra]
+    for excecao in audiencia.excecoes.all():
+        linhas.append(f'EXDATE:{formatar_utc(excecao.data_original)}')
+    return linhas
+
+
+def vevent_audiencia(audiencia, carimbo):
+    if audiencia.processo:
+        resumo = f"{audiencia.get_tipo_display()} - Proc. {audiencia.processo.numero}"
+        cliente_nome = audiencia.processo.cliente.nome
+    else:
+        resumo = f"{audiencia.get_tipo_display()} - {audiencia.cliente.nome}"
+        cliente_nome = audiencia.cliente.nome
+
+    descricao = f"Cliente: {cliente_nome}"
+    if audiencia.vara:
+        descricao += f"\nVara/Fórum: {audiencia.vara}"
+
+    linhas = [
+        'BEGIN:VEVENT',
+        f'UID:{uid_audiencia(audiencia.pk)}',
+        f'DTSTAMP:{formatar_utc(carimbo)}',
+        f'LAST-MODIFIED:{formatar_utc(audiencia.atualizado_em)}',
+        f'DTSTART:{formatar_utc(audiencia.data_hora)}',
+        f'DTEND:{formatar_utc(audiencia.data_hora_fim)}',
+    ]
+    if audiencia.recorrencia:
+        linhas.extend(regra_recorrencia(audiencia))
+    linhas.extend([
+        f'SUMMARY:{escapar(resumo)}',
+        f'LOCATION:{escapar(audiencia.local)}',
+        f'DESCRIPTION:{escapar(descricao)}',
+        'STATUS:CONFIRMED',
+        'END:VEVENT',
+    ])
+    return linhas
+
+
+def vevent_cancelado(cancelamento, carimbo):
+    return [
+        'BEGIN:VEVENT',
+        f'UID:{uid_audiencia(cancelamento.audiencia_id)}',
+        f'DTSTAMP:{formatar_utc(carimbo)}',
+        f'LAST-MODIFIED:{formatar_utc(cancelamento.cancelado_em)}',
+        f'DTSTART:{formatar_utc(cancelamento.data_hora)}',
+        'STATUS:CANCELLED',
+        'END:VEVENT',
+    ]
+
+
+def montar_calendario(eventos, nome, sync_token=None):
+    """Monta o VCALENDAR a partir das listas de linhas de cada VEVENT."""
+    linhas = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escapar(nome)}',
+    ]
+    if sync_token:
+        linhas.append(f'X-LAW-SYNC-TOKEN:{sync_token}')
+    for evento in eventos:
+        linhas.extend(evento)
+    linhas.append('END:VCALENDAR')
+    return '\r\n'.join(dobrar_linha(linha) for linha in linhas) + '\r\n'
@@ -0,0 +1,349 @@
+# agenda/importacao.py
+"""
+Importação de pautas de audiências (CSV ou JSON).
+
+Cada linha traz número do processo, data/hora, vara e tipo. A importação
+inteira usa poucas consultas: os processos são resolvidos de uma vez pelo
+número, os compromissos existentes desses processos são lidos de uma vez e
+as gravações saem em lotes (bulk_create/bulk_update) dentro de uma transação.
+
+Regras de correspondência, por processo:
+  1. mesmo processo e mesma data/hora -> atualiza tipo/vara/local;
+  2. senão, um compromisso futuro do mesmo processo e do mesmo tipo, a até
+     `janela` do novo horário e que não esteja na pauta -> é movido para o
+     novo horário (com LogAudiencia);
+  3. senão -> novo compromisso; se o processo tiver um compromisso futuro
+     do mesmo tipo fora da janela, a linha sai com um aviso de possível
+     duplicata em vez de mover uma audiência sem relação com a pauta.
+
+As alterações são gravadas com o mesmo UPDATE condicionado à versão do
+reagendamento em lote: se alguém editar um desses compromissos durante a
+importação, nada é importado.
+"""
+
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from core.models import ConflitoDeVersao
+from processos.cnj import normalizar_numero
+from processos.models import Processo
+from .compartilhamento import invalidar_agenda
+from .models import Audiencia, Forum, LogAudiencia, normalizar_nome_forum
+
+TAMANHO_LOTE = 500
+# O UPDATE condicionado leva um WHEN por compromisso e campo: lotes menores
+TAMANHO_LOTE_ATUALIZACAO = 100
+MOTIVO_IMPORTACAO = "Reagendado pela importação de pauta"
+# Distância máxima entre o compromisso existente e o horário da pauta para movê-lo
+JANELA_REAGENDAMENTO = timedelta(days=7)
+CAMPOS_ATUALIZADOS = ('data_hora', 'tipo', 'vara', 'forum', 'local')
+
+# Cabeçalhos aceitos para cada coluna (comparados sem acento/caixa)
+COLUNAS = {
+    'numero': ('numero', 'processo', 'numero processo', 'n processo'),
+    'data_hora': ('data hora', 'data_hora', 'datahora'),
+    'data': ('data',),
+    'hora': ('hora', 'horario'),
+    'vara': ('vara', 'forum', 'vara forum', 'orgao julgador'),
+    'tipo': ('tipo', 'tipo audiencia'),
+    'local': ('local', 'sala'),
+}
+
+FORMATOS_DATA_HORA = ('%d/%m/%Y %H:%M', '%d/%m/%Y %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M')
+
+
+class ErroPauta(Exception):
+    """Arquivo de pauta ilegível (formato ou cabeçalho)."""
+
+
+@dataclass
+class ResultadoImportacao:
+    criados: int = 0
+    atualizados: int = 0
+    movidos: int = 0
+    erros: list = field(default_factory=list)
+    avisos: list = field(default_factory=list)
+
+    @property
+    def total(self):
+        return self.criados + self.atualizados + self.movidos
+
+    def erro(self, linha, mensagem):
+        self.erros.append((linha, mensagem))
+
+    def aviso(self, linha, mensagem):
+        self.avisos.append((linha, mensagem))
+
+
+def _tipos_aceitos():
+    tipos = {}
+    for valor, rotulo in Audiencia.TIPOS_AUDIENCIA:
+        tipos[valor] = valor
+        tipos[normalizar_nome_forum(rotulo)] = valor
+    return tipos
+
+
+def _mapear_colunas(cabecalho):
+    por_nome = {normalizar_nome_forum(nome).replace('_', ' '): nome for nome in cabecalho if nome}
+    mapa = {}
+    for coluna, apelidos in COLUNAS.items():
+        for apelido in apelidos:
+            original = por_nome.get(apelido.replace('_', ' '))
+            if original is not None:
+                mapa[coluna] = original
+                break
+    if 'numero' not in mapa or not ('data_hora' in mapa or 'data' in mapa):
+        raise ErroPauta("A pauta precisa das colunas de número do processo e data/hora.")
+    return mapa
+
+
+def _linhas_csv(conteudo):
+    try:
+        dialeto = csv.Sniffer().sniff(conteudo[:4096], delimiters=';,\t')
+    except csv.Error:
+        dialeto = csv.excel
+    leitor = csv.DictReader(io.StringIO(conteudo), dialect=dialeto)
+    mapa = _mapear_colunas(leitor.fieldnames or [])
+    for registro in leitor:
+        yield {coluna: (registro.get(original) or '').strip() for coluna, original in mapa.items()}
+
+
+def _linhas_json(conteudo):
+    try:
+        dados = json.loads(conteudo)
+    except ValueError as erro:
+        raise ErroPauta(f"JSON inválido: {erro}")
+    if isinstance(dados, dict):
+        dados = dados.get('audiencias', [])
+    if not isinstance(dados, list):
+        raise ErroPauta("O JSON deve ser uma lista de audiências.")
+    mapa = None
+    for registro in dados:
+        if not isinstance(registro, dict):
+            yield {}
+            continue
+        mapa = mapa or _mapear_colunas(list(registro))
+        yield {coluna: str(registro.get(original) or '').strip() for coluna, original in mapa.items()}
+
+
+def ler_pauta(arquivo, nome_arquivo=''):
+    """Lê bytes/texto de um CSV ou JSON e devolve a lista de linhas normalizadas."""
+    if isinstance(arquivo, bytes):
+        try:
+            arquivo = arquivo.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            # Exportações de planilhas brasileiras costumam vir em Latin-1
+            arquivo = arquivo.decode('latin-1')
+    conteudo = arquivo.strip()
+    if nome_arquivo.lower().endswith('.json') or conteudo[:1] in '[{':
+        return list(_linhas_json(conteudo))
+    return list(_linhas_csv(conteudo))
+
+
+def _parse_data_hora(linha):
+    texto = linha.get('data_hora') or f"{linha.get('data', '')} {linha.get('hora', '')}".strip()
+    if not texto:
+        return None
+    data_hora = None
+    try:
+        data_hora = datetime.fromisoformat(texto)
+    except ValueError:
+        for formato in FORMATOS_DATA_HORA:
+            try:
+                data_hora = datetime.strptime(texto, formato)
+                break
+            except ValueError:
+                continue
+    if data_hora is not None and timezone.is_naive(data_hora):
+        data_hora = timezone.make_aware(data_hora)
+    return data_hora
+
+
+def _em_lotes(itens, tamanho=TAMANHO_LOTE):
+    for posicao in range(0, len(itens), tamanho):
+        yield itens[posicao:posicao + tamanho]
+
+
+def _atualizar_com_versao(alterados, agora):
+    """
+    Grava `alterados` com UPDATE ... WHERE (id = 1 AND versao = n1) OR ...,
+    como em ReagendarLoteJsonView. Levanta ConflitoDeVersao se algum
+    compromisso mudou desde a leitura.
+    """
+    campos = [Audiencia._meta.get_field(nome) for nome in CAMPOS_ATUALIZADOS]
+    for lote in _em_lotes(alterados, TAMANHO_LOTE_ATUALIZACAO):
+        mesma_versao = Q()
+        for compromisso in lote:
+            mesma_versao |= Q(pk=compromisso.pk, versao=compromisso.versao)
+        valores = {}
+        for campo in campos:
+            tipo_valor = campo.target_field if campo.is_relation else campo
+            valores[campo.attname] = Case(
+                *[When(pk=compromisso.pk, then=Value(getattr(compromisso, campo.attname), output_field=tipo_valor))
+                  for compromisso in lote],
+                output_field=tipo_valor,
+            )
+        gravados = Audiencia.objects.filter(mesma_versao).update(
+            **valores,
+            atualizado_em=agora,
+            versao=F('versao') + 1,
+        )
+        if gravados != len(lote):
+            raise ConflitoDeVersao()
+
+
+def importar_pauta(linhas, dono, usuario=None, janela=JANELA_REAGENDAMENTO):
+    """Aplica as linhas da pauta na agenda do escritório `dono`."""
+    resultado = ResultadoImportacao()
+    tipos = _tipos_aceitos()
+
+    # 1. Validação das linhas (sem banco)
+    validas = {}
+    for posicao, linha in enumerate(linhas, start=1):
+        numero = linha.get('numero', '')
+        data_hora = _parse_data_hora(linha)
+        tipo = tipos.get(normalizar_nome_forum(linha.get('tipo', '')) or 'forum')
+        if not numero:
+            resultado.erro(posicao, "Número do processo em branco.")
+        elif data_hora is None:
+            resultado.erro(posicao, "Data/hora inválida.")
+        elif tipo is None:
+            resultado.erro(posicao, f"Tipo desconhecido: {linha.get('tipo')}")
+        else:
+            # Linhas repetidas (mesmo processo e horário): vale a última
+            validas[(normalizar_numero(numero) or numero, data_hora)] = (posicao, linha, tipo)
+
+    # 2. Processos do escritório, resolvidos em lote pelo número (CNJ pela
+    #    forma canônica, qualquer que seja a máscara da pauta)
+    numeros = {numero for numero, _data_hora in validas}
+    canonicos = {numero: normalizar_numero(numero) for numero in numeros}
+    por_cnj, por_numero = {}, {}
+    escritorio = Processo.objects.filter(advogado_responsavel=dono)
+    for lote in _em_lotes(sorted({canonico for canonico in canonicos.values() if canonico})):
+        por_cnj.update(escritorio.filter(numero_cnj__in=lote).in_bulk(field_name='numero_cnj'))
+    for lote in _em_lotes(sorted(numero for numero, canonico in canonicos.items() if not canonico)):
+        por_numero.update(escritorio.filter(numero__in=lote).in_bulk(field_name='numero'))
+    processos = {
+        numero: por_cnj.get(canonico) if canonico else por_numero.get(numero)
+        for numero, canonico in canonicos.items()
+    }
+
+    foruns = Forum.resolver_varios(linha.get('vara', '') for _posicao, linha, _tipo in validas.values())
+
+    # 3. Compromissos já cadastrados desses processos
+    existentes = {}
+    candidatos_a_mover = {}
+    agora = timezone.now()
+    compromissos = Audiencia.objects.filter(
+        advogado_responsavel=dono,
+        processo__in=[processo.pk for processo in processos.values()],
+        recorrencia='',
+    ).order_by('data_hora')
+    for compromisso in compromissos:
+        existentes[(compromisso.processo_id, compromisso.data_hora)] = compromisso
+        if compromisso.data_hora >= agora:
+            candidatos_a_mover.setdefault((compromisso.processo_id, compromisso.tipo), []).append(compromisso)
+
+    novos, alterados, logs = [], [], []
+    pendentes = []
+    usados = set()
+
+    for (numero, data_hora), (posicao, linha, tipo) in sorted(validas.items(), key=lambda item: item[1][0]):
+        processo = processos.get(numero)
+        if processo is None:
+            resultado.erro(posicao, f"Processo {linha['numero']} não encontrado no escritório.")
+            continue
+
+        forum = foruns.get(normalizar_nome_forum(linha.get('vara', '')))
+        campos = {
+            'tipo': tipo,
+            'vara': forum.nome if forum else '',
+            'forum': forum,
+        }
+        if linha.get('local'):
+            campos['local'] = linha['local'][:200]
+
+        compromisso = existentes.get((processo.pk, data_hora))
+        if compromisso is not None:
+            usados.add(compromisso.pk)
+            if any(getattr(compromisso, nome) != valor for nome, valor in campos.items()):
+                for nome, valor in campos.items():
+                    setattr(compromisso, nome, valor)
+                alterados.append(compromisso)
+                resultado.atualizados += 1
+            continue
+
+        pendentes.append((posicao, processo, data_hora, campos))
+
+    # Movidos só depois de reservar os horários que já batiam exatamente
+    for posicao, processo, data_hora, campos in pendentes:
+        livres = [
+            compromisso for compromisso in candidatos_a_mover.get((processo.pk, campos['tipo']), [])
+            if compromisso.pk not in usados
+        ]
+        candidatos = [compromisso for compromisso in livres if abs(compromisso.data_hora - data_hora) <= janela]
+        if candidatos:
+            compromisso = min(candidatos, key=lambda item: abs(item.data_hora - data_hora))
+            usados.add(compromisso.pk)
+            logs.append(LogAudiencia(
+                audiencia=compromisso,
+                alterado_por=usuario,
+                data_anterior=compromisso.data_hora,
+                nova_data=data_hora,
+                motivo=MOTIVO_IMPORTACAO,
+            ))
+            compromisso.data_hora = data_hora
+            for nome, valor in campos.items():
+                setattr(compromisso, nome, valor)
+            alterados.append(compromisso)
+            resultado.movidos += 1
+        else:
+            if livres:
+                proximo = min(livres, key=lambda item: abs(item.data_hora - data_hora))
+                quando = timezone.localtime(proximo.data_hora).strftime('%d/%m/%Y %H:%M')
+                resultado.aviso(posicao, (
+                    f"O processo {processo.numero} já tem {proximo.get_tipo_display()} em {quando}, "
+                    f"fora da janela de {janela.days} dia(s): foi criado um novo compromisso. "
+                    "Confira se é duplicado."
+                ))
+            novos.append(Audiencia(
+                processo=processo,
+                data_hora=data_hora,
+                advogado_responsavel=dono,
+                criado_por=usuario,
+                **campos,
+            ))
+            resultado.criados += 1
+
+    # 4. Gravação em lotes, tudo ou nada
+    try:
+        with transaction.atomic():
+            _atualizar_com_versao(alterados, agora)
+            Audiencia.objects.bulk_create(novos, batch_size=TAMANHO_LOTE)
+            LogAudiencia.objects.bulk_create(logs, batch_size=TAMANHO_LOTE)
+    except IntegrityError:
+        resultado.criados = resultado.atualizados = resultado.movidos = 0
+        resultado.avisos = []
+        resultado.erro(None, "Conflito com compromissos já existentes. Nada foi importado.")
+        return resultado
+    except ConflitoDeVersao:
+        resultado.criados = resultado.atualizados = resultado.movidos = 0
+        resultado.avisos = []
+        resultado.erro(None, (
+            "Compromissos desta pauta foram alterados por outra pessoa durante a importação. "
+            "Nada foi importado; envie a pauta de novo."
+        ))
+        return resultado
+
+    # bulk_* não dispara os signals de post_save
+    invalidar_agenda(dono.pk)
+    resultado.erros.sort(key=lambda erro: erro[0] or 0)
+    resultado.avisos.sort(key=lambda aviso: aviso[0] or 0)
+    return resultado
@@ -0,0 +1,177 @@
+# agenda/lembretes.py
+"""
+Agendador de lembretes de compromissos.
+
+Mantém em memória uma fila de prioridade (heap) com os próximos lembretes,
+ordenada pelo horário de disparo. A cada ciclo:
+  - busca só os compromissos alterados/cancelados desde o último ciclo
+    (índices em atualizado_em e cancelado_em);
+  - quando o horizonte carregado fica curto, carrega o próximo trecho por
+    intervalo de data_hora;
+  - retira da fila o que venceu e grava as Notificacao em lote.
+
+Entradas antigas de um compromisso alterado não são removidas da fila: a
+versão (atualizado_em) guardada em cada entrada deixa de bater e ela é
+descartada ao sair. Assim o custo por ciclo depende das mudanças, não do
+total de compromissos futuros.
+"""
+
+import heapq
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from notificacoes.models import Notificacao
+from .models import Audiencia, AudienciaCancelada, LembreteEnviado
+from .recorrencia import expandir, filtro_janela
+
+# Quanto tempo à frente fica carregado na fila
+JANELA_PADRAO = timedelta(hours=6)
+
+# Folga na busca incremental para transações que gravaram com atraso
+MARGEM_SINCRONIZACAO = timedelta(seconds=5)
+
+CAMPOS_CARREGADOS = (
+    'pk', 'data_hora', 'duracao', 'atualizado_em',
+    'recorrencia', 'intervalo_recorrencia', 'recorrencia_ate',
+)
+
+
+def descrever_antecedencia(minutos):
+    if minutos % (24 * 60) == 0:
+        dias = minutos // (24 * 60)
+        return "1 dia" if dias == 1 else f"{dias} dias"
+    if minutos % 60 == 0:
+        horas = minutos // 60
+        return "1 hora" if horas == 1 else f"{horas} horas"
+    return f"{minutos} minutos"
+
+
+class AgendadorLembretes:
+
+    def __init__(self, antecedencias=None, janela=JANELA_PADRAO):
+        antecedencias = antecedencias or getattr(settings, 'AGENDA_LEMBRETES_ANTECEDENCIAS', [24 * 60, 60])
+        self.antecedencias = sorted(set(antecedencias))
+        self.menor_antecedencia = timedelta(minutes=self.antecedencias[0])
+        self.maior_antecedencia = timedelta(minutes=self.antecedencias[-1])
+        self.janela = janela
+        self.fila = []
+        self.versoes = {}
+        self.horizonte = None
+        self.ultima_sincronizacao = None
+
+    # --- Carga da fila ---
+
+    def iniciar(self, agora):
+        """Primeira carga. Lembretes atrasados de compromissos que ainda não começaram também entram."""
+        self.ultima_sincronizacao = agora
+        self.fila = []
+        self.versoes = {}
+        self.horizonte = agora - self.maior_antecedencia
+        self._carregar_ate(agora + self.janela)
+
+    def _carregar_ate(self, ate):
+        """Enfileira os lembretes que disparam em [horizonte, ate)."""
+        de = self.horizonte
+        inicio = de + self.menor_antecedencia
+        fim = ate + self.maior_antecedencia
+        compromissos = Audiencia.objects.filter(filtro_janela(inicio, fim)).only(*CAMPOS_CARREGADOS)
+        for item in expandir(compromissos, inicio, fim):
+            self._enfileirar(item, de, ate)
+        self.horizonte = ate
+        self._podar_versoes()
+
+    def _enfileirar(self, item, de, ate):
+        versao = item.atualizado_em
+        self.versoes[item.pk] = versao
+        for minutos in self.antecedencias:
+            dispara_em = item.data_hora - timedelta(minutes=minutos)
+            if de <= dispara_em < ate:
+                heapq.heappush(self.fila, (dispara_em, item.pk, item.data_hora, minutos, versao))
+
+    def _podar_versoes(self):
+        ativos = {entrada[1] for entrada in self.fila}
+        self.versoes = {pk: versao for pk, versao in self.versoes.items() if pk in ativos}
+
+    # --- Ciclo ---
+
+    def sincronizar(self, agora):
+        """Recarrega apenas o que mudou desde a última sincronização."""
+        desde = self.ultima_sincronizacao - MARGEM_SINCRONIZACAO
+        maior_visto = self.ultima_sincronizacao
+        de = agora - self.maior_antecedencia
+
+        alterados = Audiencia.objects.filter(atualizado_em__gt=desde).only(*CAMPOS_CARREGADOS)
+        for compromisso in alterados:
+            maior_visto = max(maior_visto, compromisso.atualizado_em)
+            if self.versoes.get(compromisso.pk) == compromisso.atualizado_em:
+                continue
+            self.versoes[compromisso.pk] = compromisso.atualizado_em
+            inicio = de + self.menor_antecedencia
+            fim = self.horizonte + self.maior_antecedencia
+            for item in expandir([compromisso], inicio, fim):
+                self._enfileirar(item, de, self.horizonte)
+
+        cancelados = AudienciaCancelada.objects.filter(cancelado_em__gt=desde).values_list('audiencia_id', 'cancelado_em')
+        for audiencia_id, cancelado_em in cancelados:
+            maior_visto = max(maior_visto, cancelado_em)
+            self.versoes.pop(audiencia_id, None)
+
+        self.ultima_sincronizacao = maior_visto
+
+    def disparar(self, agora):
+        """Gera as notificações dos lembretes vencidos. Retorna quantas foram criadas."""
+        vencidos = []
+        while self.fila and self.fila[0][0] <= agora:
+            _, pk, ocorrencia, minutos, versao = heapq.heappop(self.fila)
+            # Entrada de versão antiga ou compromisso que já começou
+            if self.versoes.get(pk) != versao or ocorrencia <= agora:
+                continue
+            vencidos.append((pk, ocorrencia, minutos))
+
+        if not vencidos:
+            return 0
+
+        ids = {pk for pk, _, _ in vencidos}
+        compromissos = Audiencia.objects.select_related('processo', 'cliente').in_bulk(ids)
+        ja_enviados = set(LembreteEnviado.objects.filter(
+            audiencia_id__in=ids, data_hora__gt=agora
+        ).values_list('audiencia_id', 'data_hora', 'antecedencia'))
+
+        notificacoes = []
+        enviados = []
+        for pk, ocorrencia, minutos in vencidos:
+            compromisso = compromissos.get(pk)
+            if compromisso is None or (pk, ocorrencia, minutos) in ja_enviados:
+                continue
+            ja_enviados.add((pk, ocorrencia, minutos))
+            enviados.append(LembreteEnviado(audiencia_id=pk, data_hora=ocorrencia, antecedencia=minutos))
+
+            titulo = f"Lembrete: {compromisso.get_tipo_display()} em {descrever_antecedencia(minutos)}"
+            mensagem = (
+                f"{compromisso.vinculacao}\n"
+                f"Data: {timezone.localtime(ocorrencia).strftime('%d/%m/%Y %H:%M')}\n"
+                f"Local: {compromisso.local}"
+            )
+            destinatarios = {compromisso.advogado_responsavel_id, compromisso.criado_por_id} - {None}
+            notificacoes.extend(
+                Notificacao(usuario_id=usuario_id, titulo=titulo, mensagem=mensagem)
+                for usuario_id in destinatarios
+            )
+
+        with transaction.atomic():
+            LembreteEnviado.objects.bulk_create(enviados, ignore_conflicts=True)
+            Notificacao.objects.bulk_create(notificacoes)
+        return len(notificacoes)
+
+    def executar_ciclo(self, agora=None):
+        agora = agora or timezone.now()
+        if self.horizonte is None:
+            self.iniciar(agora)
+        else:
+            self.sincronizar(agora)
+        if agora + self.janela / 2 > self.horizonte:
+            self._carregar_ate(agora + self.janela)
+        return self.disparar(agora)
@@ -0,0 +1,55 @@
+from datetime import timedelta
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from agenda.importacao import JANELA_REAGENDAMENTO, ErroPauta, importar_pauta, ler_pauta
+from usuarios.utils import advogado_do_usuario
+
+
+class Command(BaseCommand):
+    help = "Importa uma pauta de audiências (CSV ou JSON) para a agenda de um escritório."
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help="Caminho do arquivo .csv ou .json")
+        parser.add_argument(
+            '--usuario', required=True,
+            help="Usuário (advogado ou colaborador) em nome de quem a pauta é importada"
+        )
+        parser.add_argument(
+            '--janela-dias', type=int, default=JANELA_REAGENDAMENTO.days,
+            help="Só move compromissos a até este número de dias do horário da pauta"
+        )
+
+    def handle(self, *args, **opcoes):
+        User = get_user_model()
+        try:
+            usuario = User.objects.get(username=opcoes['usuario'])
+        except User.DoesNotExist:
+            raise CommandError(f"Usuário {opcoes['usuario']} não encontrado.")
+
+        caminho = Path(opcoes['arquivo'])
+        if not caminho.exists():
+            raise CommandError(f"Arquivo {caminho} não encontrado.")
+
+        try:
+            linhas = ler_pauta(caminho.read_bytes(), caminho.name)
+        except ErroPauta as erro:
+            raise CommandError(str(erro))
+
+        resultado = importar_pauta(
+            linhas, advogado_do_usuario(usuario), usuario, janela=timedelta(days=opcoes['janela_dias'])
+        )
+
+        for linha, mensagem in resultado.erros:
+            prefixo = f"Linha {linha}: " if linha else ""
+            self.stderr.write(f"{prefixo}{mensagem}")
+        for linha, mensagem in resultado.avisos:
+            prefixo = f"Linha {linha}: " if linha else ""
+            self.stdout.write(self.style.WARNING(f"{prefixo}{mensagem}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(linhas)} linha(s): {resultado.criados} criada(s), "
+            f"{resultado.atualizados} atualizada(s), {resultado.movidos} reagendada(s), "
+            f"{len(resultado.erros)} erro(s)."
+        ))
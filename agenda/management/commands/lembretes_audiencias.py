@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from agenda.lembretes import AgendadorLembretes
+
+
+class Command(BaseCommand):
+    help = "Processo contínuo que gera notificações de lembrete dos compromissos da agenda."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--intervalo', type=int, default=30,
+            help="Segundos entre cada ciclo (padrão: 30)"
+        )
+        parser.add_argument(
+            '--antecedencias', type=int, nargs='+',
+            help="Minutos de antecedência dos lembretes (padrão: AGENDA_LEMBRETES_ANTECEDENCIAS)"
+        )
+        parser.add_argument(
+            '--uma-vez', action='store_true',
+            help="Executa um único ciclo e encerra (útil em cron)"
+        )
+
+    def handle(self, *args, **opcoes):
+        agendador = AgendadorLembretes(antecedencias=opcoes['antecedencias'])
+        self.stdout.write(f"Lembretes com antecedência de {agendador.antecedencias} minutos.")
+
+        try:
+            while True:
+                criadas = agendador.executar_ciclo()
+                if criadas:
+                    self.stdout.write(self.style.SUCCESS(f"{criadas} notificação(ões) criada(s)."))
+                if opcoes['uma_vez']:
+                    break
+                time.sleep(opcoes['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write("Encerrado.")
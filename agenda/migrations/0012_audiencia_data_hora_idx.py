@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0011_alter_audiencia_criado_em'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='audiencia',
+            index=models.Index(fields=['data_hora'], name='audiencia_data_hora_idx'),
+        ),
+    ]
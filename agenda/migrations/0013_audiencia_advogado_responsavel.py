@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def preencher_advogado_responsavel(apps, schema_editor):
+    Audiencia = apps.get_model('agenda', 'Audiencia')
+    Processo = apps.get_model('processos', 'Processo')
+    Cliente = apps.get_model('clientes', 'Cliente')
+
+    Audiencia.objects.filter(processo__isnull=False).update(
+        advogado_responsavel_id=models.Subquery(
+            Processo.objects.filter(pk=models.OuterRef('processo_id')).values('advogado_responsavel_id')[:1]
+        )
+    )
+    Audiencia.objects.filter(processo__isnull=True, cliente__isnull=False).update(
+        advogado_responsavel_id=models.Subquery(
+            Cliente.objects.filter(pk=models.OuterRef('cliente_id')).values('advogado_responsavel_id')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0012_audiencia_data_hora_idx'),
+        ('clientes', '0001_initial'),
+        ('processos', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='audiencia',
+            name='advogado_responsavel',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='compromissos_escritorio', to=settings.AUTH_USER_MODEL, verbose_name='Advogado responsável'),
+        ),
+        migrations.AddIndex(
+            model_name='audiencia',
+            index=models.Index(fields=['advogado_responsavel', 'data_hora'], name='audiencia_dono_data_idx'),
+        ),
+        migrations.RunPython(preencher_advogado_responsavel, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0013_audiencia_advogado_responsavel'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='audiencia',
+            index=models.Index(fields=['advogado_responsavel', 'atualizado_em'], name='audiencia_dono_atualiz_idx'),
+        ),
+        migrations.CreateModel(
+            name='AudienciaCancelada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('audiencia_id', models.BigIntegerField(verbose_name='ID do compromisso')),
+                ('data_hora', models.DateTimeField(verbose_name='Data e hora original')),
+                ('cancelado_em', models.DateTimeField(auto_now_add=True, verbose_name='Cancelado em')),
+                ('advogado_responsavel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='compromissos_cancelados', to=settings.AUTH_USER_MODEL, verbose_name='Advogado responsável')),
+            ],
+            options={
+                'verbose_name': 'Compromisso cancelado',
+                'verbose_name_plural': 'Compromissos cancelados',
+                'ordering': ['-cancelado_em'],
+                'indexes': [models.Index(fields=['advogado_responsavel', 'cancelado_em'], name='cancelada_dono_data_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='AssinaturaCalendario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64, unique=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='assinatura_calendario', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Assinatura de calendário',
+                'verbose_name_plural': 'Assinaturas de calendário',
+            },
+        ),
+    ]
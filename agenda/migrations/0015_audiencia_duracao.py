@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:10
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0014_audienciacancelada_assinaturacalendario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='audiencia',
+            name='duracao',
+            field=models.PositiveIntegerField(default=60, help_text='Usada para detectar conflitos de horário', validators=[django.core.validators.MinValueValidator(5), django.core.validators.MaxValueValidator(720)], verbose_name='Duração (minutos)'),
+        ),
+    ]
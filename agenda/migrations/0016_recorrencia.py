@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:00
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0015_audiencia_duracao'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='audiencia',
+            name='recorrencia',
+            field=models.CharField(blank=True, choices=[('', 'Não se repete'), ('DIARIA', 'Diariamente'), ('SEMANAL', 'Semanalmente'), ('MENSAL', 'Mensalmente')], default='', max_length=10, verbose_name='Repetição'),
+        ),
+        migrations.AddField(
+            model_name='audiencia',
+            name='intervalo_recorrencia',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Ex.: 2 com repetição semanal = a cada duas semanas', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(52)], verbose_name='Repetir a cada'),
+        ),
+        migrations.AddField(
+            model_name='audiencia',
+            name='recorrencia_ate',
+            field=models.DateField(blank=True, help_text='Em branco para repetir sem data final', null=True, verbose_name='Repetir até'),
+        ),
+        migrations.AddIndex(
+            model_name='audiencia',
+            index=models.Index(condition=models.Q(('recorrencia', ''), _negated=True), fields=['advogado_responsavel', 'recorrencia_ate'], name='audiencia_series_idx'),
+        ),
+        migrations.CreateModel(
+            name='ExcecaoRecorrencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data_original', models.DateTimeField(verbose_name='Data original da ocorrência')),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('serie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='excecoes', to='agenda.audiencia', verbose_name='Série')),
+                ('substituta', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='excecao_origem', to='agenda.audiencia', verbose_name='Compromisso substituto')),
+            ],
+            options={
+                'verbose_name': 'Exceção de recorrência',
+                'verbose_name_plural': 'Exceções de recorrência',
+                'ordering': ['data_original'],
+                'constraints': [models.UniqueConstraint(fields=('serie', 'data_original'), name='unique_excecao_por_ocorrencia')],
+            },
+        ),
+    ]
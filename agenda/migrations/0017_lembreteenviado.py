@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0016_recorrencia'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='audiencia',
+            index=models.Index(fields=['atualizado_em'], name='audiencia_atualizado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='audienciacancelada',
+            index=models.Index(fields=['cancelado_em'], name='cancelada_data_idx'),
+        ),
+        migrations.CreateModel(
+            name='LembreteEnviado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data_hora', models.DateTimeField(verbose_name='Data da ocorrência')),
+                ('antecedencia', models.PositiveIntegerField(verbose_name='Antecedência (minutos)')),
+                ('enviado_em', models.DateTimeField(auto_now_add=True)),
+                ('audiencia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lembretes_enviados', to='agenda.audiencia')),
+            ],
+            options={
+                'verbose_name': 'Lembrete enviado',
+                'verbose_name_plural': 'Lembretes enviados',
+                'constraints': [models.UniqueConstraint(fields=('audiencia', 'data_hora', 'antecedencia'), name='unique_lembrete_por_ocorrencia')],
+            },
+        ),
+    ]
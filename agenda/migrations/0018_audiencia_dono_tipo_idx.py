@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0017_lembreteenviado'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='audiencia',
+            index=models.Index(fields=['advogado_responsavel', 'tipo', 'data_hora'], name='audiencia_dono_tipo_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:40
+
+import re
+import unicodedata
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def _normalizar(texto):
+    # Cópia de agenda.models.normalizar_nome_forum no momento da migração
+    sem_acento = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(re.sub(r'[^\w\s]', ' ', sem_acento).lower().split())
+
+
+def deduplicar_varas(apps, schema_editor):
+    Audiencia = apps.get_model('agenda', 'Audiencia')
+    Forum = apps.get_model('agenda', 'Forum')
+
+    grafias = defaultdict(list)
+    usos = (
+        Audiencia.objects.exclude(vara='')
+        .values('vara')
+        .annotate(total=models.Count('id'))
+        .order_by()
+    )
+    for linha in usos:
+        normalizado = _normalizar(linha['vara'])
+        if normalizado:
+            grafias[normalizado].append((linha['total'], linha['vara']))
+
+    for normalizado, variantes in grafias.items():
+        # A grafia mais usada vira o nome canônico
+        _total, nome = max(variantes, key=lambda item: (item[0], item[1]))
+        forum = Forum.objects.create(nome=' '.join(nome.split()), nome_normalizado=normalizado)
+        Audiencia.objects.filter(vara__in=[vara for _total, vara in variantes]).update(
+            forum=forum, vara=forum.nome
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0018_audiencia_dono_tipo_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Forum',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=200, verbose_name='Nome')),
+                ('nome_normalizado', models.CharField(editable=False, max_length=200, unique=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Vara/Fórum',
+                'verbose_name_plural': 'Varas/Fóruns',
+                'ordering': ['nome'],
+            },
+        ),
+        migrations.AddField(
+            model_name='audiencia',
+            name='forum',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='compromissos', to='agenda.forum', verbose_name='Fórum'),
+        ),
+        migrations.AddIndex(
+            model_name='audiencia',
+            index=models.Index(fields=['advogado_responsavel', 'forum', 'data_hora'], name='audiencia_dono_forum_idx'),
+        ),
+        migrations.RunPython(deduplicar_varas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0019_forum'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompartilhamentoAgenda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('descricao', models.CharField(max_length=120, verbose_name='Compartilhado com')),
+                ('token', models.CharField(max_length=64, unique=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('revogado_em', models.DateTimeField(blank=True, null=True, verbose_name='Revogado em')),
+                ('advogado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='compartilhamentos_agenda', to=settings.AUTH_USER_MODEL, verbose_name='Escritório')),
+                ('criado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Criado por')),
+            ],
+            options={
+                'verbose_name': 'Compartilhamento de agenda',
+                'verbose_name_plural': 'Compartilhamentos de agenda',
+                'ordering': ['-criado_em'],
+            },
+        ),
+    ]
@@ -1,11 +1,101 @@
+import re
+import unicodedata
+from datetime import timedelta
+
 from django.db import models
 from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth import get_user_model
 
+from core.models import ModeloVersionado
+
 User = get_user_model()
 
-class Audiencia(models.Model):
+
+def normalizar_nome_forum(texto):
+    """'1ª Vara Cível - Fórum Central' -> '1a vara civel forum central'."""
+    sem_acento = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(re.sub(r'[^\w\s]', ' ', sem_acento).lower().split())
+
+
+class Forum(models.Model):
+    """
+    Vara/fórum compartilhado por todos os escritórios. O nome normalizado
+    (sem acento, caixa ou pontuação) identifica o local e serve de índice
+    para o autocompletar por prefixo.
+    """
+    nome = models.CharField(max_length=200, verbose_name=_("Nome"))
+    nome_normalizado = models.CharField(max_length=200, unique=True, editable=False)
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Vara/Fórum")
+        verbose_name_plural = _("Varas/Fóruns")
+        ordering = ['nome']
+
+    def save(self, *args, **kwargs):
+        self.nome = ' '.join(self.nome.split())
+        self.nome_normalizado = normalizar_nome_forum(self.nome)
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def resolver(cls, nome):
+        """Fórum correspondente ao texto digitado, criando-o na primeira vez."""
+        normalizado = normalizar_nome_forum(nome)
+        if not normalizado:
+            return None
+        forum, _criado = cls.objects.get_or_create(
+            nome_normalizado=normalizado,
+            defaults={'nome': ' '.join(nome.split())},
+        )
+        return forum
+
+    @classmethod
+    def resolver_varios(cls, nomes):
+        """
+        Versão em lote de resolver(): {nome_normalizado: Forum} para todos os
+        nomes, com uma consulta, um bulk_create dos novos e uma releitura.
+        """
+        por_normalizado = {}
+        for nome in nomes:
+            normalizado = normalizar_nome_forum(nome)
+            if normalizado:
+                por_normalizado.setdefault(normalizado, ' '.join(nome.split()))
+        if not por_normalizado:
+            return {}
+
+        existentes = cls.objects.filter(nome_normalizado__in=por_normalizado)
+        encontrados = {forum.nome_normalizado: forum for forum in existentes}
+        novos = [
+            cls(nome=nome, nome_normalizado=normalizado)
+            for normalizado, nome in por_normalizado.items()
+            if normalizado not in encontrados
+        ]
+        if novos:
+            cls.objects.bulk_create(novos, ignore_conflicts=True)
+            encontrados.update({
+                forum.nome_normalizado: forum
+                for forum in cls.objects.filter(nome_normalizado__in=[novo.nome_normalizado for novo in novos])
+            })
+        return encontrados
+
+    @classmethod
+    def buscar_prefixo(cls, texto, limite=10):
+        """Autocompletar: faixa [prefixo, prefixo+1) no índice único, sem LIKE."""
+        prefixo = normalizar_nome_forum(texto)
+        if not prefixo:
+            return cls.objects.none()
+        teto = prefixo[:-1] + chr(ord(prefixo[-1]) + 1)
+        return cls.objects.filter(
+            nome_normalizado__gte=prefixo, nome_normalizado__lt=teto
+        ).order_by('nome_normalizado')[:limite]
+
+    def __str__(self):
+        return self.nome
+
+
+class Audiencia(ModeloVersionado):
     TIPOS_AUDIENCIA = [
         ('forum', '🧑‍⚖️ Audiência Fórum'),
         ('virtual', '💻 Audiência Virtual'),
@@ -15,6 +105,16 @@ class Audiencia(models.Model):
         ('reuniao', '📋 Reunião Estratégica'),
     ]
 
+    RECORRENCIAS = [
+        ('', 'Não se repete'),
+        ('DIARIA', 'Diariamente'),
+        ('SEMANAL', 'Semanalmente'),
+        ('MENSAL', 'Mensalmente'),
+    ]
+
+    # Limite usado pela detecção de conflitos para delimitar a busca por intervalo
+    DURACAO_MAXIMA_MINUTOS = 12 * 60
+
     processo = models.ForeignKey(
         'processos.Processo',
         on_delete=models.CASCADE,
@@ -40,6 +140,13 @@ class Audiencia(models.Model):
         help_text=_("Data e hora do compromisso")
     )
     
+    duracao = models.PositiveIntegerField(
+        default=60,
+        validators=[MinValueValidator(5), MaxValueValidator(DURACAO_MAXIMA_MINUTOS)],
+        verbose_name=_("Duração (minutos)"),
+        help_text=_("Usada para detectar conflitos de horário")
+    )
+    
     tipo = models.CharField(
         max_length=50,
         choices=TIPOS_AUDIENCIA,
@@ -58,12 +165,47 @@ class Audiencia(models.Model):
         blank=True,
         default=''
     )
+
+    # Preenchido a partir de `vara` no save(); agrupa os compromissos por local
+    forum = models.ForeignKey(
+        Forum,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='compromissos',
+        verbose_name=_("Fórum")
+    )
     
     resultado = models.TextField(
         verbose_name=_("Resultado"),
         blank=True,
         null=True
     )
+
+    # Regra de repetição: as ocorrências são calculadas sob demanda, só as
+    # exceções (ocorrência movida ou cancelada) viram linhas no banco.
+    recorrencia = models.CharField(
+        max_length=10,
+        choices=RECORRENCIAS,
+        blank=True,
+        default='',
+        verbose_name=_("Repetição")
+    )
+
+    intervalo_recorrencia = models.PositiveSmallIntegerField(
+        default=1,
+        validators=[MinValueValidator(1), MaxValueValidator(52)],
+        verbose_name=_("Repetir a cada"),
+        help_text=_("Ex.: 2 com repetição semanal = a cada duas semanas")
+    )
+
+    recorrencia_ate = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name=_("Repetir até"),
+        help_text=_("Em branco para repetir sem data final")
+    )
     
     criado_por = models.ForeignKey(
         User,
@@ -73,6 +215,16 @@ class Audiencia(models.Model):
         verbose_name=_("Criado por")
     )
     
+    # Dono do escritório, copiado do processo/cliente para filtrar sem JOIN
+    advogado_responsavel = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        editable=False,
+        related_name='compromissos_escritorio',
+        verbose_name=_("Advogado responsável")
+    )
+
     criado_em = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     atualizado_em = models.DateTimeField(auto_now=True)
 
@@ -80,6 +232,19 @@ class Audiencia(models.Model):
         verbose_name = _("Compromisso")
         verbose_name_plural = _("Compromissos")
         ordering = ['data_hora']
+        indexes = [
+            models.Index(fields=['data_hora'], name='audiencia_data_hora_idx'),
+            models.Index(fields=['advogado_responsavel', 'data_hora'], name='audiencia_dono_data_idx'),
+            models.Index(fields=['advogado_responsavel', 'tipo', 'data_hora'], name='audiencia_dono_tipo_idx'),
+            models.Index(fields=['advogado_responsavel', 'forum', 'data_hora'], name='audiencia_dono_forum_idx'),
+            models.Index(fields=['advogado_responsavel', 'atualizado_em'], name='audiencia_dono_atualiz_idx'),
+            models.Index(fields=['atualizado_em'], name='audiencia_atualizado_idx'),
+            models.Index(
+                fields=['advogado_responsavel', 'recorrencia_ate'],
+                condition=~models.Q(recorrencia=''),
+                name='audiencia_series_idx'
+            ),
+        ]
         constraints = [
             models.CheckConstraint(
                 check=(
@@ -116,7 +281,27 @@ class Audiencia(models.Model):
                 'processo': _("Informe um Processo se não houver Cliente.")
             })
 
+        if self.recorrencia_ate and self.data_hora and self.recorrencia_ate < self.data_hora.date():
+            raise ValidationError({
+                'recorrencia_ate': _("A data final da repetição deve ser posterior ao primeiro compromisso.")
+            })
+
+    def dono_vinculado(self):
+        """Advogado dono do processo ou do cliente vinculado."""
+        if self.processo_id:
+            return self.processo.advogado_responsavel_id
+        if self.cliente_id:
+            return self.cliente.advogado_responsavel_id
+        return None
+
     def save(self, *args, **kwargs):
+        self.advogado_responsavel_id = self.dono_vinculado()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = kwargs['update_fields'] = list(update_fields)
+            if 'advogado_responsavel' not in update_fields:
+                update_fields.append('advogado_responsavel')
+        self._sincronizar_forum(update_fields)
         if not self.pk and not self.criado_por:  # Se for novo e não tiver criador
             from django.contrib.auth import get_user_model
             User = get_user_model()
@@ -124,12 +309,34 @@ class Audiencia(models.Model):
                 self.criado_por = self.request_user
         super().save(*args, **kwargs)
 
+    def _sincronizar_forum(self, update_fields):
+        """Liga `vara` ao Fórum normalizado e grava o nome na grafia canônica."""
+        if update_fields is not None and 'vara' not in update_fields:
+            return
+        normalizado = normalizar_nome_forum(self.vara)
+        if self.forum_id and self.forum.nome_normalizado == normalizado:
+            forum = self.forum
+        else:
+            forum = Forum.resolver(self.vara)
+        self.forum = forum
+        self.vara = forum.nome if forum else ''
+        if update_fields is not None and 'forum' not in update_fields:
+            update_fields.append('forum')
+
     def __str__(self):
         base = f"{self.get_tipo_display()} {self.data_hora.strftime('%d/%m/%Y %H:%M')}"
         if self.processo:
             return f"{base} (Proc. {self.processo.numero})"
         return f"{base} (Cliente: {self.cliente.nome})"
 
+    @property
+    def eh_serie(self):
+        return bool(self.recorrencia)
+
+    @property
+    def data_hora_fim(self):
+        return self.data_hora + timedelta(minutes=self.duracao)
+
     @property
     def vinculacao(self):
         """Retorna a string de vinculação para uso no admin"""
@@ -175,4 +382,151 @@ class LogAudiencia(models.Model):
         return _("Alteração em {audiencia} por {usuario}").format(
             audiencia=self.audiencia,
             usuario=self.alterado_por or _("Sistema")
-        )
\ No newline at end of file
+        )
+
+
+class ExcecaoRecorrencia(models.Model):
+    """
+    Ocorrência de uma série que foi cancelada (sem substituta) ou movida
+    (a substituta é um compromisso avulso comum no novo horário).
+    """
+    serie = models.ForeignKey(
+        Audiencia,
+        on_delete=models.CASCADE,
+        related_name='excecoes',
+        verbose_name=_("Série")
+    )
+    data_original = models.DateTimeField(verbose_name=_("Data original da ocorrência"))
+    substituta = models.OneToOneField(
+        Audiencia,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='excecao_origem',
+        verbose_name=_("Compromisso substituto")
+    )
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Exceção de recorrência")
+        verbose_name_plural = _("Exceções de recorrência")
+        ordering = ['data_original']
+        constraints = [
+            models.UniqueConstraint(fields=['serie', 'data_original'], name='unique_excecao_por_ocorrencia'),
+        ]
+
+    def __str__(self):
+        situacao = _("movida") if self.substituta_id else _("cancelada")
+        return _("Ocorrência de {data} {situacao}").format(
+            data=self.data_original.strftime('%d/%m/%Y %H:%M'),
+            situacao=situacao
+        )
+
+
+class AudienciaCancelada(models.Model):
+    """
+    Registro (tombstone) de um compromisso excluído, para que a sincronização
+    incremental do calendário consiga avisar os clientes sobre o cancelamento.
+    """
+    audiencia_id = models.BigIntegerField(verbose_name=_("ID do compromisso"))
+    advogado_responsavel = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='compromissos_cancelados',
+        verbose_name=_("Advogado responsável")
+    )
+    data_hora = models.DateTimeField(verbose_name=_("Data e hora original"))
+    cancelado_em = models.DateTimeField(auto_now_add=True, verbose_name=_("Cancelado em"))
+
+    class Meta:
+        verbose_name = _("Compromisso cancelado")
+        verbose_name_plural = _("Compromissos cancelados")
+        ordering = ['-cancelado_em']
+        indexes = [
+            models.Index(fields=['advogado_responsavel', 'cancelado_em'], name='cancelada_dono_data_idx'),
+            models.Index(fields=['cancelado_em'], name='cancelada_data_idx'),
+        ]
+
+    def __str__(self):
+        return _("Compromisso {id} cancelado").format(id=self.audiencia_id)
+
+
+class AssinaturaCalendario(models.Model):
+    """Token pessoal usado pelos aplicativos de calendário para assinar o feed ICS."""
+    usuario = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='assinatura_calendario',
+        verbose_name=_("Usuário")
+    )
+    token = models.CharField(max_length=64, unique=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Assinatura de calendário")
+        verbose_name_plural = _("Assinaturas de calendário")
+
+    def __str__(self):
+        return _("Assinatura de {usuario}").format(usuario=self.usuario)
+
+
+class LembreteEnviado(models.Model):
+    """Controle dos lembretes já gerados, para não notificar a mesma ocorrência duas vezes."""
+    audiencia = models.ForeignKey(
+        Audiencia,
+        on_delete=models.CASCADE,
+        related_name='lembretes_enviados'
+    )
+    data_hora = models.DateTimeField(verbose_name=_("Data da ocorrência"))
+    antecedencia = models.PositiveIntegerField(verbose_name=_("Antecedência (minutos)"))
+    enviado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Lembrete enviado")
+        verbose_name_plural = _("Lembretes enviados")
+        constraints = [
+            models.UniqueConstraint(
+                fields=['audiencia', 'data_hora', 'antecedencia'],
+                name='unique_lembrete_por_ocorrencia'
+            ),
+        ]
+
+    def __str__(self):
+        return _("Lembrete de {audiencia} ({minutos} min)").format(
+            audiencia=self.audiencia_id,
+            minutos=self.antecedencia
+        )
+
+
+class CompartilhamentoAgenda(models.Model):
+    """Link somente leitura da agenda do escritório para correspondentes e parceiros."""
+    advogado = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='compartilhamentos_agenda',
+        verbose_name=_("Escritório")
+    )
+    descricao = models.CharField(max_length=120, verbose_name=_("Compartilhado com"))
+    token = models.CharField(max_length=64, unique=True)
+    criado_por = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name=_("Criado por")
+    )
+    criado_em = models.DateTimeField(auto_now_add=True)
+    revogado_em = models.DateTimeField(null=True, blank=True, verbose_name=_("Revogado em"))
+
+    class Meta:
+        verbose_name = _("Compartilhamento de agenda")
+        verbose_name_plural = _("Compartilhamentos de agenda")
+        ordering = ['-criado_em']
+
+    @property
+    def ativo(self):
+        return self.revogado_em is None
+
+    def __str__(self):
+        return _("Agenda compartilhada com {descricao}").format(descricao=self.descricao)
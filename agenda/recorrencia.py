@@ -0,0 +1,190 @@
+# agenda/recorrencia.py
+"""
+Expansão sob demanda de compromissos recorrentes.
+
+Uma série é uma única linha de Audiencia com a regra de repetição. As
+ocorrências são calculadas apenas dentro da janela pedida, pulando direto
+para a primeira ocorrência da janela, então o custo depende do tamanho da
+janela e não de há quanto tempo a série existe. Só exceções (ocorrência
+movida ou cancelada) são gravadas, em ExcecaoRecorrencia.
+"""
+
+import calendar
+from datetime import datetime, timedelta
+
+from django.db import models, transaction
+from django.utils import timezone
+
+from .models import Audiencia, ExcecaoRecorrencia
+
+# Mesmo limite usado na detecção de conflitos
+DURACAO_MAXIMA = timedelta(minutes=Audiencia.DURACAO_MAXIMA_MINUTOS)
+
+# Proteção contra janelas enormes com repetição diária
+LIMITE_OCORRENCIAS_POR_SERIE = 1000
+
+
+class Ocorrencia:
+    """
+    Ocorrência calculada de uma série. Expõe os mesmos atributos do
+    compromisso original, trocando apenas a data/hora.
+    """
+
+    def __init__(self, serie, data_hora):
+        self.serie = serie
+        self.data_hora = data_hora
+
+    def __getattr__(self, nome):
+        return getattr(self.serie, nome)
+
+    @property
+    def data_hora_fim(self):
+        return self.data_hora + timedelta(minutes=self.serie.duracao)
+
+    @property
+    def chave(self):
+        return f"{self.serie.pk}@{self.data_hora.isoformat()}"
+
+    def __str__(self):
+        data = timezone.localtime(self.data_hora).strftime('%d/%m/%Y %H:%M')
+        base = f"{self.serie.get_tipo_display()} {data}"
+        if self.serie.processo:
+            return f"{base} (Proc. {self.serie.processo.numero})"
+        return f"{base} (Cliente: {self.serie.cliente.nome})"
+
+
+def _somar_meses(data, meses):
+    mes = data.month - 1 + meses
+    ano = data.year + mes // 12
+    mes = mes % 12 + 1
+    return data.replace(year=ano, month=mes, day=min(data.day, calendar.monthrange(ano, mes)[1]))
+
+
+def datas_da_serie(serie, inicio, fim):
+    """Início de cada ocorrência da série que se sobrepõe a [inicio, fim)."""
+    duracao = timedelta(minutes=serie.duracao)
+    if not serie.recorrencia:
+        if serie.data_hora < fim and serie.data_hora + duracao > inicio:
+            return [serie.data_hora]
+        return []
+
+    # Repetição no horário local, para manter a hora "de parede" fixa
+    fuso = timezone.get_current_timezone()
+    primeira = timezone.localtime(serie.data_hora, fuso)
+    data_base = primeira.date()
+    hora = primeira.time().replace(tzinfo=None)
+    primeiro_dia = timezone.localtime(max(inicio - duracao, serie.data_hora), fuso).date()
+    intervalo = serie.intervalo_recorrencia or 1
+
+    if serie.recorrencia == 'MENSAL':
+        meses = (primeiro_dia.year - data_base.year) * 12 + primeiro_dia.month - data_base.month - 1
+        indice = max(0, meses // intervalo)
+
+        def data_da_ocorrencia(n):
+            return _somar_meses(data_base, n * intervalo)
+    else:
+        passo_dias = intervalo * (7 if serie.recorrencia == 'SEMANAL' else 1)
+        indice = max(0, ((primeiro_dia - data_base).days - 1) // passo_dias)
+
+        def data_da_ocorrencia(n):
+            return data_base + timedelta(days=n * passo_dias)
+
+    ocorrencias = []
+    for _ in range(LIMITE_OCORRENCIAS_POR_SERIE):
+        data = data_da_ocorrencia(indice)
+        indice += 1
+        if serie.recorrencia_ate and data > serie.recorrencia_ate:
+            break
+        ocorrencia = timezone.make_aware(datetime.combine(data, hora), fuso)
+        if ocorrencia >= fim:
+            break
+        if ocorrencia + duracao > inicio:
+            ocorrencias.append(ocorrencia)
+    return ocorrencias
+
+
+def eh_ocorrencia(serie, data_hora):
+    """Indica se data_hora é uma ocorrência da série ainda sem exceção (movida/cancelada)."""
+    if data_hora not in datas_da_serie(serie, data_hora, data_hora + timedelta(microseconds=1)):
+        return False
+    return not serie.excecoes.filter(data_original=data_hora).exists()
+
+
+def filtro_janela(inicio, fim):
+    """
+    Q com os compromissos avulsos que começam na janela e as séries que
+    podem ter ocorrências nela (começaram antes do fim e não terminaram).
+    """
+    avulsos = models.Q(recorrencia='', data_hora__gte=inicio, data_hora__lt=fim)
+    series = (
+        ~models.Q(recorrencia='')
+        & models.Q(data_hora__lt=fim)
+        & (
+            models.Q(recorrencia_ate__isnull=True)
+            | models.Q(recorrencia_ate__gte=timezone.localtime(inicio - DURACAO_MAXIMA).date())
+        )
+    )
+    return avulsos | series
+
+
+def expandir(compromissos, inicio, fim):
+    """
+    Lista ordenada por data com os compromissos avulsos e as ocorrências das
+    séries dentro de [inicio, fim), já sem as ocorrências com exceção.
+    """
+    compromissos = list(compromissos)
+    series = [compromisso for compromisso in compromissos if compromisso.recorrencia]
+
+    excecoes = set()
+    if series:
+        excecoes = set(ExcecaoRecorrencia.objects.filter(
+            serie__in=series,
+            data_original__gt=inicio - DURACAO_MAXIMA,
+            data_original__lt=fim,
+        ).values_list('serie_id', 'data_original'))
+
+    itens = []
+    for compromisso in compromissos:
+        if not compromisso.recorrencia:
+            itens.append(compromisso)
+            continue
+        for data_hora in datas_da_serie(compromisso, inicio, fim):
+            if (compromisso.pk, data_hora) not in excecoes:
+                itens.append(Ocorrencia(compromisso, data_hora))
+
+    itens.sort(key=lambda item: item.data_hora)
+    return itens
+
+
+def _marcar_serie_alterada(serie):
+    # Invalida ETag e sincronização ICS da série
+    Audiencia.objects.filter(pk=serie.pk).update(atualizado_em=timezone.now())
+
+
+def mover_ocorrencia(serie, data_original, nova_data, usuario=None):
+    """Cria um compromisso avulso no novo horário e registra a exceção na série."""
+    with transaction.atomic():
+        substituta = Audiencia(
+            processo=serie.processo,
+            cliente=serie.cliente,
+            data_hora=nova_data,
+            duracao=serie.duracao,
+            tipo=serie.tipo,
+            local=serie.local,
+            vara=serie.vara,
+            criado_por=usuario,
+        )
+        substituta.save()
+        ExcecaoRecorrencia.objects.update_or_create(
+            serie=serie,
+            data_original=data_original,
+            defaults={'substituta': substituta},
+        )
+        _marcar_serie_alterada(serie)
+    return substituta
+
+
+def cancelar_ocorrencia(serie, data_original):
+    with transaction.atomic():
+        ExcecaoRecorrencia.objects.get_or_create(serie=serie, data_original=data_original)
+        _marcar_serie_alterada(serie)
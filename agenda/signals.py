@@ -0,0 +1,82 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from clientes.models import Cliente
+from processos.models import Processo
+from .compartilhamento import invalidar_agenda
+from .models import Audiencia, AudienciaCancelada, ExcecaoRecorrencia
+
+
+def _transferir_compromissos(compromissos, novo_dono_id):
+    movidos = list(compromissos.values_list('pk', 'advogado_responsavel_id', 'data_hora'))
+    if not movidos:
+        return
+    with transaction.atomic():
+        # Para o feed ICS do dono anterior o compromisso foi cancelado
+        AudienciaCancelada.objects.bulk_create([
+            AudienciaCancelada(audiencia_id=pk, advogado_responsavel_id=dono_id, data_hora=data_hora)
+            for pk, dono_id, data_hora in movidos
+            if dono_id
+        ])
+        # update() não passa pelo auto_now: sem atualizado_em a sincronização
+        # incremental e os lembretes não veriam a troca de dono
+        Audiencia.objects.filter(pk__in=[pk for pk, _dono_id, _data_hora in movidos]).update(
+            advogado_responsavel_id=novo_dono_id,
+            atualizado_em=timezone.now(),
+            versao=F('versao') + 1,
+        )
+    for dono_id in {dono_id for _pk, dono_id, _data_hora in movidos} | {novo_dono_id}:
+        invalidar_agenda(dono_id)
+
+
+# Mantém Audiencia.advogado_responsavel igual ao dono do processo/cliente vinculado
+@receiver(post_save, sender=Processo)
+def sincronizar_dono_por_processo(sender, instance, **kwargs):
+    _transferir_compromissos(
+        Audiencia.objects.filter(processo=instance).exclude(
+            advogado_responsavel_id=instance.advogado_responsavel_id
+        ),
+        instance.advogado_responsavel_id,
+    )
+    # O número do processo aparece na agenda compartilhada
+    invalidar_agenda(instance.advogado_responsavel_id)
+
+
+@receiver(post_save, sender=Cliente)
+def sincronizar_dono_por_cliente(sender, instance, **kwargs):
+    _transferir_compromissos(
+        Audiencia.objects.filter(cliente=instance).exclude(
+            advogado_responsavel_id=instance.advogado_responsavel_id
+        ),
+        instance.advogado_responsavel_id,
+    )
+
+
+# Tombstone para a sincronização incremental do feed ICS
+@receiver(post_delete, sender=Audiencia)
+def registrar_cancelamento(sender, instance, **kwargs):
+    if instance.advogado_responsavel_id:
+        AudienciaCancelada.objects.create(
+            audiencia_id=instance.pk,
+            advogado_responsavel_id=instance.advogado_responsavel_id,
+            data_hora=instance.data_hora,
+        )
+
+
+# Nova versão da agenda compartilhada do escritório a cada alteração
+@receiver(post_save, sender=Audiencia)
+@receiver(post_delete, sender=Audiencia)
+def invalidar_agenda_compartilhada(sender, instance, **kwargs):
+    invalidar_agenda(instance.advogado_responsavel_id)
+
+
+@receiver(post_save, sender=ExcecaoRecorrencia)
+@receiver(post_delete, sender=ExcecaoRecorrencia)
+def invalidar_agenda_por_excecao(sender, instance, **kwargs):
+    dono_id = Audiencia.objects.filter(pk=instance.serie_id).values_list(
+        'advogado_responsavel_id', flat=True
+    ).first()
+    invalidar_agenda(dono_id)
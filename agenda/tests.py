@@ -1,3 +1,429 @@
+import json
+from datetime import date, datetime, time, timedelta
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from clientes.models import Cliente
+from notificacoes.models import Notificacao
+from usuarios.models import PerfilProfissional
+from .conflitos import IndiceIntervalos, buscar_conflitos
+from .disponibilidade import dias_do_periodo, horarios_livres, intervalos_ocupados
+from .lembretes import AgendadorLembretes
+from .models import Audiencia, LembreteEnviado, LogAudiencia
+from .recorrencia import Ocorrencia, cancelar_ocorrencia, datas_da_serie, expandir, mover_ocorrencia
+
+
+def _hora(dia, hora, minuto=0):
+    return timezone.make_aware(datetime(2030, 3, dia, hora, minuto))
+
+
+class AgendaTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dono = User.objects.create_user('dono', 'dono@exemplo.com', 'senha')
+        cls.cliente = Cliente.objects.create(
+            nome='Cliente', cpf_cnpj='12345678901', telefone='1',
+            advogado_responsavel=cls.dono, area_direito='CIVIL',
+        )
+
+    def compromisso(self, data_hora, duracao=60, **campos):
+        return Audiencia.objects.create(
+            cliente=self.cliente, data_hora=data_hora, duracao=duracao, tipo='reuniao', **campos
+        )
+
+
+class BuscarConflitosTests(AgendaTestCase):
+
+    def test_sobreposicao_parcial_e_compromisso_longo_que_comeca_antes(self):
+        longo = self.compromisso(_hora(4, 8), duracao=4 * 60)
+        tarde = self.compromisso(_hora(4, 14))
+        conflitos = buscar_conflitos(self.dono, _hora(4, 11, 30), _hora(4, 14, 30))
+        self.assertEqual([item.pk for item in conflitos], [longo.pk, tarde.pk])
+
+    def test_intervalos_encostados_nao_conflitam(self):
+        self.compromisso(_hora(4, 9))
+        self.assertEqual(buscar_conflitos(self.dono, _hora(4, 10), _hora(4, 11)), [])
+        self.assertEqual(buscar_conflitos(self.dono, _hora(4, 8), _hora(4, 9)), [])
+
+    def test_ignora_o_proprio_compromisso_e_outros_escritorios(self):
+        proprio = self.compromisso(_hora(4, 9))
+        outro = User.objects.create_user('outro', 'outro@exemplo.com', 'senha')
+        Audiencia.objects.create(
+            cliente=Cliente.objects.create(
+                nome='Outro', cpf_cnpj='12345678902', telefone='1',
+                advogado_responsavel=outro, area_direito='CIVIL',
+            ),
+            data_hora=_hora(4, 9), tipo='reuniao',
+        )
+        self.assertEqual(buscar_conflitos(self.dono, _hora(4, 9), _hora(4, 10), ignorar_pk=proprio.pk), [])
+
+    def test_ocorrencia_de_serie_conflita(self):
+        serie = self.compromisso(_hora(4, 9), recorrencia='SEMANAL')
+        conflitos = buscar_conflitos(self.dono, _hora(18, 9, 30), _hora(18, 10, 30))
+        self.assertEqual(len(conflitos), 1)
+        self.assertEqual(conflitos[0].serie.pk, serie.pk)
+        self.assertEqual(conflitos[0].data_hora, _hora(18, 9))
+
+
+class IndiceIntervalosTests(AgendaTestCase):
+
+    def test_conflitos_inserir_e_mover(self):
+        indice = IndiceIntervalos([
+            (_hora(4, 9), _hora(4, 10), 1),
+            (_hora(4, 8), _hora(4, 20), 2),
+        ])
+        self.assertEqual(sorted(indice.conflitos(_hora(4, 9, 30), _hora(4, 9, 45))), [1, 2])
+        self.assertEqual(indice.conflitos(_hora(4, 9, 30), _hora(4, 9, 45), ignorar=1), [2])
+        self.assertEqual(indice.conflitos(_hora(4, 20), _hora(4, 21)), [])
+
+        indice.inserir(_hora(5, 9), _hora(5, 10), 3)
+        self.assertEqual(indice.conflitos(_hora(5, 9, 59), _hora(5, 11)), [3])
+        indice.mover(3, _hora(6, 9), _hora(6, 10))
+        self.assertEqual(indice.conflitos(_hora(5, 9, 59), _hora(5, 11)), [])
+        self.assertEqual(len(indice), 3)
+
+    def test_remover_compromisso_tira_todas_as_ocorrencias_da_serie(self):
+        indice = IndiceIntervalos([
+            (_hora(4, 9), _hora(4, 10), (7, _hora(4, 9))),
+            (_hora(11, 9), _hora(11, 10), (7, _hora(11, 9))),
+            (_hora(4, 11), _hora(4, 12), 8),
+        ])
+        indice.remover_compromisso(7)
+        self.assertNotIn((7, _hora(4, 9)), indice)
+        self.assertEqual(indice.conflitos(_hora(4, 9), _hora(12, 0)), [8])
+
+    def test_carregar_usa_as_chaves_de_series_e_avulsos(self):
+        antigo = self.compromisso(_hora(2, 14))
+        avulso = self.compromisso(_hora(5, 14))
+        serie = self.compromisso(_hora(4, 9), recorrencia='DIARIA')
+        indice = IndiceIntervalos.carregar(self.dono, _hora(5, 0), _hora(6, 0))
+        self.assertIn((serie.pk, _hora(5, 9)), indice)
+        self.assertIn(avulso.pk, indice)
+        self.assertNotIn(antigo.pk, indice)
+        self.assertEqual(indice.conflitos(_hora(5, 9, 30), _hora(5, 9, 40)), [(serie.pk, _hora(5, 9))])
+
+
+class RecorrenciaTests(AgendaTestCase):
+
+    def test_semanal_a_cada_duas_semanas_ate_a_data_final(self):
+        serie = self.compromisso(
+            _hora(4, 9), recorrencia='SEMANAL', intervalo_recorrencia=2, recorrencia_ate=_hora(31, 0).date()
+        )
+        self.assertEqual(
+            datas_da_serie(serie, _hora(1, 0), _hora(31, 23)),
+            [_hora(4, 9), _hora(18, 9)],
+        )
+
+    def test_mensal_no_dia_31_usa_o_ultimo_dia_dos_meses_curtos(self):
+        serie = self.compromisso(timezone.make_aware(datetime(2030, 1, 31, 14)), recorrencia='MENSAL')
+        datas = datas_da_serie(
+            serie, timezone.make_aware(datetime(2030, 2, 1)), timezone.make_aware(datetime(2030, 5, 1))
+        )
+        self.assertEqual([timezone.localtime(data).date().isoformat() for data in datas], [
+            '2030-02-28', '2030-03-31', '2030-04-30',
+        ])
+
+    def test_serie_antiga_expande_so_a_janela(self):
+        serie = self.compromisso(timezone.make_aware(datetime(2000, 1, 3, 9)), recorrencia='DIARIA')
+        self.assertEqual(datas_da_serie(serie, _hora(4, 0), _hora(5, 0)), [_hora(4, 9)])
+
+    def test_ocorrencia_que_comecou_antes_da_janela_entra_enquanto_dura(self):
+        serie = self.compromisso(_hora(4, 9), duracao=120, recorrencia='DIARIA')
+        self.assertEqual(datas_da_serie(serie, _hora(5, 10), _hora(5, 12)), [_hora(5, 9)])
+        self.assertEqual(datas_da_serie(serie, _hora(5, 11), _hora(5, 12)), [])
+
+    def test_expandir_ordena_e_pula_ocorrencias_com_excecao(self):
+        serie = self.compromisso(_hora(4, 9), recorrencia='DIARIA')
+        avulso = self.compromisso(_hora(5, 8))
+        cancelar_ocorrencia(serie, _hora(6, 9))
+        substituta = mover_ocorrencia(serie, _hora(7, 9), _hora(7, 15))
+
+        itens = expandir(Audiencia.objects.all(), _hora(5, 0), _hora(8, 0))
+        self.assertEqual([(item.pk, item.data_hora) for item in itens], [
+            (avulso.pk, _hora(5, 8)),
+            (serie.pk, _hora(5, 9)),
+            (substituta.pk, _hora(7, 15)),
+        ])
+        self.assertIsInstance(itens[1], Ocorrencia)
+        self.assertEqual(itens[1].data_hora_fim, _hora(5, 10))
+
+
+class AgendadorLembretesTests(AgendaTestCase):
+    # atualizado_em vem do relógio real: os horários do teste partem de agora
+
+    def setUp(self):
+        self.agora = timezone.now().replace(microsecond=0)
+        self.inicio = self.agora + timedelta(hours=3)
+        self.agendador = AgendadorLembretes(antecedencias=[60])
+        self.agendador.iniciar(self.agora)
+
+    def test_dispara_uma_vez_quando_vence(self):
+        compromisso = self.compromisso(self.inicio)
+        self.agendador.sincronizar(self.agora)
+
+        self.assertEqual(self.agendador.executar_ciclo(self.inicio - timedelta(minutes=61)), 0)
+        self.assertEqual(self.agendador.executar_ciclo(self.inicio - timedelta(minutes=59)), 1)
+        self.assertEqual(self.agendador.executar_ciclo(self.inicio - timedelta(minutes=58)), 0)
+
+        self.assertEqual(Notificacao.objects.get().usuario, self.dono)
+        self.assertEqual(
+            list(LembreteEnviado.objects.values_list('audiencia_id', 'data_hora', 'antecedencia')),
+            [(compromisso.pk, self.inicio, 60)],
+        )
+
+    def test_entrada_antiga_de_compromisso_remarcado_e_descartada(self):
+        compromisso = self.compromisso(self.inicio)
+        self.agendador.sincronizar(self.agora)
+        compromisso.data_hora = self.inicio + timedelta(hours=2)
+        compromisso.save()
+
+        self.assertEqual(self.agendador.executar_ciclo(self.inicio - timedelta(minutes=59)), 0)
+        self.assertEqual(self.agendador.executar_ciclo(self.inicio + timedelta(minutes=61)), 1)
+        self.assertEqual(LembreteEnviado.objects.get().data_hora, self.inicio + timedelta(hours=2))
+
+    def test_compromisso_excluido_nao_dispara(self):
+        compromisso = self.compromisso(self.inicio)
+        self.agendador.sincronizar(self.agora)
+        compromisso.delete()
+
+        self.assertEqual(self.agendador.executar_ciclo(self.inicio - timedelta(minutes=59)), 0)
+        self.assertFalse(Notificacao.objects.exists())
+
+    def test_fila_e_ordenada_pelo_disparo(self):
+        tarde = self.compromisso(self.inicio + timedelta(hours=1))
+        cedo = self.compromisso(self.inicio)
+        self.agendador.iniciar(self.agora)
+        self.assertEqual([entrada[1] for entrada in sorted(self.agendador.fila)], [cedo.pk, tarde.pk])
+        self.assertEqual(self.agendador.fila[0][1], cedo.pk)
+
+
+class HorariosLivresTests(AgendaTestCase):
+    ABERTURA = time(9)
+    FECHAMENTO = time(18)
+
+    def livres(self, ocupados, dias, duracao_minima=timedelta(minutes=30), a_partir_de=None):
+        return horarios_livres(ocupados, dias, self.ABERTURA, self.FECHAMENTO, duracao_minima, a_partir_de)
+
+    def test_lacunas_entre_compromissos_sobrepostos(self):
+        ocupados = [
+            (_hora(4, 8), _hora(4, 10)),
+            (_hora(4, 11), _hora(4, 13)),
+            (_hora(4, 12), _hora(4, 12, 30)),
+            (_hora(4, 13, 15), _hora(4, 17, 45)),
+        ]
+        self.assertEqual(self.livres(ocupados, [date(2030, 3, 4)]), [
+            (_hora(4, 10), _hora(4, 11)),
+        ])
+        self.assertEqual(self.livres(ocupados, [date(2030, 3, 4)], duracao_minima=timedelta(minutes=15)), [
+            (_hora(4, 10), _hora(4, 11)),
+            (_hora(4, 13), _hora(4, 13, 15)),
+            (_hora(4, 17, 45), _hora(4, 18)),
+        ])
+
+    def test_compromisso_que_atravessa_a_noite_ocupa_os_dois_dias(self):
+        ocupados = [(_hora(4, 17), _hora(5, 10))]
+        self.assertEqual(self.livres(ocupados, [date(2030, 3, 4), date(2030, 3, 5)]), [
+            (_hora(4, 9), _hora(4, 17)),
+            (_hora(5, 10), _hora(5, 18)),
+        ])
+
+    def test_dia_sem_compromissos_e_a_partir_de(self):
+        self.assertEqual(self.livres([], [date(2030, 3, 4)], a_partir_de=_hora(4, 16)), [
+            (_hora(4, 16), _hora(4, 18)),
+        ])
+        self.assertEqual(self.livres([], [date(2030, 3, 4)], a_partir_de=_hora(4, 19)), [])
+
+    def test_dias_do_periodo_pula_fins_de_semana(self):
+        # 2030-03-08 é sexta-feira
+        self.assertEqual(
+            list(dias_do_periodo(date(2030, 3, 8), date(2030, 3, 11))),
+            [date(2030, 3, 8), date(2030, 3, 11)],
+        )
+
+    def test_intervalos_ocupados_inclui_series_e_compromisso_que_comecou_antes(self):
+        self.compromisso(_hora(3, 23), duracao=11 * 60)
+        self.compromisso(_hora(4, 9), recorrencia='DIARIA')
+        ocupados = intervalos_ocupados(self.dono, _hora(4, 0), _hora(5, 0))
+        self.assertEqual(ocupados, [(_hora(3, 23), _hora(4, 10)), (_hora(4, 9), _hora(4, 10))])
+        self.assertEqual(self.livres(ocupados, [date(2030, 3, 4)]), [(_hora(4, 10), _hora(4, 18))])
+
+
+class AgendaViewTestCase(AgendaTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        PerfilProfissional.objects.create(usuario=cls.dono, nome_completo='Dono', cpf='1', oab='1')
+
+    def setUp(self):
+        self.client.force_login(self.dono)
+
+
+class EdicaoConcorrenteTests(AgendaViewTestCase):
+
+    def editar(self, compromisso, versao, data_hora):
+        return self.client.post(reverse('agenda:editar_audiencia', args=[compromisso.pk]), {
+            'cliente': self.cliente.pk,
+            'data_hora': data_hora.strftime('%Y-%m-%dT%H:%M'),
+            'duracao': compromisso.duracao,
+            'tipo': compromisso.tipo,
+            'local': 'Escritório',
+            'intervalo_recorrencia': 1,
+            'versao': versao,
+        })
+
+    def reagendar(self, compromisso, **dados):
+        return self.client.post(
+            reverse('agenda:reagendar_audiencia_json', args=[compromisso.pk]),
+            json.dumps(dados), content_type='application/json',
+        )
+
+    def test_formulario_com_a_versao_exibida_grava(self):
+        compromisso = self.compromisso(_hora(4, 9))
+        response = self.editar(compromisso, 1, _hora(4, 11))
+        self.assertRedirects(response, reverse('agenda:detalhe_audiencia', args=[compromisso.pk]))
+        compromisso.refresh_from_db()
+        self.assertEqual((compromisso.data_hora, compromisso.versao), (_hora(4, 11), 2))
+
+    def test_formulario_com_versao_antiga_responde_409_sem_gravar(self):
+        compromisso = self.compromisso(_hora(4, 9))
+        # Outra pessoa salvou depois que o formulário foi aberto
+        Audiencia.objects.get(pk=compromisso.pk).save()
+
+        response = self.editar(compromisso, 1, _hora(4, 11))
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('alterado por outra pessoa', response.content.decode())
+        compromisso.refresh_from_db()
+        self.assertEqual((compromisso.data_hora, compromisso.versao), (_hora(4, 9), 2))
+
+    def test_arrastar_com_a_versao_atual_grava_e_devolve_a_nova(self):
+        compromisso = self.compromisso(_hora(4, 9))
+        response = self.reagendar(compromisso, data_hora=_hora(4, 14).isoformat(), versao=1)
+        self.assertEqual(response.json(), {'status': 'success', 'versao': 2})
+        compromisso.refresh_from_db()
+        self.assertEqual(compromisso.data_hora, _hora(4, 14))
+        self.assertEqual(LogAudiencia.objects.filter(audiencia=compromisso).count(), 1)
+
+    def test_arrastar_com_versao_antiga_responde_409(self):
+        compromisso = self.compromisso(_hora(4, 9))
+        Audiencia.objects.get(pk=compromisso.pk).save()
+
+        response = self.reagendar(compromisso, data_hora=_hora(4, 14).isoformat(), versao=1)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['status'], 'conflito_versao')
+        self.assertEqual(response.json()['versao_atual'], 2)
+        compromisso.refresh_from_db()
+        self.assertEqual(compromisso.data_hora, _hora(4, 9))
+        self.assertFalse(LogAudiencia.objects.filter(audiencia=compromisso).exists())
+
+
+class ReagendarLoteTests(AgendaViewTestCase):
+
+    def reagendar(self, itens, **dados):
+        return self.client.post(
+            reverse('agenda:reagendar_lote_json'),
+            json.dumps({'itens': itens, 'motivo': 'Expediente suspenso', **dados}),
+            content_type='application/json',
+        )
+
+    def test_move_todos_em_uma_gravacao_e_aceita_troca_de_horario(self):
+        manha = self.compromisso(_hora(4, 9))
+        tarde = Audiencia.objects.create(
+            cliente=Cliente.objects.create(
+                nome='Segundo', cpf_cnpj='12345678903', telefone='1',
+                advogado_responsavel=self.dono, area_direito='CIVIL',
+            ),
+            data_hora=_hora(4, 14), duracao=60, tipo='reuniao',
+        )
+        response = self.reagendar([
+            {'id': manha.pk, 'data_hora': _hora(4, 14).isoformat(), 'versao': 1},
+            {'id': tarde.pk, 'data_hora': _hora(4, 9).isoformat()},
+        ])
+        self.assertEqual(response.json(), {
+            'status': 'success',
+            'alterados': 2,
+            'resultados': [
+                {'id': manha.pk, 'status': 'success', 'versao': 2},
+                {'id': tarde.pk, 'status': 'success', 'versao': 2},
+            ],
+        })
+        manha.refresh_from_db()
+        tarde.refresh_from_db()
+        self.assertEqual((manha.data_hora, manha.versao), (_hora(4, 14), 2))
+        self.assertEqual((tarde.data_hora, tarde.versao), (_hora(4, 9), 2))
+        self.assertEqual(
+            list(LogAudiencia.objects.order_by('audiencia_id').values_list('audiencia_id', 'data_anterior', 'motivo')),
+            [(manha.pk, _hora(4, 9), 'Expediente suspenso'), (tarde.pk, _hora(4, 14), 'Expediente suspenso')],
+        )
+
+    def test_itens_invalidos_repetidos_ou_de_outro_escritorio_nao_impedem_os_demais(self):
+        compromisso = self.compromisso(_hora(4, 9))
+        outro = User.objects.create_user('outro', 'outro@exemplo.com', 'senha')
+        alheio = Audiencia.objects.create(
+            cliente=Cliente.objects.create(
+                nome='Outro', cpf_cnpj='12345678902', telefone='1',
+                advogado_responsavel=outro, area_direito='CIVIL',
+            ),
+            data_hora=_hora(4, 9), tipo='reuniao',
+        )
+        response = self.reagendar([
+            {'id': compromisso.pk, 'data_hora': _hora(5, 9).isoformat()},
+            {'id': compromisso.pk, 'data_hora': _hora(6, 9).isoformat()},
+            {'id': alheio.pk, 'data_hora': _hora(5, 9).isoformat()},
+            {'id': 'x', 'data_hora': _hora(5, 9).isoformat()},
+        ])
+        self.assertEqual(response.json()['alterados'], 1)
+        self.assertEqual([item['status'] for item in response.json()['resultados']],
+                         ['success', 'error', 'error', 'error'])
+        compromisso.refresh_from_db()
+        alheio.refresh_from_db()
+        self.assertEqual(compromisso.data_hora, _hora(5, 9))
+        self.assertEqual(alheio.data_hora, _hora(4, 9))
+
+    def test_versao_antiga_fica_de_fora(self):
+        desatualizado = self.compromisso(_hora(4, 9))
+        atual = self.compromisso(_hora(4, 11))
+        Audiencia.objects.get(pk=desatualizado.pk).save()
+
+        response = self.reagendar([
+            {'id': desatualizado.pk, 'data_hora': _hora(5, 9).isoformat(), 'versao': 1},
+            {'id': atual.pk, 'data_hora': _hora(5, 11).isoformat(), 'versao': 1},
+        ])
+        conflito, sucesso = response.json()['resultados']
+        self.assertEqual((conflito['status'], conflito['versao_atual']), ('conflito_versao', 2))
+        self.assertEqual(sucesso['status'], 'success')
+        desatualizado.refresh_from_db()
+        self.assertEqual((desatualizado.data_hora, desatualizado.versao), (_hora(4, 9), 2))
+
+    def test_conflito_de_horario_so_grava_com_forcar(self):
+        self.compromisso(_hora(5, 9))
+        compromisso = self.compromisso(_hora(4, 9))
+        item = {'id': compromisso.pk, 'data_hora': _hora(5, 9, 30).isoformat()}
+
+        response = self.reagendar([item])
+        self.assertEqual(response.json()['alterados'], 0)
+        self.assertEqual(response.json()['resultados'][0]['status'], 'conflito')
+        compromisso.refresh_from_db()
+        self.assertEqual(compromisso.data_hora, _hora(4, 9))
+
+        response = self.reagendar([item], forcar=True)
+        self.assertEqual(response.json()['alterados'], 1)
+        compromisso.refresh_from_db()
+        self.assertEqual(compromisso.data_hora, _hora(5, 9, 30))
 
-# Create your tests here.
+    def test_mesmo_cliente_no_mesmo_horario_nao_altera_nada(self):
+        self.compromisso(_hora(5, 9))
+        primeiro = self.compromisso(_hora(4, 9))
+        segundo = self.compromisso(_hora(4, 11))
+        response = self.reagendar([
+            {'id': segundo.pk, 'data_hora': _hora(6, 9).isoformat()},
+            {'id': primeiro.pk, 'data_hora': _hora(5, 9).isoformat()},
+        ], forcar=True)
+        self.assertEqual(response.status_code, 409)
+        segundo.refresh_from_db()
+        self.assertEqual((segundo.data_hora, segundo.versao), (_hora(4, 11), 1))
+        self.assertFalse(LogAudiencia.objects.exists())
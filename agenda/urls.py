@@ -12,13 +12,30 @@ urlpatterns = [
     # Audiências
     path('audiencias/', login_required(views.AudienciaListView.as_view()), name='lista_audiencias'),
     path('audiencias/novo/', login_required(views.AudienciaCreateView.as_view()), name='nova_audiencia'),
+    path('audiencias/importar-pauta/', login_required(views.ImportarPautaView.as_view()), name='importar_pauta'),
     path('audiencias/<int:pk>/', login_required(views.AudienciaDetailView.as_view()), name='detalhe_audiencia'),
     path('audiencias/<int:pk>/editar/', login_required(views.AudienciaUpdateView.as_view()), name='editar_audiencia'),
     path('audiencias/<int:pk>/cancelar/', login_required(views.cancelar_audiencia), name='cancelar_audiencia'),
+    path('audiencias/<int:pk>/cancelar-ocorrencia/', login_required(views.cancelar_ocorrencia_view), name='cancelar_ocorrencia'),
     
     # API para calendário
     path('api/eventos/', login_required(views.EventosJsonView.as_view()), name='api_eventos'),
+    path('api/resumo-diario/', login_required(views.ResumoDiarioJsonView.as_view()), name='api_resumo_diario'),
+    path('api/foruns/', login_required(views.ForunsAutocompleteJsonView.as_view()), name='api_foruns'),
+    path('api/resumo-foruns/', login_required(views.ResumoForunsJsonView.as_view()), name='api_resumo_foruns'),
+    path('api/horarios-livres/', login_required(views.HorariosLivresJsonView.as_view()), name='api_horarios_livres'),
     path('audiencias/<int:pk>/reagendar/', views.ReagendarAudienciaJsonView.as_view(), name='reagendar_audiencia_json'),
+    path('api/reagendar-lote/', login_required(views.ReagendarLoteJsonView.as_view()), name='reagendar_lote_json'),
+
+    # Assinatura ICS (celulares / aplicativos de calendário)
+    path('assinatura/', views.link_assinatura_ics, name='link_assinatura_ics'),
+    path('ics/<str:token>/agenda.ics', views.AgendaIcsView.as_view(), name='feed_ics'),
+
+    # Agenda compartilhada (correspondentes e parceiros, somente leitura)
+    path('compartilhamentos/', login_required(views.CompartilhamentosView.as_view()), name='compartilhamentos'),
+    path('compartilhamentos/<int:pk>/revogar/', views.revogar_compartilhamento, name='revogar_compartilhamento'),
+    path('compartilhada/<str:token>/', views.AgendaCompartilhadaView.as_view(), name='agenda_compartilhada'),
+    path('compartilhada/<str:token>/eventos.json', views.AgendaCompartilhadaView.as_view(formato='json'), name='agenda_compartilhada_json'),
 
 
 ]
\ No newline at end of file
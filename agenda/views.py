@@ -3,22 +3,46 @@
 from django.views.generic import ListView, CreateView, DetailView, UpdateView, TemplateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.shortcuts import get_object_or_404, render, redirect
-from django.http import JsonResponse, Http404
+from django.http import JsonResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_http_date_safe
 from django.urls import reverse_lazy
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
-from django.utils.dateparse import parse_datetime
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.utils.dateparse import parse_datetime, parse_date, parse_time
+from django.utils import timezone
+from django.db.models.functions import TruncDate
+from datetime import datetime, time, timedelta, timezone as dt_timezone
 from django.contrib.auth.decorators import login_required
-from django.db import models
+from django.db import models, transaction, IntegrityError
+import hashlib
 import json
+import secrets
 from django.contrib import messages
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.template.loader import render_to_string
 from django.core.exceptions import ValidationError
 
-from .models import Audiencia, LogAudiencia
+from .models import (
+    Audiencia, LogAudiencia, AudienciaCancelada, AssinaturaCalendario, Forum, CompartilhamentoAgenda
+)
+from .recorrencia import expandir, filtro_janela, eh_ocorrencia, mover_ocorrencia, cancelar_ocorrencia
+from . import ical
 from processos.models import Processo
+from clientes.models import Cliente
 from notificacoes.models import Notificacao
 from .forms import AudienciaForm
-from usuarios.utils import exige_permissao, advogado_dono
+from .conflitos import buscar_conflitos, descrever_conflitos, IndiceIntervalos
+from .importacao import ErroPauta, importar_pauta, ler_pauta
+from .disponibilidade import intervalos_ocupados, horarios_livres, dias_do_periodo
+from .compartilhamento import (
+    compartilhamento_por_token, chave_conteudo, periodo_compartilhado, eventos_compartilhados,
+    invalidar_agenda, COMPARTILHAMENTO_CACHE_SEGUNDOS
+)
+from core.models import ConflitoDeVersao
+from usuarios.utils import exige_permissao, advogado_dono, advogado_do_usuario, tem_permissao
 
 # --- Views da Agenda e Calendário ---
 
@@ -26,17 +50,102 @@ from usuarios.utils import exige_permissao, advogado_dono
 class AgendaView(LoginRequiredMixin, TemplateView):
     template_name = 'agenda/agenda.html'
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['pode_compartilhar'] = tem_permissao(self.request.user, 'compartilhar_agenda')
+        return context
+
+# Janela usada quando o cliente não informa start/end (ex.: chamadas manuais à API)
+JANELA_PADRAO_DIAS_ANTES = 31
+JANELA_PADRAO_DIAS_DEPOIS = 62
+
+
+def _parse_limite(valor):
+    """Converte o parâmetro start/end do FullCalendar em datetime aware."""
+    if not valor:
+        return None
+    # O '+' do fuso horário chega como espaço quando não vem codificado na URL
+    valor = valor.strip().replace(' ', '+')
+    try:
+        data_hora = parse_datetime(valor)
+        if data_hora is None:
+            data = parse_date(valor)
+            if data is None:
+                return None
+            data_hora = datetime.combine(data, time.min)
+    except ValueError:
+        return None
+    if timezone.is_naive(data_hora):
+        data_hora = timezone.make_aware(data_hora)
+    return data_hora
+
+
+def janela_da_requisicao(request):
+    """
+    Retorna o intervalo [inicio, fim) pedido pelo calendário.
+    O FullCalendar envia 'start' e 'end' a cada mudança de visualização.
+    """
+    inicio = _parse_limite(request.GET.get('start'))
+    fim = _parse_limite(request.GET.get('end'))
+    agora = timezone.now()
+    if inicio is None and fim is None:
+        inicio = agora - timedelta(days=JANELA_PADRAO_DIAS_ANTES)
+        fim = agora + timedelta(days=JANELA_PADRAO_DIAS_DEPOIS)
+    elif inicio is None:
+        inicio = fim - timedelta(days=JANELA_PADRAO_DIAS_ANTES + JANELA_PADRAO_DIAS_DEPOIS)
+    elif fim is None:
+        fim = inicio + timedelta(days=JANELA_PADRAO_DIAS_ANTES + JANELA_PADRAO_DIAS_DEPOIS)
+    return inicio, fim
+
+
+def _compromissos_na_janela(dono, inicio, fim):
+    """Avulsos que começam na janela + séries recorrentes que podem ocorrer nela."""
+    return Audiencia.objects.filter(advogado_responsavel=dono).filter(filtro_janela(inicio, fim))
+
+
+def etag_eventos(request, *args, **kwargs):
+    """
+    Carimbo de versão barato da janela pedida: última alteração + total de linhas.
+    Se nada mudou, o navegador recebe 304 sem serializar os eventos.
+    """
+    dono = advogado_dono(request)
+    inicio, fim = janela_da_requisicao(request)
+    if fim <= inicio:
+        return None
+
+    carimbo = _compromissos_na_janela(dono, inicio, fim).aggregate(
+        ultima_alteracao=models.Max('atualizado_em'),
+        total=models.Count('id'),
+    )
+    ultima = carimbo['ultima_alteracao']
+    base = '|'.join([
+        str(dono.pk),
+        inicio.isoformat(),
+        fim.isoformat(),
+        ultima.isoformat() if ultima else '-',
+        str(carimbo['total']),
+    ])
+    return hashlib.md5(base.encode()).hexdigest()
+
+
 @method_decorator(exige_permissao('ver_agenda'), name='dispatch')
+@method_decorator(cache_control(private=True, no_cache=True), name='dispatch')
+@method_decorator(condition(etag_func=etag_eventos), name='dispatch')
 class EventosJsonView(LoginRequiredMixin, View):
     def get(self, request):
         dono = advogado_dono(request)
-        compromissos = Audiencia.objects.filter(
-            models.Q(processo__advogado_responsavel=dono) | 
-            models.Q(cliente__advogado_responsavel=dono)
-        ).select_related('processo', 'processo__cliente', 'cliente').distinct()
+        inicio, fim = janela_da_requisicao(request)
+        if fim <= inicio:
+            return JsonResponse({'status': 'error', 'mensagem': 'Intervalo inválido'}, status=400)
+
+        # Carrega apenas a janela visível do calendário (usa o índice em data_hora)
+        compromissos = _compromissos_na_janela(dono, inicio, fim).select_related(
+            'processo', 'processo__cliente', 'cliente'
+        )
 
         eventos_formatados = []
-        for compromisso in compromissos:
+        # Séries recorrentes são expandidas só dentro da janela pedida
+        for compromisso in expandir(compromissos, inicio, fim):
             if compromisso.processo:
                 titulo = f"Proc: {compromisso.processo.numero} - {compromisso.processo.cliente.nome}"
                 cliente_nome = compromisso.processo.cliente.nome
@@ -46,34 +155,278 @@ class EventosJsonView(LoginRequiredMixin, View):
                 cliente_nome = compromisso.cliente.nome
                 processo_numero = "N/A"
 
+            ocorrencia = compromisso.data_hora.isoformat() if compromisso.recorrencia else None
             eventos_formatados.append({
-                'id': compromisso.id,
+                'id': compromisso.chave if compromisso.recorrencia else compromisso.id,
                 'title': titulo,
                 'start': compromisso.data_hora.isoformat(),
+                'end': compromisso.data_hora_fim.isoformat(),
                 'allDay': False,
                 'extendedProps': {
+                    'audiencia_id': compromisso.id,
+                    'ocorrencia': ocorrencia,
                     'tipo_evento': compromisso.get_tipo_display(),
                     'local': compromisso.local,
+                    'versao': compromisso.versao,
                     'processo_numero': processo_numero,
                     'cliente_nome': cliente_nome
                 }
             })
         return JsonResponse(eventos_formatados, safe=False)
 
+# Visão anual: um ano inteiro com folga para as semanas parciais das bordas
+RESUMO_DIARIO_MAXIMO_DIAS = 400
+
+
+@method_decorator(exige_permissao('ver_agenda'), name='dispatch')
+@method_decorator(cache_control(private=True, no_cache=True), name='dispatch')
+@method_decorator(condition(etag_func=etag_eventos), name='dispatch')
+class ResumoDiarioJsonView(LoginRequiredMixin, View):
+    """
+    Totais de compromissos por dia (e por tipo) para as visões de mês/ano.
+    Os avulsos são agrupados no banco; só as séries recorrentes são
+    expandidas em memória.
+    """
+
+    def get(self, request):
+        dono = advogado_dono(request)
+        inicio, fim = janela_da_requisicao(request)
+        if fim <= inicio or (fim - inicio).days > RESUMO_DIARIO_MAXIMO_DIAS:
+            return JsonResponse({'status': 'error', 'mensagem': 'Intervalo inválido'}, status=400)
+
+        compromissos = Audiencia.objects.filter(advogado_responsavel=dono)
+        por_dia = (
+            compromissos.filter(recorrencia='', data_hora__gte=inicio, data_hora__lt=fim)
+            .annotate(dia=TruncDate('data_hora', tzinfo=timezone.get_current_timezone()))
+            .values('dia', 'tipo')
+            .annotate(total=models.Count('id'))
+            .order_by()
+        )
+
+        dias = {}
+
+        def somar(dia, tipo, quantidade):
+            resumo = dias.setdefault(dia.isoformat(), {'total': 0, 'tipos': {}})
+            resumo['total'] += quantidade
+            resumo['tipos'][tipo] = resumo['tipos'].get(tipo, 0) + quantidade
+
+        for linha in por_dia:
+            somar(linha['dia'], linha['tipo'], linha['total'])
+
+        series = compromissos.exclude(recorrencia='').filter(filtro_janela(inicio, fim)).only(
+            'pk', 'data_hora', 'duracao', 'tipo', 'recorrencia', 'intervalo_recorrencia', 'recorrencia_ate'
+        )
+        for ocorrencia in expandir(series, inicio, fim):
+            if inicio <= ocorrencia.data_hora < fim:
+                somar(timezone.localdate(ocorrencia.data_hora), ocorrencia.tipo, 1)
+
+        return JsonResponse({
+            'status': 'success',
+            'tipos': dict(Audiencia.TIPOS_AUDIENCIA),
+            'dias': dict(sorted(dias.items())),
+        })
+
+@method_decorator(exige_permissao('ver_agenda'), name='dispatch')
+class ForunsAutocompleteJsonView(LoginRequiredMixin, View):
+    """Sugestões de vara/fórum pelo início do nome, ignorando acentos e caixa."""
+
+    def get(self, request):
+        foruns = Forum.buscar_prefixo(request.GET.get('q', ''))
+        return JsonResponse({
+            'status': 'success',
+            'foruns': [{'id': forum.pk, 'nome': forum.nome} for forum in foruns],
+        })
+
+
+@method_decorator(exige_permissao('ver_agenda'), name='dispatch')
+class ResumoForunsJsonView(LoginRequiredMixin, View):
+    """Total de compromissos por vara/fórum no período (start/end)."""
+
+    def get(self, request):
+        dono = advogado_dono(request)
+        inicio, fim = janela_da_requisicao(request)
+        if fim <= inicio or (fim - inicio).days > RESUMO_DIARIO_MAXIMO_DIAS:
+            return JsonResponse({'status': 'error', 'mensagem': 'Intervalo inválido'}, status=400)
+
+        compromissos = Audiencia.objects.filter(advogado_responsavel=dono)
+        totais = {
+            linha['forum_id']: linha['total']
+            for linha in compromissos.filter(recorrencia='', data_hora__gte=inicio, data_hora__lt=fim)
+            .values('forum_id')
+            .annotate(total=models.Count('id'))
+            .order_by()
+        }
+
+        series = compromissos.exclude(recorrencia='').filter(filtro_janela(inicio, fim)).only(
+            'pk', 'data_hora', 'duracao', 'forum', 'recorrencia', 'intervalo_recorrencia', 'recorrencia_ate'
+        )
+        for ocorrencia in expandir(series, inicio, fim):
+            if inicio <= ocorrencia.data_hora < fim:
+                totais[ocorrencia.forum_id] = totais.get(ocorrencia.forum_id, 0) + 1
+
+        nomes = Forum.objects.in_bulk([pk for pk in totais if pk])
+        foruns = [
+            {
+                'id': pk,
+                'nome': nomes[pk].nome if pk else 'Não informado',
+                'total': total,
+            }
+            for pk, total in totais.items()
+        ]
+        foruns.sort(key=lambda item: (-item['total'], item['nome']))
+        return JsonResponse({'status': 'success', 'foruns': foruns})
+
+# Limite do período consultado em horários livres
+HORARIOS_LIVRES_MAXIMO_DIAS = 62
+
+
+@method_decorator(exige_permissao('ver_agenda'), name='dispatch')
+class HorariosLivresJsonView(LoginRequiredMixin, View):
+    """
+    Horários livres do escritório no período.
+
+    Parâmetros: inicio, fim (AAAA-MM-DD), expediente_inicio/expediente_fim
+    (HH:MM, padrão 08:00-18:00), duracao_minima (minutos, padrão 30) e
+    fins_de_semana=1 para incluir sábados e domingos.
+    """
+
+    def get(self, request):
+        hoje = timezone.localdate()
+        try:
+            data_inicio = parse_date(request.GET.get('inicio', '')) or hoje
+            data_fim = parse_date(request.GET.get('fim', '')) or data_inicio + timedelta(days=6)
+            abertura = parse_time(request.GET.get('expediente_inicio', '') or '08:00')
+            fechamento = parse_time(request.GET.get('expediente_fim', '') or '18:00')
+            duracao_minima = int(request.GET.get('duracao_minima') or 30)
+        except ValueError:
+            return JsonResponse({'status': 'error', 'mensagem': 'Parâmetros inválidos'}, status=400)
+
+        if not abertura or not fechamento or fechamento <= abertura or duracao_minima <= 0:
+            return JsonResponse({'status': 'error', 'mensagem': 'Expediente inválido'}, status=400)
+        if data_fim < data_inicio or (data_fim - data_inicio).days >= HORARIOS_LIVRES_MAXIMO_DIAS:
+            return JsonResponse({
+                'status': 'error',
+                'mensagem': f'Período deve ter no máximo {HORARIOS_LIVRES_MAXIMO_DIAS} dias'
+            }, status=400)
+
+        dono = advogado_dono(request)
+        inicio = timezone.make_aware(datetime.combine(data_inicio, abertura))
+        fim = timezone.make_aware(datetime.combine(data_fim, fechamento))
+
+        ocupados = intervalos_ocupados(dono, inicio, fim)
+        livres = horarios_livres(
+            ocupados,
+            dias_do_periodo(data_inicio, data_fim, request.GET.get('fins_de_semana') == '1'),
+            abertura,
+            fechamento,
+            timedelta(minutes=duracao_minima),
+            a_partir_de=timezone.now(),
+        )
+
+        return JsonResponse({
+            'status': 'success',
+            'livres': [
+                {
+                    'inicio': timezone.localtime(livre_inicio).isoformat(),
+                    'fim': timezone.localtime(livre_fim).isoformat(),
+                    'minutos': int((livre_fim - livre_inicio).total_seconds() // 60),
+                }
+                for livre_inicio, livre_fim in livres
+            ],
+        })
+
 # --- Views de CRUD de Audiências/Compromissos ---
 
+# Tamanho da página da listagem e alcance do filtro "só próximos"
+LISTA_POR_PAGINA = 25
+LISTA_PROXIMOS_DIAS = 90
+LISTA_PERIODO_MAXIMO_DIAS = 366
+
+
 @method_decorator(exige_permissao('ver_agenda'), name='dispatch')
 class AudienciaListView(LoginRequiredMixin, ListView):
     model = Audiencia
     template_name = 'agenda/audiencia_list.html'
     context_object_name = 'audiencias'
-    
+    paginate_by = LISTA_POR_PAGINA
+
+    def _periodo(self):
+        """
+        Período pedido (inicio/fim) ou, com "só próximos", de agora até
+        LISTA_PROXIMOS_DIAS à frente. Sem período a listagem fica no banco.
+        """
+        inicio = _parse_limite(self.request.GET.get('inicio'))
+        fim = _parse_limite(self.request.GET.get('fim'))
+        if fim and fim.time() == time.min:
+            # 'fim' informado como data inclui o dia inteiro
+            fim += timedelta(days=1)
+
+        if self.request.GET.get('proximos'):
+            agora = timezone.now()
+            inicio = max(inicio, agora) if inicio else agora
+            fim = fim or agora + timedelta(days=LISTA_PROXIMOS_DIAS)
+        elif not (inicio and fim):
+            return None, None
+
+        if fim <= inicio:
+            return None, None
+        return inicio, min(fim, inicio + timedelta(days=LISTA_PERIODO_MAXIMO_DIAS))
+
     def get_queryset(self):
         dono = advogado_dono(self.request)
-        return Audiencia.objects.filter(
-            models.Q(processo__advogado_responsavel=dono) | 
-            models.Q(cliente__advogado_responsavel=dono)
-        ).distinct().order_by('-data_hora')
+        compromissos = Audiencia.objects.filter(advogado_responsavel=dono).select_related(
+            'processo', 'processo__cliente', 'cliente'
+        )
+
+        tipo = self.request.GET.get('tipo')
+        if tipo:
+            compromissos = compromissos.filter(tipo=tipo)
+
+        processo = self.request.GET.get('processo')
+        if processo and processo.isdigit():
+            compromissos = compromissos.filter(processo_id=processo)
+
+        forum = self.request.GET.get('forum')
+        if forum and forum.isdigit():
+            compromissos = compromissos.filter(forum_id=forum)
+
+        cliente = self.request.GET.get('cliente')
+        if cliente and cliente.isdigit():
+            # Subconsulta em vez de JOIN: os dois lados do OR usam índice
+            compromissos = compromissos.filter(
+                models.Q(cliente_id=cliente) |
+                models.Q(processo_id__in=Processo.objects.filter(cliente_id=cliente).values('pk'))
+            )
+
+        # Com um período informado, as séries recorrentes aparecem ocorrência por ocorrência
+        inicio, fim = self._periodo()
+        if inicio:
+            itens = expandir(compromissos.filter(filtro_janela(inicio, fim)), inicio, fim)
+            if not self.request.GET.get('proximos'):
+                itens.reverse()
+            return itens
+
+        return compromissos.order_by('-data_hora')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        dono = advogado_dono(self.request)
+        context['TIPOS_AUDIENCIA'] = Audiencia.TIPOS_AUDIENCIA
+        context['processos_filtro'] = Processo.objects.filter(advogado_responsavel=dono).only('pk', 'numero').order_by('numero')
+        context['clientes_filtro'] = Cliente.objects.filter(advogado_responsavel=dono).only('pk', 'nome').order_by('nome')
+        context['filtros'] = {
+            campo: self.request.GET.get(campo, '')
+            for campo in ('inicio', 'fim', 'tipo', 'processo', 'cliente', 'forum', 'proximos')
+        }
+        context['foruns_filtro'] = Forum.objects.filter(
+            pk__in=Audiencia.objects.filter(advogado_responsavel=dono, forum__isnull=False).values('forum_id')
+        )
+
+        # Mantém os filtros nos links de paginação
+        parametros = self.request.GET.copy()
+        parametros.pop('page', None)
+        context['parametros_filtro'] = parametros.urlencode()
+        return context
 
 @method_decorator(exige_permissao('adicionar_evento'), name='dispatch')
 class AudienciaCreateView(LoginRequiredMixin, CreateView):
@@ -94,6 +447,11 @@ class AudienciaCreateView(LoginRequiredMixin, CreateView):
             return self.form_invalid(form)
         return super().form_valid(form)
 
+# Ocorrências de uma série exibidas na tela de detalhe
+PROXIMAS_OCORRENCIAS_DIAS = 180
+PROXIMAS_OCORRENCIAS_LIMITE = 10
+
+
 @method_decorator(exige_permissao('ver_agenda'), name='dispatch')
 class AudienciaDetailView(LoginRequiredMixin, DetailView):
     model = Audiencia
@@ -101,18 +459,42 @@ class AudienciaDetailView(LoginRequiredMixin, DetailView):
     
     def get_queryset(self):
         dono = advogado_dono(self.request)
-        return Audiencia.objects.filter(
-            models.Q(processo__advogado_responsavel=dono) | 
-            models.Q(cliente__advogado_responsavel=dono)
-        ).distinct()
+        return Audiencia.objects.filter(advogado_responsavel=dono)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['logs'] = LogAudiencia.objects.filter(
             audiencia=self.object
         ).order_by('-data_alteracao')
+        if self.object.recorrencia:
+            agora = timezone.now()
+            proximas = expandir([self.object], agora, agora + timedelta(days=PROXIMAS_OCORRENCIAS_DIAS))
+            context['proximas_ocorrencias'] = proximas[:PROXIMAS_OCORRENCIAS_LIMITE]
         return context
 
+MENSAGEM_CONFLITO_VERSAO = (
+    "Este compromisso foi alterado por outra pessoa enquanto você editava. "
+    "Recarregue a página para ver a versão atual antes de salvar."
+)
+
+
+def _resposta_conflito_versao(audiencia_pk):
+    versao_atual = Audiencia.objects.filter(pk=audiencia_pk).values_list('versao', flat=True).first()
+    return JsonResponse({
+        'status': 'conflito_versao',
+        'mensagem': MENSAGEM_CONFLITO_VERSAO,
+        'versao_atual': versao_atual,
+    }, status=409)
+
+
+def _versao_informada(dados):
+    """Versão enviada pelo cliente; None quando ausente (clientes antigos)."""
+    try:
+        return int(dados['versao'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
 @method_decorator(exige_permissao('editar_evento'), name='dispatch')
 class AudienciaUpdateView(LoginRequiredMixin, UpdateView):
     model = Audiencia
@@ -126,10 +508,7 @@ class AudienciaUpdateView(LoginRequiredMixin, UpdateView):
 
     def get_queryset(self):
         dono = advogado_dono(self.request)
-        return Audiencia.objects.filter(
-            models.Q(processo__advogado_responsavel=dono) | 
-            models.Q(cliente__advogado_responsavel=dono)
-        ).distinct()
+        return Audiencia.objects.filter(advogado_responsavel=dono)
 
     def form_valid(self, form):
         # Validação explícita para edição
@@ -137,7 +516,13 @@ class AudienciaUpdateView(LoginRequiredMixin, UpdateView):
             form.add_error(None, "O compromisso deve estar vinculado a um Processo ou a um Cliente")
             return self.form_invalid(form)
         
-        response = super().form_valid(form)
+        try:
+            response = super().form_valid(form)
+        except ConflitoDeVersao:
+            form.add_error(None, MENSAGEM_CONFLITO_VERSAO)
+            response = self.form_invalid(form)
+            response.status_code = 409
+            return response
         messages.success(self.request, "Compromisso atualizado com sucesso!")
         return response
 
@@ -149,11 +534,7 @@ def cancelar_audiencia(request, pk):
     dono = advogado_dono(request)
     
     try:
-        audiencia = Audiencia.objects.filter(
-            models.Q(processo__advogado_responsavel=dono) | 
-            models.Q(cliente__advogado_responsavel=dono),
-            pk=pk
-        ).first()
+        audiencia = Audiencia.objects.filter(advogado_responsavel=dono, pk=pk).first()
         
         if not audiencia:
             raise Http404("Audiência não encontrada ou você não tem permissão")
@@ -166,37 +547,473 @@ def cancelar_audiencia(request, pk):
         messages.error(request, f"Erro ao cancelar audiência: {str(e)}")
         return redirect('agenda:lista_audiencias')
 
+@exige_permissao('editar_evento')
+def cancelar_ocorrencia_view(request, pk):
+    """Cancela uma única ocorrência de um compromisso recorrente."""
+    if request.method != 'POST':
+        return redirect('agenda:detalhe_audiencia', pk=pk)
+
+    dono = advogado_dono(request)
+    serie = get_object_or_404(Audiencia, advogado_responsavel=dono, pk=pk)
+    ocorrencia = parse_datetime(request.POST.get('ocorrencia', ''))
+    if not serie.recorrencia or not ocorrencia or not eh_ocorrencia(serie, ocorrencia):
+        messages.error(request, "Ocorrência inválida.")
+        return redirect('agenda:detalhe_audiencia', pk=pk)
+
+    cancelar_ocorrencia(serie, ocorrencia)
+    messages.success(request, "Ocorrência cancelada com sucesso!")
+    return redirect('agenda:detalhe_audiencia', pk=pk)
+
 @method_decorator(csrf_exempt, name='dispatch')
 @method_decorator(exige_permissao('editar_evento'), name='dispatch')
 class ReagendarAudienciaJsonView(LoginRequiredMixin, View):
     def post(self, request, pk):
         try:
             dono = advogado_dono(request)
-            audiencia = get_object_or_404(
-                Audiencia,
-                models.Q(processo__advogado_responsavel=dono) | 
-                models.Q(cliente__advogado_responsavel=dono),
-                pk=pk
-            )
+            audiencia = get_object_or_404(Audiencia, advogado_responsavel=dono, pk=pk)
             data = json.loads(request.body)
             nova_data = parse_datetime(data.get('data_hora'))
             if not nova_data:
                 return JsonResponse({'status': 'error', 'mensagem': 'Data inválida'}, status=400)
             
+            if timezone.is_naive(nova_data):
+                nova_data = timezone.make_aware(nova_data)
+
+            # Versão que o calendário exibia; o save() só grava se ainda for a atual
+            versao = _versao_informada(data)
+            if versao is not None:
+                if versao != audiencia.versao:
+                    return _resposta_conflito_versao(audiencia.pk)
+                audiencia.versao = versao
+
+            # Arrastar uma ocorrência de série move só aquela ocorrência
+            ocorrencia = None
+            if audiencia.recorrencia and data.get('ocorrencia'):
+                ocorrencia = parse_datetime(data.get('ocorrencia'))
+                if not ocorrencia or not eh_ocorrencia(audiencia, ocorrencia):
+                    return JsonResponse({'status': 'error', 'mensagem': 'Ocorrência inválida'}, status=400)
+
+            # Mesma verificação do formulário; 'forcar' confirma o conflito
+            if not data.get('forcar'):
+                fim = nova_data + timedelta(minutes=audiencia.duracao)
+                conflitos = buscar_conflitos(dono, nova_data, fim, ignorar_pk=audiencia.pk)
+                if conflitos:
+                    return JsonResponse({
+                        'status': 'conflito',
+                        'mensagem': 'Conflito de horário com outro compromisso',
+                        'conflitos': descrever_conflitos(conflitos),
+                    }, status=409)
+
+            if ocorrencia:
+                substituta = mover_ocorrencia(audiencia, ocorrencia, nova_data, usuario=request.user)
+                LogAudiencia.objects.create(
+                    audiencia=substituta,
+                    alterado_por=request.user,
+                    data_anterior=ocorrencia,
+                    nova_data=nova_data,
+                    motivo='Ocorrência de compromisso recorrente movida'
+                )
+                return JsonResponse({'status': 'success', 'id': substituta.pk})
+
             data_anterior = audiencia.data_hora
             audiencia.data_hora = nova_data
-            audiencia.save()
-            
-            LogAudiencia.objects.create(
-                audiencia=audiencia,
-                alterado_por=request.user,
-                data_anterior=data_anterior,
-                nova_data=nova_data
-            )
-            return JsonResponse({'status': 'success'})
+            with transaction.atomic():
+                audiencia.save()
+                LogAudiencia.objects.create(
+                    audiencia=audiencia,
+                    alterado_por=request.user,
+                    data_anterior=data_anterior,
+                    nova_data=nova_data
+                )
+            return JsonResponse({'status': 'success', 'versao': audiencia.versao})
+        except ConflitoDeVersao:
+            return _resposta_conflito_versao(pk)
         except Exception as e:
             return JsonResponse({'status': 'error', 'mensagem': str(e)}, status=500)
 
+# Limite de itens por requisição de reagendamento em lote
+REAGENDAMENTO_LOTE_MAXIMO = 200
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(exige_permissao('editar_evento'), name='dispatch')
+class ReagendarLoteJsonView(LoginRequiredMixin, View):
+    """
+    Move vários compromissos de uma vez (ex.: suspensão do expediente no fórum).
+
+    Corpo: {"itens": [{"id": 1, "data_hora": "..."}], "motivo": "...", "forcar": false}
+    Propriedade verificada em uma consulta, conflitos checados em memória e
+    todas as mudanças gravadas em uma transação: um único UPDATE condicionado
+    à versão de cada compromisso e um bulk_create dos logs. Itens podem
+    trazer "versao"; se alguém gravar no meio do caminho, nada é alterado.
+    """
+
+    def post(self, request):
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'status': 'error', 'mensagem': 'JSON inválido'}, status=400)
+
+        itens = data.get('itens')
+        if not isinstance(itens, list) or not itens:
+            return JsonResponse({'status': 'error', 'mensagem': 'Informe a lista de itens'}, status=400)
+        if len(itens) > REAGENDAMENTO_LOTE_MAXIMO:
+            return JsonResponse({
+                'status': 'error',
+                'mensagem': f'Máximo de {REAGENDAMENTO_LOTE_MAXIMO} itens por requisição'
+            }, status=400)
+
+        dono = advogado_dono(request)
+        forcar = bool(data.get('forcar'))
+        motivo = str(data.get('motivo') or '')
+
+        resultados = {}
+        pedidos = []
+        vistos = set()
+        for posicao, item in enumerate(itens):
+            item = item if isinstance(item, dict) else {}
+            try:
+                pk = int(item.get('id'))
+            except (TypeError, ValueError):
+                resultados[posicao] = {'id': item.get('id'), 'status': 'error', 'mensagem': 'ID inválido'}
+                continue
+            if pk in vistos:
+                # Dois destinos para o mesmo compromisso: vale o primeiro
+                resultados[posicao] = {'id': pk, 'status': 'error', 'mensagem': 'Compromisso repetido no lote'}
+                continue
+            vistos.add(pk)
+            nova_data = parse_datetime(str(item.get('data_hora') or ''))
+            if not nova_data:
+                resultados[posicao] = {'id': pk, 'status': 'error', 'mensagem': 'Data inválida'}
+                continue
+            if timezone.is_naive(nova_data):
+                nova_data = timezone.make_aware(nova_data)
+            pedidos.append((posicao, pk, nova_data, _versao_informada(item)))
+
+        # Uma consulta para validar a propriedade de todos os compromissos
+        compromissos = Audiencia.objects.filter(advogado_responsavel=dono).in_bulk(
+            [pk for _, pk, _, _ in pedidos]
+        )
+
+        validos = []
+        for posicao, pk, nova_data, versao in pedidos:
+            if pk not in compromissos:
+                resultados[posicao] = {'id': pk, 'status': 'error', 'mensagem': 'Compromisso não encontrado'}
+            elif versao is not None and versao != compromissos[pk].versao:
+                resultados[posicao] = {
+                    'id': pk,
+                    'status': 'conflito_versao',
+                    'mensagem': 'Alterado por outra pessoa',
+                    'versao_atual': compromissos[pk].versao,
+                }
+            else:
+                validos.append((posicao, compromissos[pk], nova_data))
+
+        if validos and not forcar:
+            inicio = min(nova_data for _, _, nova_data in validos)
+            fim = max(nova_data for _, _, nova_data in validos)
+            indice = IndiceIntervalos.carregar(dono, inicio, fim)
+            # Retira todos os que vão mudar antes de recolocar, para aceitar trocas de horário
+            for _, compromisso, _ in validos:
+                indice.remover_compromisso(compromisso.pk)
+            aceitos = []
+            for posicao, compromisso, nova_data in validos:
+                nova_fim = nova_data + timedelta(minutes=compromisso.duracao)
+                conflitos = indice.conflitos(nova_data, nova_fim)
+                if conflitos:
+                    resultados[posicao] = {
+                        'id': compromisso.pk,
+                        'status': 'conflito',
+                        'mensagem': 'Conflito de horário',
+                        'conflitos': conflitos,
+                    }
+                    continue
+                indice.inserir(nova_data, nova_fim, compromisso.pk)
+                aceitos.append((posicao, compromisso, nova_data))
+            validos = aceitos
+
+        agora = timezone.now()
+        logs = []
+        alterados = []
+        for posicao, compromisso, nova_data in validos:
+            logs.append(LogAudiencia(
+                audiencia=compromisso,
+                alterado_por=request.user,
+                data_anterior=compromisso.data_hora,
+                nova_data=nova_data,
+                motivo=motivo,
+            ))
+            compromisso.data_hora = nova_data
+            alterados.append(compromisso)
+
+        try:
+            with transaction.atomic():
+                if alterados:
+                    # UPDATE ... WHERE (id = 1 AND versao = n1) OR (id = 2 AND versao = n2) ...
+                    mesma_versao = models.Q()
+                    for compromisso in alterados:
+                        mesma_versao |= models.Q(pk=compromisso.pk, versao=compromisso.versao)
+                    gravados = Audiencia.objects.filter(mesma_versao).update(
+                        data_hora=models.Case(
+                            *[models.When(pk=compromisso.pk, then=models.Value(compromisso.data_hora))
+                              for compromisso in alterados],
+                            output_field=models.DateTimeField(),
+                        ),
+                        atualizado_em=agora,
+                        versao=models.F('versao') + 1,
+                    )
+                    if gravados != len(alterados):
+                        raise ConflitoDeVersao()
+                LogAudiencia.objects.bulk_create(logs)
+        except IntegrityError:
+            return JsonResponse({
+                'status': 'error',
+                'mensagem': 'Já existe compromisso do mesmo processo/cliente em um dos horários. Nada foi alterado.'
+            }, status=409)
+        except ConflitoDeVersao:
+            return JsonResponse({
+                'status': 'conflito_versao',
+                'mensagem': 'Um ou mais compromissos foram alterados por outra pessoa. Nada foi alterado.'
+            }, status=409)
+
+        # O UPDATE em lote não dispara os signals de post_save
+        invalidar_agenda(dono.pk)
+
+        for posicao, compromisso, _ in validos:
+            resultados[posicao] = {'id': compromisso.pk, 'status': 'success', 'versao': compromisso.versao + 1}
+
+        return JsonResponse({
+            'status': 'success',
+            'alterados': len(alterados),
+            'resultados': [resultados[posicao] for posicao in range(len(itens))],
+        })
+
+# --- Assinatura ICS (iCalendar) para aplicativos de calendário ---
+
+# Na primeira sincronização (sem token) exporta apenas este histórico recente
+ICS_DIAS_HISTORICO = 180
+
+
+def _codificar_sync_token(data_hora):
+    return str(int(data_hora.timestamp() * 1_000_000))
+
+
+def _decodificar_sync_token(token):
+    try:
+        return datetime.fromtimestamp(int(token) / 1_000_000, tz=dt_timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+
+
+@login_required
+@exige_permissao('ver_agenda')
+def link_assinatura_ics(request):
+    """GET devolve o link de assinatura do usuário; POST gera um novo (revoga o anterior)."""
+    assinatura = AssinaturaCalendario.objects.filter(usuario=request.user).first()
+    if request.method == 'POST' or assinatura is None:
+        token = secrets.token_urlsafe(32)
+        assinatura, _ = AssinaturaCalendario.objects.update_or_create(
+            usuario=request.user, defaults={'token': token}
+        )
+    url = request.build_absolute_uri(reverse_lazy('agenda:feed_ics', kwargs={'token': assinatura.token}))
+    return JsonResponse({'url': url})
+
+
+class AgendaIcsView(View):
+    """
+    Feed iCalendar assinado por token (sem sessão, para celulares).
+
+    Sincronização incremental só com ?sync_token=...: devolve apenas os
+    compromissos alterados e os cancelados desde então. O próximo token vai
+    no cabeçalho X-Sync-Token e na propriedade X-LAW-SYNC-TOKEN.
+
+    If-Modified-Since é o que os aplicativos de assinatura mandam, e eles
+    substituem o calendário inteiro pela resposta: recebem 304 se nada mudou
+    e, caso contrário, o feed completo.
+    """
+
+    def get(self, request, token):
+        assinatura = AssinaturaCalendario.objects.select_related('usuario').filter(token=token).first()
+        if assinatura is None or not tem_permissao(assinatura.usuario, 'ver_agenda'):
+            raise Http404("Assinatura não encontrada")
+
+        dono = advogado_do_usuario(assinatura.usuario)
+        agora = timezone.now()
+
+        compromissos = Audiencia.objects.filter(advogado_responsavel=dono)
+        cancelados = AudienciaCancelada.objects.filter(advogado_responsavel=dono)
+
+        desde = _decodificar_sync_token(request.GET.get('sync_token'))
+        if desde is not None:
+            compromissos = compromissos.filter(atualizado_em__gt=desde)
+            # Um compromisso que saiu e voltou para o escritório vale pela versão atual
+            cancelados = cancelados.filter(cancelado_em__gt=desde).exclude(audiencia_id__in=compromissos.values('pk'))
+            if not compromissos.exists() and not cancelados.exists():
+                resposta = HttpResponseNotModified()
+                resposta['X-Sync-Token'] = _codificar_sync_token(desde)
+                return resposta
+        else:
+            modificado_desde = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+            if modificado_desde is not None:
+                # Last-Modified só tem segundos inteiros: qualquer alteração a
+                # partir do segundo informado conta como mudança
+                limite = datetime.fromtimestamp(modificado_desde, tz=dt_timezone.utc)
+                if (
+                    not compromissos.filter(atualizado_em__gte=limite).exists()
+                    and not cancelados.filter(cancelado_em__gte=limite).exists()
+                ):
+                    resposta = HttpResponseNotModified()
+                    resposta['Last-Modified'] = http_date(modificado_desde)
+                    return resposta
+            compromissos = compromissos.filter(
+                models.Q(data_hora__gte=agora - timedelta(days=ICS_DIAS_HISTORICO)) | ~models.Q(recorrencia='')
+            )
+            cancelados = cancelados.none()
+
+        eventos = [
+            ical.vevent_audiencia(compromisso, agora)
+            for compromisso in compromissos.select_related(
+                'processo', 'processo__cliente', 'cliente'
+            ).prefetch_related('excecoes')
+        ]
+        eventos.extend(ical.vevent_cancelado(cancelamento, agora) for cancelamento in cancelados)
+
+        sync_token = _codificar_sync_token(agora)
+        conteudo = ical.montar_calendario(eventos, nome='Agenda Law Experts', sync_token=sync_token)
+
+        resposta = HttpResponse(conteudo, content_type='text/calendar; charset=utf-8')
+        resposta['Content-Disposition'] = 'inline; filename="agenda.ics"'
+        # Truncado para o segundo, o mesmo valor que volta no If-Modified-Since
+        resposta['Last-Modified'] = http_date(int(agora.timestamp()))
+        resposta['X-Sync-Token'] = sync_token
+        resposta['Cache-Control'] = 'private, no-cache'
+        return resposta
+
+# Tamanho máximo do arquivo de pauta enviado pela tela
+PAUTA_TAMANHO_MAXIMO = 5 * 1024 * 1024
+
+
+@method_decorator(exige_permissao('adicionar_evento'), name='dispatch')
+class ImportarPautaView(LoginRequiredMixin, View):
+    """Upload de pauta (CSV/JSON) aplicada em lote na agenda do escritório."""
+    template_name = 'agenda/importar_pauta.html'
+
+    def get(self, request):
+        return render(request, self.template_name)
+
+    def post(self, request):
+        arquivo = request.FILES.get('arquivo')
+        if arquivo is None:
+            messages.error(request, 'Selecione o arquivo da pauta.')
+            return render(request, self.template_name)
+        if arquivo.size > PAUTA_TAMANHO_MAXIMO:
+            messages.error(request, 'Arquivo muito grande (máximo de 5 MB).')
+            return render(request, self.template_name)
+
+        try:
+            linhas = ler_pauta(arquivo.read(), arquivo.name)
+        except ErroPauta as erro:
+            messages.error(request, str(erro))
+            return render(request, self.template_name)
+
+        resultado = importar_pauta(linhas, advogado_dono(request), request.user)
+        if resultado.total:
+            messages.success(
+                request,
+                f'Pauta importada: {resultado.criados} novo(s), {resultado.atualizados} atualizado(s), '
+                f'{resultado.movidos} reagendado(s).'
+            )
+        return render(request, self.template_name, {'resultado': resultado, 'total_linhas': len(linhas)})
+
+
+# --- Agenda compartilhada (somente leitura, por token) ---
+
+@method_decorator(exige_permissao('compartilhar_agenda'), name='dispatch')
+class CompartilhamentosView(LoginRequiredMixin, View):
+    """Lista os links do escritório e cria um novo (POST com 'descricao')."""
+    template_name = 'agenda/compartilhamentos.html'
+
+    def get(self, request):
+        dono = advogado_dono(request)
+        compartilhamentos = CompartilhamentoAgenda.objects.filter(advogado=dono).select_related('criado_por')
+        return render(request, self.template_name, {'compartilhamentos': compartilhamentos})
+
+    def post(self, request):
+        descricao = request.POST.get('descricao', '').strip()
+        if not descricao:
+            messages.error(request, 'Informe com quem a agenda será compartilhada.')
+            return redirect('agenda:compartilhamentos')
+
+        CompartilhamentoAgenda.objects.create(
+            advogado=advogado_dono(request),
+            descricao=descricao[:120],
+            token=secrets.token_urlsafe(32),
+            criado_por=request.user,
+        )
+        messages.success(request, 'Link de compartilhamento criado.')
+        return redirect('agenda:compartilhamentos')
+
+
+@login_required
+@exige_permissao('compartilhar_agenda')
+def revogar_compartilhamento(request, pk):
+    if request.method != 'POST':
+        return redirect('agenda:compartilhamentos')
+    compartilhamento = get_object_or_404(
+        CompartilhamentoAgenda, pk=pk, advogado=advogado_dono(request), revogado_em__isnull=True
+    )
+    compartilhamento.revogado_em = timezone.now()
+    compartilhamento.save(update_fields=['revogado_em'])
+    messages.success(request, f'Link de "{compartilhamento.descricao}" revogado.')
+    return redirect('agenda:compartilhamentos')
+
+
+@method_decorator(cache_control(max_age=60), name='dispatch')
+class AgendaCompartilhadaView(View):
+    """
+    Agenda pública do token em HTML ou JSON. Não usa sessão nem usuário:
+    o token é conferido no banco e o conteúdo renderizado vem do cache,
+    que muda de chave quando a agenda do escritório é alterada.
+    """
+    formato = 'html'
+
+    def get(self, request, token):
+        dono_id = compartilhamento_por_token(token)
+        if dono_id is None:
+            raise Http404("Link de agenda não encontrado")
+
+        chave = chave_conteudo(token, dono_id, self.formato)
+        em_cache = cache.get(chave)
+        if em_cache is None:
+            inicio, fim = periodo_compartilhado()
+            eventos = eventos_compartilhados(dono_id, inicio, fim)
+            if self.formato == 'json':
+                conteudo = json.dumps({
+                    'inicio': inicio.isoformat(),
+                    'fim': fim.isoformat(),
+                    'eventos': eventos,
+                }, cls=DjangoJSONEncoder)
+            else:
+                conteudo = render_to_string('agenda/agenda_compartilhada.html', {
+                    'eventos': eventos,
+                    'inicio': inicio,
+                    'fim': fim,
+                    'atualizado_em': timezone.localtime(),
+                })
+            em_cache = (conteudo, hashlib.md5(chave.encode()).hexdigest())
+            cache.set(chave, em_cache, COMPARTILHAMENTO_CACHE_SEGUNDOS)
+
+        conteudo, etag = em_cache
+        etag = f'"{etag}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            resposta = HttpResponseNotModified()
+        else:
+            content_type = 'application/json' if self.formato == 'json' else 'text/html; charset=utf-8'
+            resposta = HttpResponse(conteudo, content_type=content_type)
+        resposta['ETag'] = etag
+        return resposta
+
+
 @method_decorator(login_required, name='dispatch')
 class PainelNotificacoesView(View):
     def get(self, request):
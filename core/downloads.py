@@ -0,0 +1,157 @@
+# core/downloads.py
+"""
+Entrega de arquivos protegidos (anexos de andamentos, documentos).
+
+O arquivo é lido em blocos, sem carregar o conteúdo na memória do worker,
+com suporte a Range (download retomável e navegação no visualizador de PDF)
+e validação por ETag/Last-Modified.
+
+Em produção a transferência pode ser delegada ao servidor web da frente:
+a view só confere o acesso e responde com o cabeçalho interno.
+
+    # settings.py
+    ARQUIVOS_PROTEGIDOS_SERVIDOR = 'nginx'             # ou 'sendfile' (Apache/lighttpd)
+    ARQUIVOS_PROTEGIDOS_PREFIXO_INTERNO = '/protegido/'
+
+    # nginx
+    location /protegido/ { internal; alias /caminho/para/media/; }
+"""
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+TAMANHO_BLOCO = 64 * 1024
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _etag(tamanho, modificado_em):
+    return f'"{tamanho:x}-{int(modificado_em):x}"'
+
+
+def _intervalo(cabecalho, tamanho):
+    """
+    (inicio, fim) inclusivos do cabeçalho Range, None para ignorá-lo (ausente,
+    malformado ou com vários intervalos) ou False se não puder ser atendido.
+    """
+    casamento = _RANGE.match((cabecalho or '').replace(' ', ''))
+    if not casamento:
+        return None
+    inicio, fim = casamento.groups()
+    if not inicio and not fim:
+        return None
+    if not inicio:
+        # bytes=-N: os últimos N bytes
+        sufixo = int(fim)
+        if sufixo == 0:
+            return False
+        return max(tamanho - sufixo, 0), tamanho - 1
+    inicio = int(inicio)
+    fim = min(int(fim), tamanho - 1) if fim else tamanho - 1
+    if inicio >= tamanho or inicio > fim:
+        return False
+    return inicio, fim
+
+
+def _if_range_confere(request, etag, modificado_em):
+    valor = request.META.get('HTTP_IF_RANGE')
+    if not valor:
+        return True
+    if valor.startswith('"') or valor.startswith('W/'):
+        return valor == etag
+    return parse_http_date_safe(valor) == int(modificado_em)
+
+
+def _nao_modificado(request, etag, modificado_em):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        return etag in [valor.strip() for valor in if_none_match.split(',')] or if_none_match.strip() == '*'
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return if_modified_since is not None and int(modificado_em) <= if_modified_since
+
+
+def _ler_blocos(caminho, inicio, quantidade):
+    with open(caminho, 'rb') as arquivo:
+        arquivo.seek(inicio)
+        while quantidade > 0:
+            bloco = arquivo.read(min(TAMANHO_BLOCO, quantidade))
+            if not bloco:
+                break
+            quantidade -= len(bloco)
+            yield bloco
+
+
+def _delegar_ao_servidor(response, arquivo_campo, caminho):
+    servidor = getattr(settings, 'ARQUIVOS_PROTEGIDOS_SERVIDOR', None)
+    if servidor == 'nginx':
+        prefixo = getattr(settings, 'ARQUIVOS_PROTEGIDOS_PREFIXO_INTERNO', '/protegido/')
+        response['X-Accel-Redirect'] = prefixo.rstrip('/') + '/' + quote(arquivo_campo.name)
+        return True
+    if servidor == 'sendfile':
+        response['X-Sendfile'] = caminho
+        return True
+    return False
+
+
+def resposta_arquivo(request, arquivo_campo, nome_download=None, anexo=False, max_age=None):
+    """
+    Resposta HTTP para o FieldFile `arquivo_campo`, que precisa estar num
+    storage local (FileSystemStorage). Quem chama já conferiu o acesso.
+
+    `max_age` (segundos) é para endereços cujo conteúdo nunca muda, como os
+    que levam o hash do arquivo: o navegador guarda sem revalidar.
+    """
+    caminho = arquivo_campo.path
+    estado = os.stat(caminho)
+    tamanho, modificado_em = estado.st_size, estado.st_mtime
+    etag = _etag(tamanho, modificado_em)
+    nome_download = nome_download or os.path.basename(arquivo_campo.name)
+    tipo = mimetypes.guess_type(nome_download)[0] or 'application/octet-stream'
+
+    def _cabecalhos(response):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(modificado_em)
+        response['Accept-Ranges'] = 'bytes'
+        # Conteúdo do escritório: nada de cache compartilhado
+        if max_age:
+            patch_cache_control(response, private=True, max_age=max_age, immutable=True)
+        else:
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    if _nao_modificado(request, etag, modificado_em):
+        return _cabecalhos(HttpResponseNotModified())
+
+    disposicao = content_disposition_header(anexo, nome_download)
+
+    resposta_servidor = HttpResponse(content_type=tipo)
+    if _delegar_ao_servidor(resposta_servidor, arquivo_campo, caminho):
+        # O servidor web cuida de Range e do envio; aqui vão só os cabeçalhos
+        resposta_servidor['Content-Disposition'] = disposicao
+        return _cabecalhos(resposta_servidor)
+
+    intervalo = None
+    if _if_range_confere(request, etag, modificado_em):
+        intervalo = _intervalo(request.META.get('HTTP_RANGE'), tamanho)
+
+    if intervalo is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{tamanho}'
+        return _cabecalhos(response)
+
+    inicio, fim = intervalo or (0, tamanho - 1)
+    quantidade = max(fim - inicio + 1, 0)
+    corpo = [] if request.method == 'HEAD' else _ler_blocos(caminho, inicio, quantidade)
+    response = StreamingHttpResponse(corpo, content_type=tipo, status=206 if intervalo else 200)
+    response['Content-Length'] = str(quantidade)
+    if intervalo:
+        response['Content-Range'] = f'bytes {inicio}-{fim}/{tamanho}'
+    response['Content-Disposition'] = disposicao
+    return _cabecalhos(response)
@@ -0,0 +1,23 @@
+from django import forms
+
+
+class VersaoFormMixin:
+    """
+    Para ModelForms de ModeloVersionado: leva a versão exibida ao usuário em
+    um campo oculto, para que o save() confira essa versão e não a relida no POST.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['versao'] = forms.IntegerField(
+            widget=forms.HiddenInput,
+            required=False,
+            initial=self.instance.versao,
+        )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        versao = cleaned_data.get('versao')
+        if versao:
+            self.instance.versao = versao
+        return cleaned_data
@@ -1,3 +1,43 @@
-from django.db import models
+from django.db import models, router, transaction
 
-# Create your models here.
+
+class ConflitoDeVersao(Exception):
+    """O registro foi gravado por outra pessoa depois de ter sido lido."""
+
+
+class ModeloVersionado(models.Model):
+    """
+    Controle de concorrência otimista.
+
+    Todo save() de um registro existente começa, na mesma transação, com
+    UPDATE ... SET versao = n + 1 WHERE id = ? AND versao = n,
+    sem travar a linha entre a leitura e a gravação. Se nenhuma linha casar,
+    outra requisição gravou antes e ConflitoDeVersao é levantada. Só usa a
+    API pública do QuerySet, sem depender de métodos internos do Model.
+    """
+    versao = models.PositiveIntegerField(default=1, editable=False, verbose_name='Versão')
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self._state.adding or self.pk is None or kwargs.get('force_insert'):
+            return super().save(*args, **kwargs)
+
+        lida = self.versao
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            # Reserva a próxima versão antes de gravar os campos: o UPDATE
+            # condicionado trava a linha até o fim da transação
+            reservado = type(self)._base_manager.using(using).filter(pk=self.pk, versao=lida).update(versao=lida + 1)
+            if not reservado and type(self)._base_manager.using(using).filter(pk=self.pk).exists():
+                raise ConflitoDeVersao(
+                    f"{self._meta.verbose_name} {self.pk} foi alterado por outra pessoa (versão {lida} desatualizada)."
+                )
+            if reservado:
+                self.versao = lida + 1
+            try:
+                super().save(*args, **kwargs)
+            except Exception:
+                self.versao = lida
+                raise
@@ -1,3 +1,130 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from clientes.models import Cliente
+from processos.models import Processo
+from .downloads import resposta_arquivo
+from .models import ConflitoDeVersao
+
+CONTEUDO = bytes(range(100))
+
+
+class RespostaArquivoTests(SimpleTestCase):
+
+    def setUp(self):
+        pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, pasta)
+        caminho = os.path.join(pasta, 'peticao.pdf')
+        with open(caminho, 'wb') as arquivo:
+            arquivo.write(CONTEUDO)
+        # Basta o que resposta_arquivo usa de um FieldFile
+        self.arquivo = SimpleNamespace(path=caminho, name='andamentos/peticao.pdf')
+        self.fabrica = RequestFactory()
+
+    def baixar(self, metodo='get', **cabecalhos):
+        return resposta_arquivo(getattr(self.fabrica, metodo)('/arquivo', **cabecalhos), self.arquivo)
+
+    def corpo(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_arquivo_inteiro(self):
+        response = self.baixar()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.corpo(response), CONTEUDO)
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_intervalos(self):
+        casos = {
+            'bytes=10-19': (10, 19),
+            'bytes=95-': (95, 99),
+            'bytes=-5': (95, 99),
+            'bytes=90-500': (90, 99),
+            'bytes=-500': (0, 99),
+        }
+        for cabecalho, (inicio, fim) in casos.items():
+            response = self.baixar(HTTP_RANGE=cabecalho)
+            self.assertEqual(response.status_code, 206, cabecalho)
+            self.assertEqual(response['Content-Range'], f'bytes {inicio}-{fim}/100', cabecalho)
+            self.assertEqual(response['Content-Length'], str(fim - inicio + 1), cabecalho)
+            self.assertEqual(self.corpo(response), CONTEUDO[inicio:fim + 1], cabecalho)
+
+    def test_intervalo_impossivel(self):
+        for cabecalho in ('bytes=100-', 'bytes=50-10', 'bytes=-0'):
+            response = self.baixar(HTTP_RANGE=cabecalho)
+            self.assertEqual(response.status_code, 416, cabecalho)
+            self.assertEqual(response['Content-Range'], 'bytes */100', cabecalho)
+
+    def test_range_ignorado_envia_o_arquivo_inteiro(self):
+        for cabecalho in ('bytes=0-1,5-6', 'items=0-5', 'bytes=-'):
+            response = self.baixar(HTTP_RANGE=cabecalho)
+            self.assertEqual(response.status_code, 200, cabecalho)
+            self.assertEqual(self.corpo(response), CONTEUDO, cabecalho)
+
+    def test_if_range_desatualizado_envia_o_arquivo_inteiro(self):
+        etag = self.baixar()['ETag']
+        self.assertEqual(self.baixar(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag).status_code, 206)
+        response = self.baixar(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"outro"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.corpo(response), CONTEUDO)
+
+    def test_validacao_condicional(self):
+        primeira = self.baixar()
+        self.assertEqual(self.baixar(HTTP_IF_NONE_MATCH=primeira['ETag']).status_code, 304)
+        self.assertEqual(self.baixar(HTTP_IF_MODIFIED_SINCE=primeira['Last-Modified']).status_code, 304)
+        self.assertEqual(self.baixar(HTTP_IF_NONE_MATCH='"outro"').status_code, 200)
+
+    def test_head_sem_corpo(self):
+        response = self.baixar('head', HTTP_RANGE='bytes=0-9')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(self.corpo(response), b'')
+
+    @override_settings(ARQUIVOS_PROTEGIDOS_SERVIDOR='nginx', ARQUIVOS_PROTEGIDOS_PREFIXO_INTERNO='/protegido/')
+    def test_entrega_delegada_ao_nginx(self):
+        response = self.baixar(HTTP_RANGE='bytes=0-9')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protegido/andamentos/peticao.pdf')
+        self.assertEqual(response.content, b'')
+
+
+class ModeloVersionadoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        dono = User.objects.create_user('dono', 'dono@exemplo.com', 'senha')
+        cliente = Cliente.objects.create(
+            nome='Cliente', cpf_cnpj='12345678901', telefone='1',
+            advogado_responsavel=dono, area_direito='CIVIL',
+        )
+        cls.processo = Processo.objects.create(
+            numero='ABC-1', cliente=cliente, advogado_responsavel=dono, descricao='Original',
+        )
+
+    def test_cada_save_incrementa_a_versao(self):
+        processo = Processo.objects.get(pk=self.processo.pk)
+        self.assertEqual(processo.versao, 1)
+        processo.save()
+        processo.save()
+        self.assertEqual(processo.versao, 3)
+        self.assertEqual(Processo.objects.get(pk=processo.pk).versao, 3)
+
+    def test_instancia_desatualizada_nao_sobrescreve(self):
+        primeira = Processo.objects.get(pk=self.processo.pk)
+        segunda = Processo.objects.get(pk=self.processo.pk)
+        primeira.descricao = 'Primeira'
+        primeira.save()
+
+        segunda.descricao = 'Segunda'
+        with self.assertRaises(ConflitoDeVersao):
+            segunda.save()
+        self.assertEqual(segunda.versao, 1)
+        gravado = Processo.objects.get(pk=self.processo.pk)
+        self.assertEqual((gravado.descricao, gravado.versao), ('Primeira', 2))
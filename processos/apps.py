@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class ProcessosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'processos'
+
+    def ready(self):
+        from django.core import checks
+
+        from . import signals  # noqa: F401
+        from .busca import verificar_sqlite
+
+        checks.register(verificar_sqlite, checks.Tags.database)
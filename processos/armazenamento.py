@@ -0,0 +1,191 @@
+# processos/armazenamento.py
+"""
+Anexos de andamentos guardados por conteúdo.
+
+Cada arquivo existe uma única vez em disco, em conteudo/ab/cd/<sha256>, e o
+ArquivoConteudo conta quantos andamentos (ou envios concluídos ainda não
+usados) apontam para ele. Anexar de novo a mesma petição não ocupa disco;
+quando a contagem chega a zero, o arquivo é apagado.
+
+Arquivos grandes chegam em partes (UploadParcial): cada parte é gravada no
+arquivo temporário a partir do último byte recebido, então uma conexão
+perdida retoma de onde parou em vez de recomeçar. A leitura da rede e o
+hash final correm fora de qualquer transação; o avanço de `recebido` é um
+UPDATE condicionado ao valor lido, que decide entre envios simultâneos.
+"""
+
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ArquivoConteudo, UploadParcial
+from .previas import apagar_previas
+
+PASTA_CONTEUDO = 'conteudo'
+PASTA_PARCIAIS = 'uploads_parciais'
+
+TAMANHO_BLOCO = 64 * 1024
+TAMANHO_MAXIMO_ARQUIVO = 500 * 1024 * 1024
+TAMANHO_MAXIMO_PARTE = 8 * 1024 * 1024
+# A partir deste tamanho o formulário envia o arquivo em partes
+LIMIAR_UPLOAD_EM_PARTES = 5 * 1024 * 1024
+
+
+class ErroUpload(Exception):
+    """Envio recusado (tamanho, formato da requisição)."""
+
+
+class ParteForaDeOrdem(ErroUpload):
+    """A parte não começa no último byte recebido; o cliente deve retomar de `recebido`."""
+
+    def __init__(self, recebido):
+        super().__init__(f"O envio deve continuar a partir do byte {recebido}.")
+        self.recebido = recebido
+
+
+def caminho_conteudo(sha256):
+    return f'{PASTA_CONTEUDO}/{sha256[:2]}/{sha256[2:4]}/{sha256}'
+
+
+def _caminho_local(nome):
+    return default_storage.path(nome)
+
+
+def caminho_parcial(upload):
+    return _caminho_local(f'{PASTA_PARCIAIS}/{upload.pk}.part')
+
+
+def _registrar(temporario, sha256, tamanho):
+    """Move o temporário para o endereço do conteúdo, ou o descarta se o conteúdo já existir."""
+    nome = caminho_conteudo(sha256)
+    destino = _caminho_local(nome)
+    if os.path.exists(destino):
+        os.remove(temporario)
+    else:
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        os.replace(temporario, destino)
+    conteudo, _criado = ArquivoConteudo.objects.get_or_create(
+        sha256=sha256, defaults={'tamanho': tamanho, 'arquivo': nome}
+    )
+    return conteudo
+
+
+def armazenar_arquivo(arquivo):
+    """
+    Guarda um arquivo recebido de uma vez (UploadedFile/File), calculando o
+    hash enquanto copia os blocos. Devolve o ArquivoConteudo, ainda sem referência.
+    """
+    pasta = _caminho_local(PASTA_PARCIAIS)
+    os.makedirs(pasta, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=pasta, suffix='.part')
+    resumo = hashlib.sha256()
+    tamanho = 0
+    with os.fdopen(descritor, 'wb') as destino:
+        for bloco in arquivo.chunks(TAMANHO_BLOCO):
+            resumo.update(bloco)
+            destino.write(bloco)
+            tamanho += len(bloco)
+    return _registrar(temporario, resumo.hexdigest(), tamanho)
+
+
+def iniciar_upload(usuario, nome_arquivo, tamanho):
+    if tamanho <= 0:
+        raise ErroUpload("Arquivo vazio.")
+    if tamanho > TAMANHO_MAXIMO_ARQUIVO:
+        raise ErroUpload(f"Arquivo maior que o limite de {TAMANHO_MAXIMO_ARQUIVO // (1024 * 1024)} MB.")
+    upload = UploadParcial.objects.create(
+        usuario=usuario,
+        nome_arquivo=os.path.basename(nome_arquivo or '')[:255] or 'arquivo',
+        tamanho=tamanho,
+    )
+    os.makedirs(_caminho_local(PASTA_PARCIAIS), exist_ok=True)
+    open(caminho_parcial(upload), 'wb').close()
+    return upload
+
+
+def receber_parte(upload_id, inicio, fluxo, quantidade):
+    """
+    Grava `quantidade` bytes lidos de `fluxo` a partir do byte `inicio` e
+    devolve o UploadParcial atualizado (concluído quando todos os bytes chegam).
+    Se a conexão cair no meio da parte, o que chegou fica registrado.
+    """
+    if quantidade <= 0 or quantidade > TAMANHO_MAXIMO_PARTE:
+        raise ErroUpload(f"Cada parte deve ter até {TAMANHO_MAXIMO_PARTE // (1024 * 1024)} MB.")
+
+    upload = UploadParcial.objects.get(pk=upload_id)
+    if upload.concluido or inicio != upload.recebido:
+        raise ParteForaDeOrdem(upload.recebido)
+    if inicio + quantidade > upload.tamanho:
+        raise ErroUpload("A parte ultrapassa o tamanho declarado do arquivo.")
+
+    # Sem transação nem trava durante a leitura da rede. Dois envios da mesma
+    # parte gravam os mesmos bytes do mesmo arquivo nas mesmas posições, e só
+    # o que vencer o UPDATE abaixo conta; bytes além de `recebido` deixados
+    # por uma tentativa interrompida são sobrescritos pela parte seguinte.
+    gravados = 0
+    with open(caminho_parcial(upload), 'r+b') as destino:
+        destino.seek(inicio)
+        while gravados < quantidade:
+            bloco = fluxo.read(min(TAMANHO_BLOCO, quantidade - gravados))
+            if not bloco:
+                break
+            destino.write(bloco)
+            gravados += len(bloco)
+
+    registrado = UploadParcial.objects.filter(pk=upload.pk, recebido=inicio, conteudo=None).update(
+        recebido=F('recebido') + gravados,
+        atualizado_em=timezone.now(),
+    )
+    if not registrado:
+        upload.refresh_from_db(fields=['recebido', 'conteudo'])
+        raise ParteForaDeOrdem(upload.recebido)
+
+    upload.recebido = inicio + gravados
+    if upload.recebido == upload.tamanho:
+        _concluir(upload)
+    return upload
+
+
+def _concluir(upload):
+    # O estado do sha256 não sobrevive entre requisições, então o hash do
+    # envio em partes é calculado numa leitura sequencial ao final, fora de
+    # transação: só quem registrou o último byte chega aqui
+    temporario = caminho_parcial(upload)
+    resumo = hashlib.sha256()
+    with open(temporario, 'rb') as origem:
+        for bloco in iter(lambda: origem.read(TAMANHO_BLOCO), b''):
+            resumo.update(bloco)
+    conteudo = _registrar(temporario, resumo.hexdigest(), upload.tamanho)
+    with transaction.atomic():
+        UploadParcial.objects.filter(pk=upload.pk).update(conteudo=conteudo, atualizado_em=timezone.now())
+        # O envio concluído segura o conteúdo até ser usado num andamento
+        reter(conteudo.pk)
+    upload.conteudo = conteudo
+
+
+def reter(conteudo_id):
+    if conteudo_id:
+        ArquivoConteudo.objects.filter(pk=conteudo_id).update(referencias=F('referencias') + 1)
+
+
+def liberar(conteudo_id):
+    if not conteudo_id:
+        return
+    ArquivoConteudo.objects.filter(pk=conteudo_id, referencias__gt=0).update(referencias=F('referencias') - 1)
+    transaction.on_commit(lambda: apagar_se_orfao(conteudo_id))
+
+
+def apagar_se_orfao(conteudo_id):
+    with transaction.atomic():
+        conteudo = ArquivoConteudo.objects.select_for_update().filter(pk=conteudo_id, referencias=0).first()
+        if conteudo is None:
+            return
+        nome = conteudo.arquivo.name
+        conteudo.delete()
+    default_storage.delete(nome)
+    apagar_previas(conteudo.sha256)
@@ -0,0 +1,297 @@
+# processos/busca.py
+"""
+Busca textual de processos com o FTS5 do SQLite.
+
+A tabela virtual `processos_busca` guarda um documento por processo
+(número, nome do cliente e descrição) e um por andamento (texto do
+andamento mais o texto extraído do anexo, ver extracao.py), todos
+apontando para o processo. O rowid é derivado da chave
+primária (processo: 2*id, andamento: 2*id + 1), então cada gravação
+atualiza apenas o seu documento.
+
+Os signals em processos/signals.py mantêm o índice em dia e o comando
+`reconstruir_busca` o recria do zero. Fora do SQLite (ou sem FTS5) a busca
+volta ao filtro icontains.
+
+A busca devolve todos os processos que casam; a ordem por relevância é
+aplicada página a página (LIMIT/OFFSET sobre o ranking), então nenhum
+resultado fica de fora por causa de um limite fixo.
+"""
+
+import logging
+import re
+import sqlite3
+
+from django.core import checks
+from django.db import DatabaseError, connection, models, transaction
+from django.db.models.expressions import RawSQL
+
+from .cnj import normalizar_numero
+
+TABELA = 'processos_busca'
+
+# Pesos do bm25 por coluna: processo_id, numero, cliente, texto
+PESOS_BM25 = (0.0, 10.0, 5.0, 1.0)
+
+# Processos ranqueados por consulta ao percorrer todos os resultados
+LIMITE_RESULTADOS = 200
+
+# WITH ... AS MATERIALIZED (ordem por relevância) existe a partir do SQLite 3.35
+SQLITE_MINIMO_RELEVANCIA = (3, 35, 0)
+
+logger = logging.getLogger(__name__)
+
+
+def disponivel():
+    return connection.vendor == 'sqlite'
+
+
+def relevancia_disponivel():
+    return disponivel() and sqlite3.sqlite_version_info >= SQLITE_MINIMO_RELEVANCIA
+
+
+def verificar_sqlite(app_configs=None, **kwargs):
+    """System check: avisa na inicialização que a busca ficará sem ordem por relevância."""
+    if disponivel() and not relevancia_disponivel():
+        return [checks.Warning(
+            f"SQLite {sqlite3.sqlite_version} não suporta WITH ... AS MATERIALIZED; "
+            "a busca de processos será ordenada pela data de cadastro.",
+            hint="Atualize o SQLite para a versão 3.35 ou mais nova.",
+            id='processos.W001',
+        )]
+    return []
+
+
+def _rowid_processo(pk):
+    return pk * 2
+
+
+def _rowid_andamento(pk):
+    return pk * 2 + 1
+
+
+def _executar(sql, parametros=(), varios=False):
+    if not disponivel():
+        return
+    try:
+        # Savepoint: um erro no índice não invalida a transação do save()
+        with transaction.atomic(), connection.cursor() as cursor:
+            if varios:
+                cursor.executemany(sql, parametros)
+            else:
+                cursor.execute(sql, parametros)
+    except DatabaseError:
+        # O índice é derivado: uma falha aqui não deve impedir o cadastro
+        logger.exception("Falha ao atualizar o índice de busca de processos")
+
+
+def indexar_processo(processo, nome_cliente=None):
+    if nome_cliente is None:
+        nome_cliente = processo.cliente.nome
+    rowid = _rowid_processo(processo.pk)
+    _executar(f"DELETE FROM {TABELA} WHERE rowid = %s", [rowid])
+    _executar(
+        f"INSERT INTO {TABELA} (rowid, processo_id, numero, cliente, texto) VALUES (%s, %s, %s, %s, %s)",
+        [rowid, processo.pk, processo.numero, nome_cliente, processo.descricao or ''],
+    )
+
+
+def indexar_processos(processos_e_clientes):
+    """Indexa vários processos de uma vez; para gravações em lote, que não disparam signals."""
+    documentos = [
+        (_rowid_processo(processo.pk), processo.pk, processo.numero, nome_cliente, processo.descricao or '')
+        for processo, nome_cliente in processos_e_clientes
+    ]
+    _executar(f"DELETE FROM {TABELA} WHERE rowid = %s", [documento[:1] for documento in documentos], varios=True)
+    _executar(
+        f"INSERT INTO {TABELA} (rowid, processo_id, numero, cliente, texto) VALUES (%s, %s, %s, %s, %s)",
+        documentos,
+        varios=True,
+    )
+
+
+def remover_processo(pk):
+    _executar(f"DELETE FROM {TABELA} WHERE rowid = %s", [_rowid_processo(pk)])
+
+
+def _texto_andamento(andamento):
+    texto = andamento.descricao or ''
+    if andamento.conteudo_id and andamento.conteudo.texto_extraido:
+        texto = f"{texto}\n{andamento.conteudo.texto_extraido}"
+    return texto
+
+
+def indexar_andamento(andamento):
+    rowid = _rowid_andamento(andamento.pk)
+    _executar(f"DELETE FROM {TABELA} WHERE rowid = %s", [rowid])
+    _executar(
+        f"INSERT INTO {TABELA} (rowid, processo_id, numero, cliente, texto) VALUES (%s, %s, '', '', %s)",
+        [rowid, andamento.processo_id, _texto_andamento(andamento)],
+    )
+
+
+def remover_andamento(pk):
+    _executar(f"DELETE FROM {TABELA} WHERE rowid = %s", [_rowid_andamento(pk)])
+
+
+def reconstruir():
+    """Recria todos os documentos a partir das tabelas de processos e andamentos."""
+    from .models import Andamento, ArquivoConteudo, Processo
+    from clientes.models import Cliente
+
+    processos = Processo._meta.db_table
+    andamentos = Andamento._meta.db_table
+    conteudos = ArquivoConteudo._meta.db_table
+    clientes = Cliente._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABELA}")
+        cursor.execute(
+            f"INSERT INTO {TABELA} (rowid, processo_id, numero, cliente, texto) "
+            f"SELECT p.id * 2, p.id, p.numero, c.nome, p.descricao "
+            f"FROM {processos} p JOIN {clientes} c ON c.id = p.cliente_id"
+        )
+        cursor.execute(
+            f"INSERT INTO {TABELA} (rowid, processo_id, numero, cliente, texto) "
+            f"SELECT a.id * 2 + 1, a.processo_id, '', '', "
+            f"a.descricao || COALESCE(char(10) || NULLIF(c.texto_extraido, ''), '') "
+            f"FROM {andamentos} a LEFT JOIN {conteudos} c ON c.id = a.conteudo_id"
+        )
+        cursor.execute(f"INSERT INTO {TABELA} ({TABELA}) VALUES ('optimize')")
+        cursor.execute(f"SELECT COUNT(*) FROM {TABELA}")
+        return cursor.fetchone()[0]
+
+
+def expressao_fts(termo):
+    """
+    Converte o texto digitado em uma consulta FTS5 segura: cada palavra vira
+    uma frase entre aspas com busca por prefixo, todas obrigatórias.
+    'ação 0001234-56' -> '"ação"* "0001234-56"*'
+    """
+    palavras = re.findall(r'\S+', termo or '')
+    return ' '.join('"{}"*'.format(palavra.replace('"', '')) for palavra in palavras if palavra.replace('"', ''))
+
+
+def ids_por_relevancia(termo, queryset, limite=LIMITE_RESULTADOS, deslocamento=0):
+    """
+    Ids dos processos de `queryset` que casam com o termo, do mais relevante
+    ao menos, a partir da posição `deslocamento`. Os filtros do queryset
+    (escritório, status, área) entram como subconsulta, então o limite vale
+    para os processos que serão exibidos.
+    """
+    expressao = expressao_fts(termo)
+    if not expressao:
+        return []
+    pesos = ', '.join(str(peso) for peso in PESOS_BM25)
+    filtro_sql, filtro_parametros = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            # bm25() não pode ser usada numa consulta agregada; o CTE
+            # materializado calcula a nota por documento e o melhor documento
+            # de cada processo (o próprio ou um andamento) define a posição dele
+            f"WITH documentos AS MATERIALIZED ("
+            f"SELECT processo_id, bm25({TABELA}, {pesos}) AS relevancia FROM {TABELA} "
+            f"WHERE {TABELA} MATCH %s AND processo_id IN ({filtro_sql})) "
+            f"SELECT processo_id, MIN(relevancia) AS melhor FROM documentos "
+            f"GROUP BY processo_id ORDER BY melhor, processo_id LIMIT %s OFFSET %s",
+            [expressao, *filtro_parametros, limite, deslocamento],
+        )
+        return [linha[0] for linha in cursor.fetchall()]
+
+
+def _fts_responde(expressao):
+    """Confere com uma consulta mínima se o índice existe e aceita a expressão."""
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"SELECT 1 FROM {TABELA} WHERE {TABELA} MATCH %s LIMIT 1", [expressao])
+    except DatabaseError:
+        logger.exception("Busca FTS indisponível; usando icontains")
+        return False
+    return True
+
+
+def _usa_fts(termo):
+    return not normalizar_numero(termo) and disponivel() and bool(expressao_fts(termo))
+
+
+def filtro_correspondentes(termo):
+    """Subconsulta com todos os processos cujos documentos casam com o termo no FTS."""
+    return models.Q(pk__in=RawSQL(f"SELECT processo_id FROM {TABELA} WHERE {TABELA} MATCH %s", [expressao_fts(termo)]))
+
+
+class ResultadoPorRelevancia:
+    """
+    Processos de `queryset` do mais relevante ao menos, como sequência para
+    o Paginator: count() usa o queryset e cada fatia é um LIMIT/OFFSET sobre
+    o ranking do FTS.
+    """
+
+    def __init__(self, queryset, termo):
+        self.queryset = queryset
+        self.termo = termo
+        self._total = None
+
+    def count(self):
+        if self._total is None:
+            self._total = self.queryset.count()
+        return self._total
+
+    def __len__(self):
+        return self.count()
+
+    def _fatia(self, inicio, fim):
+        if fim <= inicio:
+            return []
+        try:
+            ids = ids_por_relevancia(self.termo, self.queryset, limite=fim - inicio, deslocamento=inicio)
+        except DatabaseError:
+            # buscar_processos já terá caído no icontains
+            logger.exception("Ordem por relevância indisponível; usando a data de cadastro")
+            return list(self.queryset.order_by('-data_cadastro')[inicio:fim])
+        por_id = self.queryset.in_bulk(ids)
+        return [por_id[pk] for pk in ids if pk in por_id]
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            inicio, fim, passo = indice.indices(self.count())
+            return self._fatia(inicio, fim)[::passo]
+        processos = self._fatia(indice, indice + 1)
+        if not processos:
+            raise IndexError(indice)
+        return processos[0]
+
+    def __iter__(self):
+        for inicio in range(0, self.count(), LIMITE_RESULTADOS):
+            yield from self._fatia(inicio, inicio + LIMITE_RESULTADOS)
+
+
+def ordenar_por_relevancia(queryset, termo):
+    """
+    Para um queryset já filtrado por buscar_processos: os processos do mais
+    relevante ao menos, paginável. Onde não há ranking (número CNJ, busca
+    sem FTS) devolve o queryset ordenado pela data de cadastro.
+    """
+    if _usa_fts(termo) and relevancia_disponivel():
+        return ResultadoPorRelevancia(queryset, termo)
+    return queryset.order_by('-data_cadastro')
+
+
+def buscar_processos(queryset, termo):
+    """
+    Restringe o queryset a todos os processos que casam com o termo, sem
+    limite; a ordem por relevância fica com ordenar_por_relevancia.
+    """
+    canonico = normalizar_numero(termo)
+    if canonico:
+        # Número CNJ completo (com ou sem máscara): consulta direta pelo índice único
+        return queryset.filter(numero_cnj=canonico)
+
+    if _usa_fts(termo) and _fts_responde(expressao_fts(termo)):
+        return queryset.filter(filtro_correspondentes(termo))
+
+    return queryset.filter(
+        models.Q(numero__icontains=termo) |
+        models.Q(cliente__nome__icontains=termo) |
+        models.Q(descricao__icontains=termo) |
+        models.Q(andamentos__descricao__icontains=termo) |
+        models.Q(andamentos__conteudo__texto_extraido__icontains=termo)
+    ).distinct().order_by('-data_cadastro')
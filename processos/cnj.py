@@ -0,0 +1,86 @@
+# processos/cnj.py
+"""
+Numeração única de processos (Resolução CNJ 65/2008).
+
+Formato: NNNNNNN-DD.AAAA.J.TR.OOOO
+  N = sequencial, D = dígito verificador, A = ano de ajuizamento,
+  J = segmento da justiça, TR = tribunal, O = unidade de origem.
+
+A forma canônica são os 20 dígitos, sem máscara. O dígito verificador é
+calculado pelo módulo 97 (ISO 7064): o número reordenado como
+NNNNNNNAAAAJTROOOODD deve deixar resto 1 na divisão por 97.
+"""
+
+import re
+from collections import namedtuple
+
+from django.db.models import Q
+
+NumeroCNJ = namedtuple('NumeroCNJ', 'sequencial digito ano segmento tribunal origem')
+
+SEGMENTOS_JUSTICA = {
+    '1': 'Supremo Tribunal Federal',
+    '2': 'Conselho Nacional de Justiça',
+    '3': 'Superior Tribunal de Justiça',
+    '4': 'Justiça Federal',
+    '5': 'Justiça do Trabalho',
+    '6': 'Justiça Eleitoral',
+    '7': 'Justiça Militar da União',
+    '8': 'Justiça Estadual',
+    '9': 'Justiça Militar Estadual',
+}
+
+# Dígitos separados apenas por pontuação de máscara
+_CARACTERES_NUMERO = re.compile(r'^[\d\s.\-/]+$')
+
+
+def somente_digitos(texto):
+    return re.sub(r'\D', '', texto or '')
+
+
+def normalizar_numero(texto):
+    """
+    Forma canônica (20 dígitos) de um número CNJ digitado com ou sem
+    máscara, ou None se o texto não tiver o formato CNJ (numeração antiga,
+    por exemplo). Não confere o dígito verificador (ver `numero_valido`).
+    """
+    if not texto or not _CARACTERES_NUMERO.match(texto):
+        return None
+    digitos = somente_digitos(texto)
+    return digitos if len(digitos) == 20 else None
+
+
+def decompor(canonico):
+    return NumeroCNJ(
+        sequencial=canonico[0:7],
+        digito=canonico[7:9],
+        ano=canonico[9:13],
+        segmento=canonico[13],
+        tribunal=canonico[14:16],
+        origem=canonico[16:20],
+    )
+
+
+def calcular_digito(sequencial, ano, segmento, tribunal, origem):
+    resto = int(f'{sequencial}{ano}{segmento}{tribunal}{origem}00') % 97
+    return f'{98 - resto:02d}'
+
+
+def numero_valido(canonico):
+    partes = decompor(canonico)
+    reordenado = f'{partes.sequencial}{partes.ano}{partes.segmento}{partes.tribunal}{partes.origem}{partes.digito}'
+    return int(reordenado) % 97 == 1
+
+
+def formatar(canonico):
+    """'00012345620238260000' -> '0001234-56.2023.8.26.0000'."""
+    partes = decompor(canonico)
+    return f'{partes.sequencial}-{partes.digito}.{partes.ano}.{partes.segmento}.{partes.tribunal}.{partes.origem}'
+
+
+def filtro_numero(texto):
+    """Q para localizar um processo pelo número: canônico se for CNJ, exato se não."""
+    canonico = normalizar_numero(texto)
+    if canonico:
+        return Q(numero_cnj=canonico)
+    return Q(numero=(texto or '').strip())
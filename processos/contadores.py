@@ -0,0 +1,68 @@
+# processos/contadores.py
+"""
+Quantidade de andamentos e data do último andamento, guardadas no Processo.
+
+A lista mostra e ordena por esses valores sem subconsulta por processo.
+Os signals de Andamento ajustam o Processo com um UPDATE na mesma
+transação do andamento (Andamento.save() abre a transação; a exclusão já
+roda numa). Se algo gravar andamentos sem passar pelos signals, o comando
+`recalcular_andamentos` refaz os valores a partir da tabela de andamentos.
+"""
+
+from datetime import timedelta
+
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Andamento, Processo
+
+TAMANHO_LOTE = 5000
+# Teto do filtro de parados (evita estourar o timedelta com valores absurdos)
+DIAS_PARADO_MAXIMO = 36500
+
+
+def _ultima_data():
+    return Subquery(
+        Andamento.objects.filter(processo=OuterRef('pk')).order_by('-data').values('data')[:1]
+    )
+
+
+def ajustar(processo_id, delta):
+    """Soma `delta` à contagem e relê a data do último andamento (um UPDATE)."""
+    Processo.objects.filter(pk=processo_id).update(
+        andamentos_count=Greatest(F('andamentos_count') + delta, Value(0)),
+        ultimo_andamento_em=_ultima_data(),
+    )
+
+
+def recalcular(queryset=None):
+    """Refaz os contadores de `queryset` (padrão: todos), em lotes por faixa de id."""
+    queryset = (queryset if queryset is not None else Processo.objects.all()).order_by('pk')
+    total = Subquery(
+        Andamento.objects.filter(processo=OuterRef('pk')).order_by()
+        .values('processo').annotate(total=Count('pk')).values('total')
+    )
+    atualizados = 0
+    ultimo_id = 0
+    while True:
+        faixa = list(queryset.filter(pk__gt=ultimo_id).values_list('pk', flat=True)[:TAMANHO_LOTE])
+        if not faixa:
+            return atualizados
+        atualizados += Processo.objects.filter(pk__in=faixa).update(
+            andamentos_count=Coalesce(total, Value(0)),
+            ultimo_andamento_em=_ultima_data(),
+        )
+        ultimo_id = faixa[-1]
+
+
+def dias_parado(valor):
+    """Número de dias do filtro `parado` da lista, ou None se ausente/inválido."""
+    valor = (valor or '').strip()
+    return min(int(valor), DIAS_PARADO_MAXIMO) if valor.isdigit() and int(valor) > 0 else None
+
+
+def filtro_parados(dias):
+    """Processos sem andamento (ou, se nunca tiveram, sem cadastro) há mais de `dias` dias."""
+    limite = timezone.now() - timedelta(days=dias)
+    return Q(ultimo_andamento_em__lt=limite.date()) | Q(ultimo_andamento_em__isnull=True, data_cadastro__lt=limite)
@@ -0,0 +1,139 @@
+# processos/extracao.py
+"""
+Extração do texto dos anexos para a busca.
+
+Roda fora da requisição: o comando `extrair_textos` pega os conteúdos
+pendentes e extrai o texto num pool de processos, então o envio do anexo
+não espera por nada. O texto fica no ArquivoConteudo, ou seja, é extraído
+uma vez por hash; andamentos que apontam para um conteúdo já processado
+entram na busca com o texto na hora em que são salvos. Anexos gravados
+antes do armazenamento por conteúdo (andamentos/) entram na fila depois
+do comando `migrar_anexos`.
+
+PDFs precisam do pacote `pypdf` (em requirements.txt). Num ambiente sem
+ele, os PDFs ficam como FALHOU e podem ser reprocessados com
+`extrair_textos --refazer` depois da instalação.
+"""
+
+import html
+import logging
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from . import busca
+from .models import Andamento, ArquivoConteudo
+
+# Limites por arquivo, para um documento enorme não travar o trabalhador
+PAGINAS_MAXIMAS = 1000
+TEXTO_MAXIMO = 2 * 1024 * 1024
+
+TAMANHO_LOTE = 20
+
+logger = logging.getLogger(__name__)
+
+
+class ExtratorIndisponivel(Exception):
+    """O tipo do arquivo depende de um pacote opcional não instalado."""
+
+
+def _texto_pdf(caminho):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise ExtratorIndisponivel("Instale o pacote pypdf para extrair texto de PDFs.")
+    leitor = PdfReader(caminho)
+    partes = []
+    for pagina in leitor.pages[:PAGINAS_MAXIMAS]:
+        partes.append(pagina.extract_text() or '')
+    return '\n'.join(partes)
+
+
+def _texto_docx(caminho):
+    with zipfile.ZipFile(caminho) as pacote:
+        xml = pacote.read('word/document.xml').decode('utf-8', 'ignore')
+    xml = re.sub(r'</w:p>', '\n', xml)
+    return html.unescape(re.sub(r'<[^>]+>', '', xml))
+
+
+def _texto_simples(inicio, caminho):
+    # Só trata como texto se o começo do arquivo não tiver bytes binários
+    if b'\x00' in inicio:
+        return ''
+    with open(caminho, 'rb') as arquivo:
+        dados = arquivo.read(TEXTO_MAXIMO)
+    try:
+        texto = dados.decode('utf-8')
+    except UnicodeDecodeError:
+        texto = dados.decode('latin-1')
+    if texto.lstrip()[:1] == '<':
+        texto = html.unescape(re.sub(r'<[^>]+>', ' ', texto))
+    return texto
+
+
+def extrair_texto(caminho):
+    """
+    Texto do arquivo em `caminho`, pelo tipo detectado no conteúdo (não
+    pelo nome). Executada nos processos do pool: não acessa o banco.
+    """
+    with open(caminho, 'rb') as arquivo:
+        inicio = arquivo.read(4096)
+    if inicio.startswith(b'%PDF-'):
+        texto = _texto_pdf(caminho)
+    elif inicio.startswith(b'PK\x03\x04') and zipfile.is_zipfile(caminho):
+        with zipfile.ZipFile(caminho) as pacote:
+            eh_docx = 'word/document.xml' in pacote.namelist()
+        texto = _texto_docx(caminho) if eh_docx else ''
+    else:
+        texto = _texto_simples(inicio, caminho)
+    return ' '.join(texto.split())[:TEXTO_MAXIMO]
+
+
+def _salvar(conteudo_id, status, texto=''):
+    ArquivoConteudo.objects.filter(pk=conteudo_id).update(
+        texto_extraido=texto,
+        status_extracao=status,
+        extraido_em=timezone.now(),
+    )
+    # Reindexa os andamentos que usam este conteúdo
+    for andamento in Andamento.objects.filter(conteudo_id=conteudo_id).select_related('conteudo'):
+        busca.indexar_andamento(andamento)
+
+
+def processar(trabalhadores=None, refazer=False, limite=None):
+    """
+    Extrai o texto dos conteúdos pendentes (e, com `refazer`, dos que
+    falharam ou vieram sem texto). Devolve quantos foram processados.
+    """
+    status = ['PENDENTE', 'FALHOU', 'SEM_TEXTO'] if refazer else ['PENDENTE']
+    fila = ArquivoConteudo.objects.filter(status_extracao__in=status).order_by('pk').values_list('pk', 'arquivo')
+    if limite:
+        fila = fila[:limite]
+    fila = list(fila)
+    if not fila:
+        return 0
+
+    processados = 0
+    with ProcessPoolExecutor(max_workers=trabalhadores) as pool:
+        for posicao in range(0, len(fila), TAMANHO_LOTE):
+            tarefas = {
+                pool.submit(extrair_texto, default_storage.path(nome)): conteudo_id
+                for conteudo_id, nome in fila[posicao:posicao + TAMANHO_LOTE]
+            }
+            for tarefa in as_completed(tarefas):
+                conteudo_id = tarefas[tarefa]
+                try:
+                    texto = tarefa.result()
+                except ExtratorIndisponivel as erro:
+                    logger.warning("Conteúdo %s sem extração: %s", conteudo_id, erro)
+                    _salvar(conteudo_id, 'FALHOU')
+                except Exception:
+                    logger.exception("Falha ao extrair o texto do conteúdo %s", conteudo_id)
+                    _salvar(conteudo_id, 'FALHOU')
+                else:
+                    _salvar(conteudo_id, 'CONCLUIDA' if texto else 'SEM_TEXTO', texto)
+                processados += 1
+    return processados
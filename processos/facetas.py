@@ -0,0 +1,110 @@
+# processos/facetas.py
+"""
+Contagens por área e por status para os filtros das listas de processos.
+
+Todas as contagens de uma busca saem de uma única agregação agrupada por
+(área, status); as contagens por área e por status de cada lista são
+somas desse resultado, sem uma consulta por opção do filtro.
+
+O resultado fica no cache por escritório e termo de busca. Como em
+agenda.compartilhamento, cada escritório tem um número de versão no cache
+que entra na chave e é trocado sempre que um processo dele é gravado, o
+que invalida todas as buscas do escritório de uma vez. A versão precisa
+ficar no cache compartilhado de settings.CACHES (não em memória local),
+senão uma gravação feita em outro worker ou num comando de importação não
+chegaria aos demais processos.
+"""
+
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+
+from .busca import buscar_processos
+from .contadores import dias_parado, filtro_parados
+from .models import Processo
+
+# Limite de segurança: alterações que não passam pelos signals (texto
+# extraído dos anexos, por exemplo) aparecem em no máximo este tempo
+FACETAS_CACHE_SEGUNDOS = 10 * 60
+
+STATUS_ATIVOS = ['ANDAMENTO', 'CONCLUIDO']
+STATUS_ARQUIVADOS = ['ARQUIVADO']
+
+
+def _chave_versao(dono_id):
+    return f'processos:facetas:versao:{dono_id}'
+
+
+def versao_processos(dono_id):
+    chave = _chave_versao(dono_id)
+    versao = cache.get(chave)
+    if versao is None:
+        # add() não sobrescreve uma versão criada em paralelo
+        cache.add(chave, uuid.uuid4().hex, None)
+        versao = cache.get(chave)
+    return versao
+
+
+def invalidar_processos(dono_id):
+    if dono_id:
+        cache.set(_chave_versao(dono_id), uuid.uuid4().hex, None)
+
+
+def contagens(dono, termo='', parado=None):
+    """
+    {(area_direito, status): total} dos processos do escritório que casam
+    com `termo` (e, com `parado`, sem movimentação há tantos dias), em todos
+    os status e áreas.
+    """
+    termo = ' '.join((termo or '').split()).lower()
+    resumo = hashlib.sha1(termo.encode()).hexdigest()
+    # O filtro de parados depende do dia de hoje, que entra na chave
+    filtro = f'{parado}:{timezone.localdate()}' if parado else ''
+    chave = f'processos:facetas:{dono.pk}:{versao_processos(dono.pk)}:{filtro}:{resumo}'
+    em_cache = cache.get(chave)
+    if em_cache is not None:
+        return em_cache
+
+    queryset = Processo.objects.filter(advogado_responsavel=dono)
+    if parado:
+        queryset = queryset.filter(filtro_parados(parado))
+    if termo:
+        # Todos os processos que casam no MATCH, sem o limite de uma página,
+        # com os mesmos filtros de escritório e parados da lista; status e
+        # área são separados no agrupamento. A busca pode juntar andamentos
+        # (fallback com distinct): o agrupamento é feito sobre os ids para
+        # cada processo contar uma vez.
+        queryset = Processo.objects.filter(pk__in=buscar_processos(queryset, termo).order_by().values('pk'))
+    grupos = queryset.order_by().values_list('area_direito', 'status').annotate(total=Count('pk'))
+    resultado = {(area, status): total for area, status, total in grupos}
+    cache.set(chave, resultado, FACETAS_CACHE_SEGUNDOS)
+    return resultado
+
+
+def facetas_da_lista(dono, parametros, arquivados=False):
+    """
+    Opções dos filtros da lista com as contagens da busca atual. A contagem
+    por área ignora a área escolhida (mostra quantos haveria em cada uma);
+    a por status respeita a área escolhida.
+    """
+    grupos = contagens(dono, parametros.get('q', ''), dias_parado(parametros.get('parado')))
+    status_da_lista = STATUS_ARQUIVADOS if arquivados else STATUS_ATIVOS
+    area_escolhida = parametros.get('area_direito') or None
+
+    por_area = {}
+    por_status = {}
+    for (area, status), total in grupos.items():
+        if status in status_da_lista:
+            por_area[area] = por_area.get(area, 0) + total
+            if area_escolhida is None or area == area_escolhida:
+                por_status[status] = por_status.get(status, 0) + total
+
+    rotulos_status = dict(Processo.STATUS_CHOICES)
+    return {
+        'areas': [(valor, rotulo, por_area.get(valor, 0)) for valor, rotulo in Processo.AREAS_DIREITO],
+        'status': [(status, rotulos_status[status], por_status.get(status, 0)) for status in status_da_lista],
+        'total': sum(por_area.values()),
+    }
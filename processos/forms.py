@@ -1,9 +1,14 @@
 from django import forms
-from .models import Processo, Andamento
+from django.core.files.uploadedfile import UploadedFile
+from django.urls import reverse
+from .models import Processo, Andamento, UploadParcial
+from .armazenamento import LIMIAR_UPLOAD_EM_PARTES, armazenar_arquivo
 from clientes.models import Cliente
 from usuarios.utils import advogado_dono
+from core.forms import VersaoFormMixin
+from .cnj import formatar, normalizar_numero, numero_valido
 
-class ProcessoForm(forms.ModelForm):
+class ProcessoForm(VersaoFormMixin, forms.ModelForm):
     def __init__(self, *args, **kwargs):
         self.request = kwargs.pop("request", None)
         super().__init__(*args, **kwargs)
@@ -15,7 +20,7 @@ class ProcessoForm(forms.ModelForm):
         model = Processo
         fields = ["numero", "cliente", "descricao", "status", "area_direito"]
         widgets = {
-            "numero": forms.TextInput(attrs={"class": "form-control", "placeholder": "Ex: 0001234-56.2023.8.26.0000"}),
+            "numero": forms.TextInput(attrs={"class": "form-control", "placeholder": "Ex: 0001234-17.2023.8.26.0000"}),
             "cliente": forms.Select(attrs={"class": "form-control"}),
             "descricao": forms.Textarea(attrs={"class": "form-control", "rows": 4}),
             "status": forms.Select(attrs={"class": "form-control"}),
@@ -23,16 +28,39 @@ class ProcessoForm(forms.ModelForm):
         }
 
     def clean_numero(self):
-        numero = self.cleaned_data.get('numero')
-        processo_qs = Processo.objects.filter(numero__iexact=numero)
+        numero = (self.cleaned_data.get('numero') or '').strip()
+        if self.instance.numero_duplicado and numero == self.instance.numero:
+            # Marcado para revisão: o resto do cadastro continua editável
+            return numero
+        canonico = normalizar_numero(numero)
+        if canonico and not numero_valido(canonico):
+            raise forms.ValidationError("Número CNJ inválido: o dígito verificador não confere.")
+        # Número CNJ: só pela forma canônica (índice único), qualquer que seja a
+        # máscara digitada. Números antigos fora do padrão: pelo texto, sem
+        # diferenciar maiúsculas
+        if canonico:
+            processo_qs = Processo.objects.filter(numero_cnj=canonico)
+        else:
+            processo_qs = Processo.objects.filter(numero__iexact=numero)
         if self.instance.pk:
             processo_qs = processo_qs.exclude(pk=self.instance.pk)
         if processo_qs.exists():
             raise forms.ValidationError("Já existe um processo com esse número cadastrado.")
-        return numero
-
+        return formatar(canonico) if canonico else numero
 
 class AndamentoForm(forms.ModelForm):
+    # Preenchido pelo envio em partes (arquivos grandes); o arquivo não vem no POST
+    upload = forms.UUIDField(required=False, widget=forms.HiddenInput)
+
+    def __init__(self, *args, **kwargs):
+        self.request = kwargs.pop("request", None)
+        super().__init__(*args, **kwargs)
+        self.fields["arquivo"].widget.attrs.update({
+            "data-upload-url": reverse("processos:iniciar_upload"),
+            "data-upload-campo": self["upload"].auto_id,
+            "data-upload-limiar": LIMIAR_UPLOAD_EM_PARTES,
+        })
+
     class Meta:
         model = Andamento
         fields = ["data", "descricao", "tipo", "arquivo"]
@@ -42,3 +70,44 @@ class AndamentoForm(forms.ModelForm):
             "tipo": forms.Select(attrs={"class": "form-control"}),
             "arquivo": forms.ClearableFileInput(attrs={"class": "form-control"}),
         }
+
+    def clean_upload(self):
+        token = self.cleaned_data.get("upload")
+        if not token:
+            return None
+        uploads = UploadParcial.objects.select_related("conteudo").filter(pk=token, conteudo__isnull=False)
+        if self.request:
+            uploads = uploads.filter(usuario=self.request.user)
+        upload = uploads.first()
+        if upload is None:
+            raise forms.ValidationError("O envio do arquivo não foi concluído. Selecione o arquivo novamente.")
+        return upload
+
+    def save(self, commit=True):
+        andamento = super().save(commit=False)
+        upload = self.cleaned_data.get("upload")
+        arquivo = self.cleaned_data.get("arquivo")
+
+        # Todo anexo novo vai para o armazenamento por conteúdo
+        if upload is not None:
+            andamento.conteudo = upload.conteudo
+            andamento.nome_arquivo = upload.nome_arquivo
+        elif isinstance(arquivo, UploadedFile):
+            andamento.conteudo = armazenar_arquivo(arquivo)
+            andamento.nome_arquivo = arquivo.name
+        elif not arquivo:
+            andamento.conteudo = None
+            andamento.nome_arquivo = ""
+        if andamento.conteudo is not None:
+            # Atribuir o caminho já gravado evita que o FileField salve uma cópia
+            andamento.arquivo = andamento.conteudo.arquivo.name
+        elif not arquivo:
+            andamento.arquivo = None
+
+        if commit:
+            andamento.save()
+            self._save_m2m()
+            if upload is not None:
+                # A referência passa do envio para o andamento
+                upload.delete()
+        return andamento
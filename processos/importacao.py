@@ -0,0 +1,295 @@
+# processos/importacao.py
+"""
+Importação em lote de processos (CSV, JSON Lines ou JSON) para cadastrar
+a carteira de um escritório novo.
+
+O arquivo é lido como fluxo e processado em lotes de TAMANHO_LOTE linhas;
+a memória depende do lote, não do tamanho do arquivo (fica só o conjunto
+de números já vistos, para acusar duplicatas). Em cada lote:
+  1. números CNJ são normalizados e validados (dígito verificador);
+  2. números já cadastrados são descobertos com uma consulta;
+  3. clientes são resolvidos pelo CPF/CNPJ com uma consulta e os que
+     faltam são criados com um bulk_create;
+  4. os processos entram com bulk_create e são indexados para a busca.
+
+Cada lote é gravado numa transação própria: um erro numa linha vai para o
+relatório e não impede as demais.
+"""
+
+import codecs
+import csv
+import io
+import json
+import re
+import unicodedata
+from dataclasses import dataclass, field
+
+from django.db import IntegrityError, transaction
+
+from clientes.models import Cliente
+from . import busca
+from .facetas import invalidar_processos
+from .cnj import normalizar_numero, numero_valido, somente_digitos
+from .models import Processo
+
+TAMANHO_LOTE = 1000
+# Erros guardados para exibição; o relatório completo sai pelo `relatorio`
+ERROS_GUARDADOS = 1000
+
+COLUNAS = {
+    'numero': ('numero', 'processo', 'numero processo', 'numero cnj'),
+    'cpf_cnpj': ('cpf cnpj', 'cpf', 'cnpj', 'documento', 'cpf cnpj cliente'),
+    'cliente': ('cliente', 'nome cliente', 'nome', 'parte'),
+    'descricao': ('descricao', 'assunto', 'objeto', 'classe'),
+    'status': ('status', 'situacao'),
+    'area_direito': ('area', 'area direito', 'area de direito'),
+    'telefone': ('telefone', 'telefone cliente'),
+    'email': ('email', 'e mail', 'email cliente'),
+}
+
+
+class ErroImportacao(Exception):
+    """Arquivo ilegível (formato ou cabeçalho)."""
+
+
+@dataclass
+class ResultadoImportacao:
+    linhas: int = 0
+    criados: int = 0
+    clientes_criados: int = 0
+    total_erros: int = 0
+    erros: list = field(default_factory=list)
+    relatorio: object = None  # csv.writer opcional que recebe todos os erros
+
+    def erro(self, linha, mensagem):
+        self.total_erros += 1
+        if len(self.erros) < ERROS_GUARDADOS:
+            self.erros.append((linha, mensagem))
+        if self.relatorio is not None:
+            self.relatorio.writerow([linha or '', mensagem])
+
+
+def _normalizar_cabecalho(texto):
+    sem_acento = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(re.sub(r'[^\w]', ' ', sem_acento).replace('_', ' ').lower().split())
+
+
+def _mapear_colunas(cabecalho):
+    por_nome = {_normalizar_cabecalho(nome): nome for nome in cabecalho if nome}
+    mapa = {}
+    for coluna, apelidos in COLUNAS.items():
+        for apelido in apelidos:
+            if apelido in por_nome:
+                mapa[coluna] = por_nome[apelido]
+                break
+    if 'numero' not in mapa or 'cpf_cnpj' not in mapa:
+        raise ErroImportacao("O arquivo precisa das colunas de número do processo e CPF/CNPJ do cliente.")
+    return mapa
+
+
+def _escolhas(opcoes):
+    return {_normalizar_cabecalho(rotulo): valor for valor, rotulo in opcoes} | {
+        _normalizar_cabecalho(valor): valor for valor, _rotulo in opcoes
+    }
+
+
+def _texto(arquivo_binario):
+    """Envolve o arquivo binário num leitor de texto, detectando UTF-8 ou Latin-1 pelo começo."""
+    amostra = arquivo_binario.read(64 * 1024)
+    arquivo_binario.seek(0)
+    try:
+        # Decodificador incremental: um caractere cortado no fim da amostra não é erro
+        codecs.getincrementaldecoder('utf-8')().decode(amostra, final=False)
+        codificacao = 'utf-8-sig'
+    except UnicodeDecodeError:
+        # Exportações de sistemas de tribunais/planilhas costumam vir em Latin-1
+        codificacao = 'latin-1'
+    return io.TextIOWrapper(arquivo_binario, encoding=codificacao, newline=''), amostra.decode(codificacao, 'ignore')
+
+
+def _registros_csv(texto, amostra):
+    try:
+        dialeto = csv.Sniffer().sniff(amostra[:4096], delimiters=';,\t')
+    except csv.Error:
+        dialeto = csv.excel
+    leitor = csv.DictReader(texto, dialect=dialeto)
+    mapa = _mapear_colunas(leitor.fieldnames or [])
+    for posicao, registro in enumerate(leitor, start=2):  # linha 1 é o cabeçalho
+        yield posicao, {coluna: (registro.get(original) or '').strip() for coluna, original in mapa.items()}
+
+
+def _registros_json(registros):
+    mapa = None
+    for posicao, registro in registros:
+        if not isinstance(registro, dict):
+            yield posicao, None
+            continue
+        mapa = mapa or _mapear_colunas(list(registro))
+        yield posicao, {coluna: str(registro.get(original) or '').strip() for coluna, original in mapa.items()}
+
+
+def _linhas_jsonl(texto):
+    for posicao, linha in enumerate(texto, start=1):
+        if not linha.strip():
+            continue
+        try:
+            yield posicao, json.loads(linha)
+        except ValueError:
+            yield posicao, None
+
+
+def ler_processos(arquivo_binario, nome_arquivo=''):
+    """
+    Gera (número da linha, registro normalizado) a partir de um arquivo
+    binário aberto. CSV e JSON Lines são lidos em fluxo; um JSON em lista
+    precisa ser carregado inteiro.
+    """
+    texto, amostra = _texto(arquivo_binario)
+    inicio = amostra.lstrip()[:1]
+    nome = nome_arquivo.lower()
+    if nome.endswith(('.jsonl', '.ndjson')) or (inicio == '{' and not nome.endswith('.json')):
+        return _registros_json(_linhas_jsonl(texto))
+    if nome.endswith('.json') or inicio in '[{':
+        try:
+            dados = json.load(texto)
+        except ValueError as erro:
+            raise ErroImportacao(f"JSON inválido: {erro}")
+        if isinstance(dados, dict):
+            dados = dados.get('processos', [])
+        if not isinstance(dados, list):
+            raise ErroImportacao("O JSON deve ser uma lista de processos.")
+        return _registros_json(enumerate(dados, start=1))
+    return _registros_csv(texto, amostra)
+
+
+def importar_processos(registros, dono, relatorio=None):
+    """Cadastra os processos de `registros` (saída de ler_processos) no escritório `dono`."""
+    resultado = ResultadoImportacao(relatorio=relatorio)
+    status = _escolhas(Processo.STATUS_CHOICES)
+    areas = _escolhas(Processo.AREAS_DIREITO)
+    vistos = set()
+
+    lote = []
+    for posicao, registro in registros:
+        resultado.linhas += 1
+        valida = _validar_linha(posicao, registro, status, areas, vistos, resultado)
+        if valida:
+            lote.append(valida)
+        if len(lote) >= TAMANHO_LOTE:
+            _importar_lote(lote, dono, resultado)
+            lote = []
+    if lote:
+        _importar_lote(lote, dono, resultado)
+    return resultado
+
+
+def _validar_linha(posicao, registro, status, areas, vistos, resultado):
+    if registro is None:
+        resultado.erro(posicao, "Linha ilegível.")
+        return None
+    numero = registro.get('numero', '')
+    canonico = normalizar_numero(numero)
+    documento = somente_digitos(registro.get('cpf_cnpj', ''))
+    chave = canonico or numero
+
+    if not numero:
+        resultado.erro(posicao, "Número do processo em branco.")
+    elif canonico and not numero_valido(canonico):
+        resultado.erro(posicao, f"Número CNJ inválido (dígito verificador): {numero}")
+    elif chave in vistos:
+        resultado.erro(posicao, f"Processo {numero} repetido no arquivo.")
+    elif len(documento) not in (11, 14):
+        resultado.erro(posicao, "CPF/CNPJ do cliente inválido.")
+    elif registro.get('status') and _normalizar_cabecalho(registro['status']) not in status:
+        resultado.erro(posicao, f"Status desconhecido: {registro['status']}")
+    else:
+        vistos.add(chave)
+        area = areas.get(_normalizar_cabecalho(registro.get('area_direito', '')))
+        return {
+            'posicao': posicao,
+            'numero': numero,
+            'canonico': canonico,
+            'documento': documento,
+            'registro': registro,
+            'status': status.get(_normalizar_cabecalho(registro.get('status', '')), 'ANDAMENTO'),
+            'area_direito': area,
+        }
+    return None
+
+
+def _importar_lote(lote, dono, resultado):
+    # Números já cadastrados (em qualquer escritório: o número é único)
+    canonicos = [item['canonico'] for item in lote if item['canonico']]
+    legados = [item['numero'] for item in lote if not item['canonico']]
+    existentes = set(Processo.objects.filter(numero_cnj__in=canonicos).values_list('numero_cnj', flat=True))
+    existentes |= set(Processo.objects.filter(numero__in=legados).values_list('numero', flat=True))
+
+    pendentes = []
+    for item in lote:
+        if (item['canonico'] or item['numero']) in existentes:
+            resultado.erro(item['posicao'], f"Processo {item['numero']} já cadastrado.")
+        else:
+            pendentes.append(item)
+    if not pendentes:
+        return
+
+    # Clientes pelo CPF/CNPJ, com uma consulta
+    clientes = {
+        cliente.cpf_cnpj: cliente
+        for cliente in Cliente.objects.filter(cpf_cnpj__in={item['documento'] for item in pendentes})
+        .only('pk', 'cpf_cnpj', 'nome', 'advogado_responsavel_id')
+    }
+    novos_clientes = {}
+    validos = []
+    for item in pendentes:
+        documento = item['documento']
+        cliente = clientes.get(documento)
+        if cliente is not None and cliente.advogado_responsavel_id != dono.pk:
+            resultado.erro(item['posicao'], "CPF/CNPJ pertence a um cliente de outro escritório.")
+            continue
+        if cliente is None and documento not in novos_clientes:
+            registro = item['registro']
+            if not registro.get('cliente'):
+                resultado.erro(item['posicao'], "Cliente novo sem nome.")
+                continue
+            novos_clientes[documento] = Cliente(
+                tipo='PF' if len(documento) == 11 else 'PJ',
+                nome=registro['cliente'][:100],
+                cpf_cnpj=documento,
+                telefone=registro.get('telefone', '')[:15],
+                email=registro.get('email') or None,
+                area_direito=item['area_direito'] or 'OUTRO',
+                advogado_responsavel=dono,
+            )
+        validos.append(item)
+
+    try:
+        with transaction.atomic():
+            criados = Cliente.objects.bulk_create(novos_clientes.values())
+            clientes.update((cliente.cpf_cnpj, cliente) for cliente in criados)
+
+            processos = []
+            for item in validos:
+                processo = Processo(
+                    numero=item['numero'],
+                    cliente=clientes[item['documento']],
+                    advogado_responsavel=dono,
+                    descricao=item['registro'].get('descricao', ''),
+                    status=item['status'],
+                    area_direito=item['area_direito'],
+                )
+                # bulk_create não chama save(): deriva aqui o número canônico e os
+                # segmentos (os números já cadastrados foram descartados acima)
+                processo._sincronizar_numero_cnj(None, verificar_duplicado=False)
+                processos.append(processo)
+            Processo.objects.bulk_create(processos)
+    except IntegrityError:
+        for item in validos:
+            resultado.erro(item['posicao'], "Conflito ao gravar o lote (cadastro simultâneo?). Reenvie esta linha.")
+        return
+
+    # bulk_create também não dispara os signals que mantêm a busca
+    busca.indexar_processos((processo, processo.cliente.nome) for processo in processos)
+    invalidar_processos(dono.pk)
+    resultado.criados += len(processos)
+    resultado.clientes_criados += len(criados)
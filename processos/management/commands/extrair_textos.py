@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from processos import extracao
+
+
+class Command(BaseCommand):
+    help = "Extrai, num pool de processos, o texto dos anexos pendentes e atualiza a busca."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--trabalhadores', type=int, default=None,
+            help="Processos no pool (padrão: número de CPUs)"
+        )
+        parser.add_argument(
+            '--refazer', action='store_true',
+            help="Reprocessa também os anexos que falharam ou vieram sem texto"
+        )
+        parser.add_argument(
+            '--continuo', action='store_true',
+            help="Não termina: verifica novos anexos a cada --intervalo segundos"
+        )
+        parser.add_argument('--intervalo', type=int, default=30)
+
+    def handle(self, *args, **opcoes):
+        refazer = opcoes['refazer']
+        while True:
+            total = extracao.processar(trabalhadores=opcoes['trabalhadores'], refazer=refazer)
+            if total:
+                self.stdout.write(self.style.SUCCESS(f"Texto extraído de {total} anexo(s)."))
+            if not opcoes['continuo']:
+                if not total:
+                    self.stdout.write("Nenhum anexo pendente.")
+                return
+            # --refazer vale só para a primeira passada
+            refazer = False
+            if not total:
+                time.sleep(opcoes['intervalo'])
@@ -0,0 +1,65 @@
+import csv
+import sys
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from processos.importacao import ErroImportacao, importar_processos, ler_processos
+from usuarios.utils import advogado_do_usuario
+
+
+class Command(BaseCommand):
+    help = "Importa processos (CSV, JSON Lines ou JSON) para a carteira de um escritório."
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help="Caminho do arquivo .csv, .jsonl ou .json")
+        parser.add_argument(
+            '--usuario', required=True,
+            help="Usuário (advogado ou colaborador) do escritório que recebe os processos"
+        )
+        parser.add_argument(
+            '--relatorio',
+            help="Grava todos os erros (linha;mensagem) neste CSV; '-' para a saída de erro"
+        )
+
+    def handle(self, *args, **opcoes):
+        User = get_user_model()
+        try:
+            usuario = User.objects.get(username=opcoes['usuario'])
+        except User.DoesNotExist:
+            raise CommandError(f"Usuário {opcoes['usuario']} não encontrado.")
+
+        caminho = Path(opcoes['arquivo'])
+        if not caminho.exists():
+            raise CommandError(f"Arquivo {caminho} não encontrado.")
+
+        saida_relatorio = None
+        if opcoes['relatorio'] == '-':
+            relatorio = csv.writer(sys.stderr, delimiter=';')
+        elif opcoes['relatorio']:
+            saida_relatorio = open(opcoes['relatorio'], 'w', newline='', encoding='utf-8')
+            relatorio = csv.writer(saida_relatorio, delimiter=';')
+            relatorio.writerow(['linha', 'mensagem'])
+        else:
+            relatorio = None
+
+        try:
+            with caminho.open('rb') as arquivo:
+                resultado = importar_processos(
+                    ler_processos(arquivo, caminho.name), advogado_do_usuario(usuario), relatorio=relatorio
+                )
+        except ErroImportacao as erro:
+            raise CommandError(str(erro))
+        finally:
+            if saida_relatorio:
+                saida_relatorio.close()
+
+        if relatorio is None:
+            for linha, mensagem in resultado.erros:
+                prefixo = f"Linha {linha}: " if linha else ""
+                self.stderr.write(f"{prefixo}{mensagem}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado.linhas} linha(s): {resultado.criados} processo(s) e "
+            f"{resultado.clientes_criados} cliente(s) criado(s), {resultado.total_erros} erro(s)."
+        ))
@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from processos import armazenamento
+from processos.models import ArquivoConteudo, UploadParcial
+
+
+class Command(BaseCommand):
+    help = "Remove envios em partes abandonados e conteúdos de anexos sem nenhuma referência."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horas', type=int, default=24,
+            help="Idade mínima, em horas, de um envio parado para ser descartado (padrão: 24)"
+        )
+
+    def handle(self, *args, **opcoes):
+        limite = timezone.now() - timedelta(hours=opcoes['horas'])
+
+        # delete() um a um para os signals liberarem a referência e o arquivo .part
+        uploads = 0
+        for upload in UploadParcial.objects.filter(atualizado_em__lt=limite).iterator():
+            upload.delete()
+            uploads += 1
+
+        # Conteúdos gravados por formulários que não chegaram a ser salvos
+        orfaos = 0
+        for conteudo_id in ArquivoConteudo.objects.filter(referencias=0, criado_em__lt=limite).values_list('pk', flat=True):
+            armazenamento.apagar_se_orfao(conteudo_id)
+            orfaos += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{uploads} envio(s) abandonado(s) e {orfaos} conteúdo(s) sem referência removidos."
+        ))
@@ -0,0 +1,58 @@
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from processos import armazenamento
+from processos.models import Andamento
+
+
+class Command(BaseCommand):
+    help = (
+        "Passa os anexos antigos (andamentos/) para o armazenamento por conteúdo, "
+        "deixando-os pendentes para a extração de texto e as prévias."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--apagar-originais', action='store_true',
+            help="Apaga o arquivo antigo depois de copiado para o armazenamento por conteúdo"
+        )
+
+    def handle(self, *args, **opcoes):
+        legados = (
+            Andamento.objects.filter(conteudo__isnull=True)
+            .exclude(arquivo='').exclude(arquivo__isnull=True)
+            .order_by('pk').values_list('pk', 'arquivo')
+        )
+        migrados = ausentes = 0
+        for andamento_id, nome in legados.iterator():
+            try:
+                with default_storage.open(nome, 'rb') as original:
+                    conteudo = armazenamento.armazenar_arquivo(original)
+            except OSError:
+                self.stderr.write(f"Andamento {andamento_id}: arquivo {nome} não encontrado.")
+                ausentes += 1
+                continue
+
+            # update() não dispara os signals: a referência é contada aqui
+            atualizado = Andamento.objects.filter(pk=andamento_id, conteudo__isnull=True).update(
+                conteudo=conteudo,
+                arquivo=conteudo.arquivo.name,
+                nome_arquivo=os.path.basename(nome)[:255],
+            )
+            if not atualizado:
+                # Alterado por outra requisição enquanto o arquivo era copiado
+                armazenamento.apagar_se_orfao(conteudo.pk)
+                continue
+            armazenamento.reter(conteudo.pk)
+            migrados += 1
+
+            if opcoes['apagar_originais'] and not Andamento.objects.filter(arquivo=nome).exists():
+                default_storage.delete(nome)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{migrados} anexo(s) migrado(s) para o armazenamento por conteúdo"
+            f"{f'; {ausentes} arquivo(s) não encontrado(s)' if ausentes else ''}. "
+            "Rode extrair_textos e gerar_previas para processá-los."
+        ))
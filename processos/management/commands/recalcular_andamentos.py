@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from processos import contadores
+
+
+class Command(BaseCommand):
+    help = "Recalcula a quantidade e a data do último andamento de cada processo."
+
+    def handle(self, *args, **opcoes):
+        total = contadores.recalcular()
+        self.stdout.write(self.style.SUCCESS(f"Contadores recalculados em {total} processo(s)."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from processos import busca
+
+
+class Command(BaseCommand):
+    help = "Recria o índice de busca textual (FTS5) de processos e andamentos."
+
+    def handle(self, *args, **opcoes):
+        if not busca.disponivel():
+            raise CommandError("A busca FTS5 só está disponível com banco SQLite.")
+
+        total = busca.reconstruir()
+        self.stdout.write(self.style.SUCCESS(f"Índice de busca reconstruído com {total} documento(s)."))
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:10
+
+from django.db import migrations
+
+
+def criar_indice_busca(apps, schema_editor):
+    # FTS5 é exclusivo do SQLite; nos demais bancos a busca usa icontains
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS processos_busca USING fts5("
+        "processo_id UNINDEXED, numero, cliente, texto, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO processos_busca (rowid, processo_id, numero, cliente, texto) "
+        "SELECT p.id * 2, p.id, p.numero, c.nome, p.descricao "
+        "FROM processos_processo p JOIN clientes_cliente c ON c.id = p.cliente_id"
+    )
+    schema_editor.execute(
+        "INSERT INTO processos_busca (rowid, processo_id, numero, cliente, texto) "
+        "SELECT a.id * 2 + 1, a.processo_id, '', '', a.descricao FROM processos_andamento a"
+    )
+
+
+def remover_indice_busca(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS processos_busca")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processos', '0003_processo_versao'),
+        ('clientes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice_busca, remover_indice_busca),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:40
+
+import re
+
+from django.db import migrations, models
+
+
+def _normalizar_numero(texto):
+    # Cópia de processos.cnj.normalizar_numero no momento desta migração
+    if not texto or not re.match(r'^[\d\s.\-/]+$', texto):
+        return None
+    digitos = re.sub(r'\D', '', texto)
+    return digitos if len(digitos) == 20 else None
+
+
+def preencher_numero_cnj(apps, schema_editor):
+    Processo = apps.get_model('processos', 'Processo')
+    vistos = set()
+    alterados = []
+    for processo in Processo.objects.order_by('pk').only('pk', 'numero').iterator():
+        canonico = _normalizar_numero(processo.numero)
+        # Grafias diferentes do mesmo número: só o cadastro mais antigo recebe
+        # a forma canônica, os demais ficam para revisão manual
+        if not canonico or canonico in vistos:
+            continue
+        vistos.add(canonico)
+        processo.numero_cnj = canonico
+        processo.ano_ajuizamento = int(canonico[9:13])
+        processo.segmento_justica = canonico[13]
+        processo.tribunal = canonico[14:16]
+        processo.origem = canonico[16:20]
+        alterados.append(processo)
+    Processo.objects.bulk_update(
+        alterados,
+        ['numero_cnj', 'ano_ajuizamento', 'segmento_justica', 'tribunal', 'origem'],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processos', '0004_busca_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processo',
+            name='ano_ajuizamento',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='Ano de Ajuizamento'),
+        ),
+        migrations.AddField(
+            model_name='processo',
+            name='numero_cnj',
+            field=models.CharField(blank=True, editable=False, max_length=20, null=True, unique=True, verbose_name='Número CNJ'),
+        ),
+        migrations.AddField(
+            model_name='processo',
+            name='origem',
+            field=models.CharField(blank=True, editable=False, max_length=4, verbose_name='Unidade de Origem'),
+        ),
+        migrations.AddField(
+            model_name='processo',
+            name='segmento_justica',
+            field=models.CharField(blank=True, choices=[('1', 'Supremo Tribunal Federal'), ('2', 'Conselho Nacional de Justiça'), ('3', 'Superior Tribunal de Justiça'), ('4', 'Justiça Federal'), ('5', 'Justiça do Trabalho'), ('6', 'Justiça Eleitoral'), ('7', 'Justiça Militar da União'), ('8', 'Justiça Estadual'), ('9', 'Justiça Militar Estadual')], editable=False, max_length=1, verbose_name='Segmento da Justiça'),
+        ),
+        migrations.AddField(
+            model_name='processo',
+            name='tribunal',
+            field=models.CharField(blank=True, editable=False, max_length=2, verbose_name='Tribunal'),
+        ),
+        migrations.RunPython(preencher_numero_cnj, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='processo',
+            index=models.Index(fields=['advogado_responsavel', 'segmento_justica', 'tribunal'], name='processo_dono_tribunal_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='processo',
+            index=models.Index(fields=['advogado_responsavel', 'ano_ajuizamento'], name='processo_dono_ano_idx'),
+        ),
+    ]
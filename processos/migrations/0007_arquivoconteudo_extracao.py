@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processos', '0006_arquivoconteudo_uploadparcial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='arquivoconteudo',
+            name='extraido_em',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='arquivoconteudo',
+            name='status_extracao',
+            field=models.CharField(choices=[('PENDENTE', 'Pendente'), ('CONCLUIDA', 'Concluída'), ('SEM_TEXTO', 'Sem texto'), ('FALHOU', 'Falhou')], default='PENDENTE', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='arquivoconteudo',
+            name='texto_extraido',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='arquivoconteudo',
+            index=models.Index(fields=['status_extracao'], name='conteudo_status_extracao_idx'),
+        ),
+    ]
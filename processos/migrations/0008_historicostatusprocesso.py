@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processos', '0007_arquivoconteudo_extracao'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoricoStatusProcesso',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status_anterior', models.CharField(choices=[('ANDAMENTO', 'Em Andamento'), ('ARQUIVADO', 'Arquivado'), ('CONCLUIDO', 'Concluído')], max_length=20)),
+                ('status_novo', models.CharField(choices=[('ANDAMENTO', 'Em Andamento'), ('ARQUIVADO', 'Arquivado'), ('CONCLUIDO', 'Concluído')], max_length=20)),
+                ('alterado_em', models.DateTimeField(auto_now_add=True)),
+                ('alterado_por', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Usuário responsável')),
+                ('processo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='historico_status', to='processos.processo')),
+            ],
+            options={
+                'verbose_name': 'Histórico de Status',
+                'verbose_name_plural': 'Históricos de Status',
+                'ordering': ['-alterado_em'],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processos', '0008_historicostatusprocesso'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='processo',
+            index=models.Index(fields=['advogado_responsavel', 'area_direito', 'status'], name='processo_dono_area_status_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processos', '0009_processo_dono_area_status_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='arquivoconteudo',
+            name='previa_gerada_em',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='arquivoconteudo',
+            name='status_previa',
+            field=models.CharField(choices=[('PENDENTE', 'Pendente'), ('CONCLUIDA', 'Concluída'), ('SEM_PREVIA', 'Sem prévia'), ('FALHOU', 'Falhou')], default='PENDENTE', editable=False, max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='arquivoconteudo',
+            index=models.Index(fields=['status_previa'], name='conteudo_status_previa_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def preencher_contadores(apps, schema_editor):
+    Processo = apps.get_model('processos', 'Processo')
+    Andamento = apps.get_model('processos', 'Andamento')
+    andamentos = Andamento.objects.filter(processo=OuterRef('pk')).order_by()
+    Processo.objects.update(
+        andamentos_count=Coalesce(
+            Subquery(andamentos.values('processo').annotate(total=Count('pk')).values('total')), Value(0)
+        ),
+        ultimo_andamento_em=Subquery(andamentos.order_by('-data').values('data')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processos', '0010_arquivoconteudo_previa'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processo',
+            name='andamentos_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Andamentos'),
+        ),
+        migrations.AddField(
+            model_name='processo',
+            name='ultimo_andamento_em',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='Último Andamento'),
+        ),
+        migrations.RunPython(preencher_contadores, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='processo',
+            index=models.Index(fields=['advogado_responsavel', 'ultimo_andamento_em'], name='processo_dono_movimento_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:40
+
+import re
+
+from django.db import migrations, models
+
+
+def _normalizar_numero(texto):
+    # Cópia de processos.cnj.normalizar_numero no momento desta migração
+    if not texto or not re.match(r'^[\d\s.\-/]+$', texto):
+        return None
+    digitos = re.sub(r'\D', '', texto)
+    return digitos if len(digitos) == 20 else None
+
+
+def marcar_duplicados(apps, schema_editor):
+    # A 0005 deixou sem numero_cnj as grafias repetidas do mesmo número
+    Processo = apps.get_model('processos', 'Processo')
+    cadastrados = set(Processo.objects.exclude(numero_cnj=None).values_list('numero_cnj', flat=True))
+    duplicados = [
+        pk
+        for pk, numero in Processo.objects.filter(numero_cnj=None).values_list('pk', 'numero').iterator()
+        if _normalizar_numero(numero) in cadastrados
+    ]
+    for posicao in range(0, len(duplicados), 500):
+        Processo.objects.filter(pk__in=duplicados[posicao:posicao + 500]).update(numero_duplicado=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processos', '0011_processo_andamentos_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processo',
+            name='numero_duplicado',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Número duplicado (revisar)'),
+        ),
+        migrations.RunPython(marcar_duplicados, migrations.RunPython.noop),
+    ]
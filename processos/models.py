@@ -1,11 +1,15 @@
-from django.db import models
+import uuid
+
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 #from usuarios.models import Usuario
 from clientes.models import Cliente # Importa o modelo Cliente do app clientes
+from core.models import ModeloVersionado
+from .cnj import SEGMENTOS_JUSTICA, decompor, formatar, normalizar_numero
 
 User = get_user_model()
 
-class Processo(models.Model):
+class Processo(ModeloVersionado):
     STATUS_CHOICES = [
         ('ANDAMENTO', 'Em Andamento'),
         ('ARQUIVADO', 'Arquivado'),
@@ -36,14 +40,159 @@ class Processo(models.Model):
     )
     data_cadastro = models.DateTimeField(auto_now_add=True)
 
+    # Número CNJ canônico (20 dígitos) e seus segmentos, derivados de `numero`
+    # no save(). Ficam vazios para numerações fora do padrão CNJ.
+    numero_cnj = models.CharField(max_length=20, unique=True, null=True, blank=True, editable=False, verbose_name='Número CNJ')
+    ano_ajuizamento = models.PositiveSmallIntegerField(null=True, blank=True, editable=False, verbose_name='Ano de Ajuizamento')
+    segmento_justica = models.CharField(
+        max_length=1,
+        choices=list(SEGMENTOS_JUSTICA.items()),
+        blank=True,
+        editable=False,
+        verbose_name='Segmento da Justiça'
+    )
+    tribunal = models.CharField(max_length=2, blank=True, editable=False, verbose_name='Tribunal')
+    origem = models.CharField(max_length=4, blank=True, editable=False, verbose_name='Unidade de Origem')
+    # Grafia do mesmo número CNJ de outro processo (cadastros antigos, sem a
+    # validação pela forma canônica): fica sem numero_cnj até a revisão manual
+    numero_duplicado = models.BooleanField(default=False, editable=False, verbose_name='Número duplicado (revisar)')
+
+    # Mantidos pelos signals de Andamento (ver contadores.py)
+    andamentos_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Andamentos')
+    ultimo_andamento_em = models.DateField(null=True, blank=True, editable=False, verbose_name='Último Andamento')
+
+    CAMPOS_CONTADORES = ('andamentos_count', 'ultimo_andamento_em')
+
     class Meta:
         verbose_name = 'Processo'
         verbose_name_plural = 'Processos'
         ordering = ['-data_cadastro']
+        indexes = [
+            models.Index(fields=['advogado_responsavel', 'segmento_justica', 'tribunal'], name='processo_dono_tribunal_idx'),
+            models.Index(fields=['advogado_responsavel', 'ano_ajuizamento'], name='processo_dono_ano_idx'),
+            # Cobre a agregação das contagens por área e status (processos.facetas)
+            models.Index(fields=['advogado_responsavel', 'area_direito', 'status'], name='processo_dono_area_status_idx'),
+            # Filtro e ordenação por processos parados
+            models.Index(fields=['advogado_responsavel', 'ultimo_andamento_em'], name='processo_dono_movimento_idx'),
+        ]
 
     def __str__(self):
         return f"{self.numero} - {self.cliente.nome}"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = kwargs['update_fields'] = list(update_fields)
+        elif not self._state.adding:
+            # Os contadores são do banco: um formulário aberto antes de um novo
+            # andamento não pode gravar por cima deles
+            update_fields = kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key and campo.name not in self.CAMPOS_CONTADORES
+            ]
+        self._sincronizar_numero_cnj(update_fields)
+        super().save(*args, **kwargs)
+
+    def _sincronizar_numero_cnj(self, update_fields, verificar_duplicado=True):
+        """
+        Deriva a forma canônica e os segmentos do número e grava `numero` com
+        a máscara CNJ. Se a forma canônica já é de outro processo, o número
+        fica como foi digitado, sem numero_cnj, e o processo é marcado com
+        `numero_duplicado` para revisão em vez de falhar no índice único.
+        """
+        if update_fields is not None and 'numero' not in update_fields:
+            return
+        canonico = normalizar_numero(self.numero)
+        self.numero_duplicado = bool(canonico) and verificar_duplicado and (
+            type(self)._base_manager.filter(numero_cnj=canonico).exclude(pk=self.pk).exists()
+        )
+        if canonico:
+            partes = decompor(canonico)
+            if self.numero_duplicado:
+                self.numero = self.numero.strip()
+                self.numero_cnj = None
+            else:
+                self.numero = formatar(canonico)
+                self.numero_cnj = canonico
+            self.ano_ajuizamento = int(partes.ano)
+            self.segmento_justica = partes.segmento
+            self.tribunal = partes.tribunal
+            self.origem = partes.origem
+        else:
+            self.numero = (self.numero or '').strip()
+            self.numero_cnj = None
+            self.ano_ajuizamento = None
+            self.segmento_justica = self.tribunal = self.origem = ''
+        if update_fields is not None:
+            for campo in ('numero_cnj', 'numero_duplicado', 'ano_ajuizamento', 'segmento_justica', 'tribunal', 'origem'):
+                if campo not in update_fields:
+                    update_fields.append(campo)
+
+class ArquivoConteudo(models.Model):
+    """Conteúdo de anexo guardado uma única vez, endereçado pelo SHA-256 (ver armazenamento.py)."""
+    STATUS_EXTRACAO = [
+        ('PENDENTE', 'Pendente'),
+        ('CONCLUIDA', 'Concluída'),
+        ('SEM_TEXTO', 'Sem texto'),
+        ('FALHOU', 'Falhou'),
+    ]
+    STATUS_PREVIA = [
+        ('PENDENTE', 'Pendente'),
+        ('CONCLUIDA', 'Concluída'),
+        ('SEM_PREVIA', 'Sem prévia'),
+        ('FALHOU', 'Falhou'),
+    ]
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    tamanho = models.BigIntegerField()
+    arquivo = models.FileField(max_length=255)
+    referencias = models.PositiveIntegerField(default=0)
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    # Texto para a busca, extraído em segundo plano (ver extracao.py)
+    texto_extraido = models.TextField(blank=True, editable=False)
+    status_extracao = models.CharField(max_length=10, choices=STATUS_EXTRACAO, default='PENDENTE', editable=False)
+    extraido_em = models.DateTimeField(null=True, blank=True, editable=False)
+
+    # Miniatura e prévia da primeira página, geradas em segundo plano (ver previas.py)
+    status_previa = models.CharField(max_length=10, choices=STATUS_PREVIA, default='PENDENTE', editable=False)
+    previa_gerada_em = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        verbose_name = 'Conteúdo de Arquivo'
+        verbose_name_plural = 'Conteúdos de Arquivos'
+        indexes = [
+            models.Index(fields=['status_extracao'], name='conteudo_status_extracao_idx'),
+            models.Index(fields=['status_previa'], name='conteudo_status_previa_idx'),
+        ]
+
+    def __str__(self):
+        return self.sha256
+
+
+class UploadParcial(models.Model):
+    """Envio em partes de um anexo, retomável a partir de `recebido`."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='uploads_parciais')
+    nome_arquivo = models.CharField(max_length=255)
+    tamanho = models.BigIntegerField()
+    recebido = models.BigIntegerField(default=0)
+    conteudo = models.ForeignKey(ArquivoConteudo, on_delete=models.PROTECT, null=True, blank=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Upload Parcial'
+        verbose_name_plural = 'Uploads Parciais'
+
+    def __str__(self):
+        return f"{self.nome_arquivo} ({self.recebido}/{self.tamanho})"
+
+    @property
+    def concluido(self):
+        return self.conteudo_id is not None
+
+
 class Andamento(models.Model):
     TIPO_CHOICES = [
         ('PETICAO', 'Petição'),
@@ -59,6 +208,11 @@ class Andamento(models.Model):
     tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
     usuario = models.ForeignKey(User, on_delete=models.PROTECT)
     arquivo = models.FileField(upload_to='andamentos/', blank=True, null=True)
+    # Anexos novos apontam para o conteúdo compartilhado; `arquivo` guarda o mesmo caminho
+    conteudo = models.ForeignKey(
+        ArquivoConteudo, on_delete=models.PROTECT, null=True, blank=True, editable=False, related_name='andamentos'
+    )
+    nome_arquivo = models.CharField(max_length=255, blank=True, editable=False)
     criado_em = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -68,3 +222,26 @@ class Andamento(models.Model):
 
     def __str__(self):
         return f"{self.get_tipo_display()} - {self.processo.numero}" 
+
+    def save(self, *args, **kwargs):
+        # O andamento e os contadores do processo (signals) gravam juntos
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class HistoricoStatusProcesso(models.Model):
+    """Mudanças de status (arquivar, concluir, reabrir), individuais ou em lote."""
+    processo = models.ForeignKey(Processo, on_delete=models.CASCADE, related_name='historico_status')
+    status_anterior = models.CharField(max_length=20, choices=Processo.STATUS_CHOICES)
+    status_novo = models.CharField(max_length=20, choices=Processo.STATUS_CHOICES)
+    alterado_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, verbose_name='Usuário responsável')
+    alterado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Histórico de Status'
+        verbose_name_plural = 'Históricos de Status'
+        ordering = ['-alterado_em']
+
+    def __str__(self):
+        return f"{self.processo_id}: {self.get_status_anterior_display()} -> {self.get_status_novo_display()}"
+
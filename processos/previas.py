@@ -0,0 +1,179 @@
+# processos/previas.py
+"""
+Miniaturas e prévias da primeira página dos anexos.
+
+Como a extração de texto (extracao.py), roda fora da requisição: o comando
+`gerar_previas` pega os conteúdos pendentes e gera as imagens num pool de
+processos. As imagens ficam em disco ao lado do conteúdo, endereçadas pelo
+SHA-256 (previas/ab/cd/<sha256>-<tamanho>.jpg): um anexo repetido em vários
+andamentos tem uma única prévia, e o endereço nunca muda de conteúdo, então
+o navegador pode guardá-la por muito tempo.
+
+Imagens são tratadas com o Pillow. A primeira página de PDFs é desenhada
+com o PyMuPDF (`fitz`, em requirements.txt) ou, na falta dele, com o
+`pdftoppm` do poppler-utils (pacote do sistema, ex.: `apt install
+poppler-utils`). Sem nenhum dos dois, os PDFs ficam como FALHOU e podem
+ser reprocessados com `gerar_previas --refazer` depois da instalação.
+"""
+
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.files.storage import default_storage
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import ArquivoConteudo
+
+PASTA_PREVIAS = 'previas'
+
+# Maior lado de cada imagem gerada, em pixels
+TAMANHOS = {
+    'miniatura': 320,
+    'pagina': 1200,
+}
+QUALIDADE_JPEG = 80
+# Resolução da página de PDF desenhada (suficiente para o maior tamanho)
+DPI_PDF = 110
+TEMPO_MAXIMO_PDFTOPPM = 60
+
+TAMANHO_LOTE = 20
+
+logger = logging.getLogger(__name__)
+
+
+class GeradorIndisponivel(Exception):
+    """O tipo do arquivo depende de um pacote/programa opcional não instalado."""
+
+
+def caminho_previa(sha256, tamanho):
+    return f'{PASTA_PREVIAS}/{sha256[:2]}/{sha256[2:4]}/{sha256}-{tamanho}.jpg'
+
+
+def arquivo_previa(conteudo, tamanho):
+    """FieldFile da prévia no mesmo storage do conteúdo, para core.downloads.resposta_arquivo."""
+    return FieldFile(conteudo, ArquivoConteudo._meta.get_field('arquivo'), caminho_previa(conteudo.sha256, tamanho))
+
+
+def apagar_previas(sha256):
+    for tamanho in TAMANHOS:
+        default_storage.delete(caminho_previa(sha256, tamanho))
+
+
+def _pagina_pdf(caminho):
+    try:
+        import fitz
+    except ImportError:
+        fitz = None
+    if fitz is not None:
+        with fitz.open(caminho) as documento:
+            if not documento.page_count:
+                return None
+            pixels = documento[0].get_pixmap(dpi=DPI_PDF)
+            return Image.frombytes('RGB', (pixels.width, pixels.height), pixels.samples)
+
+    if shutil.which('pdftoppm') is None:
+        raise GeradorIndisponivel("Instale o pacote PyMuPDF ou o poppler-utils (pdftoppm) para gerar prévias de PDFs.")
+    with tempfile.TemporaryDirectory() as pasta:
+        saida = os.path.join(pasta, 'pagina')
+        subprocess.run(
+            ['pdftoppm', '-f', '1', '-l', '1', '-r', str(DPI_PDF), '-png', '-singlefile', caminho, saida],
+            check=True, capture_output=True, timeout=TEMPO_MAXIMO_PDFTOPPM,
+        )
+        with Image.open(saida + '.png') as imagem:
+            imagem.load()
+            return imagem.copy()
+
+
+def _imagem(caminho):
+    try:
+        original = Image.open(caminho)
+    except UnidentifiedImageError:
+        return None
+    with original:
+        # Para JPEGs grandes o decodificador já reduz na leitura
+        original.draft('RGB', (TAMANHOS['pagina'], TAMANHOS['pagina']))
+        # Devolve uma cópia já carregada, girada conforme o EXIF
+        return ImageOps.exif_transpose(original)
+
+
+def gerar_previas(caminho, destinos):
+    """
+    Grava em `destinos` ({tamanho: caminho}) as imagens de TAMANHOS para o
+    arquivo em `caminho` e devolve se o tipo tem prévia. Executada nos
+    processos do pool: não acessa o banco.
+    """
+    with open(caminho, 'rb') as arquivo:
+        inicio = arquivo.read(5)
+    imagem = _pagina_pdf(caminho) if inicio == b'%PDF-' else _imagem(caminho)
+    if imagem is None:
+        return False
+
+    if imagem.mode in ('RGBA', 'LA', 'P'):
+        # Transparência vira fundo branco (o JPEG não tem canal alfa)
+        imagem = imagem.convert('RGBA')
+        fundo = Image.new('RGB', imagem.size, 'white')
+        fundo.paste(imagem, mask=imagem.getchannel('A'))
+        imagem = fundo
+    else:
+        imagem = imagem.convert('RGB')
+
+    # Do maior para o menor, reaproveitando a imagem já reduzida
+    for tamanho, lado in sorted(TAMANHOS.items(), key=lambda item: -item[1]):
+        imagem.thumbnail((lado, lado))
+        destino = destinos[tamanho]
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(destino), suffix='.tmp')
+        with os.fdopen(descritor, 'wb') as saida:
+            imagem.save(saida, 'JPEG', quality=QUALIDADE_JPEG, optimize=True, progressive=True)
+        os.replace(temporario, destino)
+    return True
+
+
+def _destinos(sha256):
+    return {tamanho: default_storage.path(caminho_previa(sha256, tamanho)) for tamanho in TAMANHOS}
+
+
+def _salvar(conteudo_id, status):
+    ArquivoConteudo.objects.filter(pk=conteudo_id).update(status_previa=status, previa_gerada_em=timezone.now())
+
+
+def processar(trabalhadores=None, refazer=False, limite=None):
+    """
+    Gera as prévias dos conteúdos pendentes (e, com `refazer`, dos que
+    falharam). Devolve quantos foram processados.
+    """
+    status = ['PENDENTE', 'FALHOU'] if refazer else ['PENDENTE']
+    fila = ArquivoConteudo.objects.filter(status_previa__in=status).order_by('pk').values_list('pk', 'arquivo', 'sha256')
+    if limite:
+        fila = fila[:limite]
+    fila = list(fila)
+    if not fila:
+        return 0
+
+    processados = 0
+    with ProcessPoolExecutor(max_workers=trabalhadores) as pool:
+        for posicao in range(0, len(fila), TAMANHO_LOTE):
+            tarefas = {
+                pool.submit(gerar_previas, default_storage.path(nome), _destinos(sha256)): conteudo_id
+                for conteudo_id, nome, sha256 in fila[posicao:posicao + TAMANHO_LOTE]
+            }
+            for tarefa in as_completed(tarefas):
+                conteudo_id = tarefas[tarefa]
+                try:
+                    tem_previa = tarefa.result()
+                except GeradorIndisponivel as erro:
+                    logger.warning("Conteúdo %s sem prévia: %s", conteudo_id, erro)
+                    _salvar(conteudo_id, 'FALHOU')
+                except Exception:
+                    logger.exception("Falha ao gerar a prévia do conteúdo %s", conteudo_id)
+                    _salvar(conteudo_id, 'FALHOU')
+                else:
+                    _salvar(conteudo_id, 'CONCLUIDA' if tem_previa else 'SEM_PREVIA')
+                processados += 1
+    return processados
@@ -0,0 +1,101 @@
+import os
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from clientes.models import Cliente
+from . import armazenamento, busca, contadores
+from .facetas import invalidar_processos
+from .models import Andamento, Processo, UploadParcial
+
+
+# Mantém o índice de busca textual (FTS5) em dia
+@receiver(post_save, sender=Processo)
+def indexar_processo(sender, instance, **kwargs):
+    busca.indexar_processo(instance)
+
+
+@receiver(post_delete, sender=Processo)
+def remover_processo(sender, instance, **kwargs):
+    busca.remover_processo(instance.pk)
+
+
+@receiver(post_save, sender=Andamento)
+def indexar_andamento(sender, instance, **kwargs):
+    busca.indexar_andamento(instance)
+
+
+@receiver(post_delete, sender=Andamento)
+def remover_andamento(sender, instance, **kwargs):
+    busca.remover_andamento(instance.pk)
+
+
+@receiver(post_save, sender=Cliente)
+def reindexar_processos_do_cliente(sender, instance, **kwargs):
+    # O nome do cliente faz parte do documento de cada processo dele
+    for processo in Processo.objects.filter(cliente=instance).only('pk', 'numero', 'descricao'):
+        busca.indexar_processo(processo, nome_cliente=instance.nome)
+
+
+# Contagens dos filtros da lista (processos.facetas)
+@receiver(post_save, sender=Processo)
+@receiver(post_delete, sender=Processo)
+def invalidar_facetas_por_processo(sender, instance, **kwargs):
+    invalidar_processos(instance.advogado_responsavel_id)
+
+
+@receiver(post_save, sender=Andamento)
+@receiver(post_delete, sender=Andamento)
+def invalidar_facetas_por_andamento(sender, instance, **kwargs):
+    # O texto dos andamentos entra na busca, então muda o resultado das buscas com termo
+    invalidar_processos(
+        Processo.objects.filter(pk=instance.processo_id).values_list('advogado_responsavel_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Cliente)
+def invalidar_facetas_por_cliente(sender, instance, **kwargs):
+    invalidar_processos(instance.advogado_responsavel_id)
+
+
+# Quantidade e data do último andamento no Processo
+@receiver(post_save, sender=Andamento)
+def contar_andamento(sender, instance, created, **kwargs):
+    # Numa edição a data pode ter mudado: só relê a última data
+    contadores.ajustar(instance.processo_id, 1 if created else 0)
+
+
+@receiver(post_delete, sender=Andamento)
+def descontar_andamento(sender, instance, **kwargs):
+    contadores.ajustar(instance.processo_id, -1)
+
+
+# Contagem de referências dos anexos guardados por conteúdo
+@receiver(pre_save, sender=Andamento)
+def lembrar_conteudo_anterior(sender, instance, **kwargs):
+    instance._conteudo_anterior_id = (
+        Andamento.objects.filter(pk=instance.pk).values_list('conteudo_id', flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Andamento)
+def atualizar_referencias_conteudo(sender, instance, **kwargs):
+    anterior = getattr(instance, '_conteudo_anterior_id', None)
+    if instance.conteudo_id != anterior:
+        armazenamento.reter(instance.conteudo_id)
+        armazenamento.liberar(anterior)
+
+
+@receiver(post_delete, sender=Andamento)
+def liberar_conteudo_do_andamento(sender, instance, **kwargs):
+    armazenamento.liberar(instance.conteudo_id)
+
+
+@receiver(post_delete, sender=UploadParcial)
+def descartar_upload_parcial(sender, instance, **kwargs):
+    armazenamento.liberar(instance.conteudo_id)
+    try:
+        os.remove(armazenamento.caminho_parcial(instance))
+    except FileNotFoundError:
+        pass
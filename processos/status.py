@@ -0,0 +1,54 @@
+# processos/status.py
+"""
+Mudança de status de processos, um ou milhares de uma vez.
+
+O lote inteiro vira um SELECT dos status atuais (para o histórico), um
+UPDATE e um INSERT em lote no histórico, independentemente da quantidade.
+A versão é incrementada como num save(), então formulários abertos com o
+status antigo passam a acusar conflito.
+"""
+
+from django.db import transaction
+from django.db.models import F
+
+from .facetas import invalidar_processos
+from .models import HistoricoStatusProcesso, Processo
+
+TAMANHO_LOTE_HISTORICO = 500
+
+
+def alterar_status(queryset, novo_status, usuario=None):
+    """
+    Aplica `novo_status` aos processos de `queryset`, que já deve estar
+    filtrado pelo escritório. Devolve quantos processos mudaram.
+    """
+    if novo_status not in dict(Processo.STATUS_CHOICES):
+        raise ValueError(f"Status inválido: {novo_status}")
+
+    with transaction.atomic():
+        anteriores = list(
+            queryset.exclude(status=novo_status).order_by().select_for_update()
+            .values_list('pk', 'status', 'advogado_responsavel_id')
+        )
+        if not anteriores:
+            return 0
+        alterados = Processo.objects.filter(pk__in=[pk for pk, _status, _dono in anteriores]).update(
+            status=novo_status,
+            versao=F('versao') + 1,
+        )
+        HistoricoStatusProcesso.objects.bulk_create(
+            [
+                HistoricoStatusProcesso(
+                    processo_id=pk,
+                    status_anterior=status,
+                    status_novo=novo_status,
+                    alterado_por=usuario,
+                )
+                for pk, status, _dono in anteriores
+            ],
+            batch_size=TAMANHO_LOTE_HISTORICO,
+        )
+    # O UPDATE em lote não dispara os signals que invalidam as contagens
+    for dono_id in {dono_id for _pk, _status, dono_id in anteriores}:
+        invalidar_processos(dono_id)
+    return alterados
@@ -1,3 +1,251 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from clientes.models import Cliente
+from . import armazenamento, busca
+from .cnj import calcular_digito, decompor, formatar, normalizar_numero, numero_valido
+from .forms import ProcessoForm
+from .models import Andamento, ArquivoConteudo, Processo, UploadParcial
+
+# Dígito verificador 08 calculado pelo módulo 97
+NUMERO_VALIDO = '0001234-08.2023.8.26.0100'
+CANONICO_VALIDO = '00012340820238260100'
+
+
+class NumeroCNJTests(TestCase):
+
+    def test_calcular_digito_e_numero_valido(self):
+        self.assertEqual(calcular_digito('0001234', '2023', '8', '26', '0100'), '08')
+        self.assertTrue(numero_valido(CANONICO_VALIDO))
+        # Qualquer dígito trocado deixa de fechar o módulo 97
+        self.assertFalse(numero_valido('00012340920238260100'))
+        self.assertFalse(numero_valido('00012340820238260101'))
+
+    def test_normalizar_aceita_mascaras_e_recusa_outras_numeracoes(self):
+        for texto in (NUMERO_VALIDO, CANONICO_VALIDO, ' 0001234.08.2023.8.26.0100 ', '0001234-08/2023.8.26.0100'):
+            self.assertEqual(normalizar_numero(texto), CANONICO_VALIDO, texto)
+        for texto in ('', None, '123/2010', 'Proc 0001234-08.2023.8.26.0100', '0001234-08.2023.8.26.01000'):
+            self.assertIsNone(normalizar_numero(texto), texto)
+
+    def test_decompor_e_formatar(self):
+        partes = decompor(CANONICO_VALIDO)
+        self.assertEqual(
+            (partes.sequencial, partes.digito, partes.ano, partes.segmento, partes.tribunal, partes.origem),
+            ('0001234', '08', '2023', '8', '26', '0100'),
+        )
+        self.assertEqual(formatar(CANONICO_VALIDO), NUMERO_VALIDO)
+
+
+class ProcessoNumeroTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dono = User.objects.create_user('dono', 'dono@exemplo.com', 'senha')
+        cls.cliente = Cliente.objects.create(
+            nome='Cliente', cpf_cnpj='12345678901', telefone='1',
+            advogado_responsavel=cls.dono, area_direito='CIVIL',
+        )
+
+    def processo(self, numero):
+        return Processo.objects.create(
+            numero=numero, cliente=self.cliente, advogado_responsavel=self.dono, descricao='Descrição'
+        )
+
+    def test_save_grava_mascara_forma_canonica_e_segmentos(self):
+        processo = self.processo(CANONICO_VALIDO)
+        self.assertEqual(processo.numero, NUMERO_VALIDO)
+        self.assertEqual(processo.numero_cnj, CANONICO_VALIDO)
+        self.assertEqual(
+            (processo.ano_ajuizamento, processo.segmento_justica, processo.tribunal, processo.origem),
+            (2023, '8', '26', '0100'),
+        )
+        legado = self.processo('123/2010')
+        self.assertIsNone(legado.numero_cnj)
+        self.assertEqual(legado.segmento_justica, '')
+
+    def test_grafia_repetida_fica_marcada_para_revisao(self):
+        self.processo(NUMERO_VALIDO)
+        repetido = self.processo('x')
+        # Cadastro antigo com outra grafia do mesmo número
+        Processo.objects.filter(pk=repetido.pk).update(numero=CANONICO_VALIDO)
+        repetido.refresh_from_db()
+        repetido.descricao = 'Nova descrição'
+        repetido.save()
+
+        repetido.refresh_from_db()
+        self.assertTrue(repetido.numero_duplicado)
+        self.assertIsNone(repetido.numero_cnj)
+        self.assertEqual(repetido.numero, CANONICO_VALIDO)
+
+    def test_formulario_recusa_o_mesmo_numero_com_outra_mascara_ou_caixa(self):
+        self.processo(NUMERO_VALIDO)
+        self.processo('ABC-123')
+        dados = {'cliente': self.cliente.pk, 'descricao': 'Descrição', 'status': 'ANDAMENTO'}
+        for numero in (CANONICO_VALIDO, 'abc-123'):
+            form = ProcessoForm({**dados, 'numero': numero})
+            self.assertFalse(form.is_valid(), numero)
+            self.assertIn('numero', form.errors)
+        form = ProcessoForm({**dados, 'numero': '00012340920238260100'})
+        self.assertFalse(form.is_valid())
+        self.assertIn('dígito verificador', form.errors['numero'][0])
+
+
+class UploadEmPartesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('dono', 'dono@exemplo.com', 'senha')
+
+    def setUp(self):
+        pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, pasta)
+        configuracao = override_settings(MEDIA_ROOT=pasta)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        self.dados = os.urandom(300_000)
+
+    def enviar(self, upload, inicio, fim, quantidade=None):
+        return armazenamento.receber_parte(
+            upload.pk, inicio, io.BytesIO(self.dados[inicio:fim]), quantidade or fim - inicio
+        )
+
+    def test_retoma_depois_de_parte_interrompida(self):
+        upload = armazenamento.iniciar_upload(self.usuario, 'autos.pdf', len(self.dados))
+        self.assertEqual(self.enviar(upload, 0, 100_000).recebido, 100_000)
+        # A conexão caiu: só 30 mil dos 100 mil bytes da parte chegaram
+        parcial = self.enviar(upload, 100_000, 130_000, quantidade=100_000)
+        self.assertEqual(parcial.recebido, 130_000)
+        self.assertFalse(parcial.concluido)
+
+        concluido = self.enviar(upload, 130_000, 300_000)
+        self.assertTrue(concluido.concluido)
+        conteudo = UploadParcial.objects.get(pk=upload.pk).conteudo
+        self.assertEqual(conteudo.sha256, hashlib.sha256(self.dados).hexdigest())
+        self.assertEqual(conteudo.tamanho, len(self.dados))
+        self.assertEqual(conteudo.referencias, 1)
+        with conteudo.arquivo.open('rb') as arquivo:
+            self.assertEqual(arquivo.read(), self.dados)
+
+    def test_parte_fora_de_ordem_informa_onde_retomar(self):
+        upload = armazenamento.iniciar_upload(self.usuario, 'autos.pdf', len(self.dados))
+        self.enviar(upload, 0, 100_000)
+        for inicio in (0, 150_000):
+            with self.assertRaises(armazenamento.ParteForaDeOrdem) as erro:
+                self.enviar(upload, inicio, inicio + 1000)
+            self.assertEqual(erro.exception.recebido, 100_000)
+        self.assertEqual(UploadParcial.objects.get(pk=upload.pk).recebido, 100_000)
+
+    def test_parte_repetida_depois_de_concluir_e_recusada(self):
+        upload = armazenamento.iniciar_upload(self.usuario, 'autos.pdf', len(self.dados))
+        self.enviar(upload, 0, 300_000)
+        with self.assertRaises(armazenamento.ParteForaDeOrdem):
+            self.enviar(upload, 0, 300_000)
+
+    def test_limites_de_tamanho(self):
+        with self.assertRaises(armazenamento.ErroUpload):
+            armazenamento.iniciar_upload(self.usuario, 'vazio.pdf', 0)
+        with self.assertRaises(armazenamento.ErroUpload):
+            armazenamento.iniciar_upload(self.usuario, 'enorme.pdf', armazenamento.TAMANHO_MAXIMO_ARQUIVO + 1)
+        upload = armazenamento.iniciar_upload(self.usuario, 'autos.pdf', len(self.dados))
+        with self.assertRaises(armazenamento.ErroUpload):
+            self.enviar(upload, 0, 300_000, quantidade=300_001)
+
+    def test_mesmo_conteudo_e_guardado_uma_vez(self):
+        upload = armazenamento.iniciar_upload(self.usuario, 'autos.pdf', len(self.dados))
+        self.enviar(upload, 0, 300_000)
+        direto = armazenamento.armazenar_arquivo(ContentFile(self.dados))
+        self.assertEqual(direto.pk, UploadParcial.objects.get(pk=upload.pk).conteudo_id)
+        self.assertEqual(ArquivoConteudo.objects.count(), 1)
+
+
+class BuscaTextualTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dono = User.objects.create_user('dono', 'dono@exemplo.com', 'senha')
+        cls.cliente = Cliente.objects.create(
+            nome='Cliente', cpf_cnpj='12345678901', telefone='1',
+            advogado_responsavel=cls.dono, area_direito='CIVIL',
+        )
+
+    def processo(self, numero, descricao, cliente=None):
+        return Processo.objects.create(
+            numero=numero, cliente=cliente or self.cliente, advogado_responsavel=self.dono, descricao=descricao
+        )
+
+    def andamento(self, processo, descricao):
+        return Andamento.objects.create(
+            processo=processo, data='2030-03-04', descricao=descricao, tipo='PETICAO', usuario=self.dono
+        )
+
+    def documentos(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT rowid, processo_id FROM {busca.TABELA} ORDER BY rowid")
+            return cursor.fetchall()
+
+    def buscar(self, termo):
+        encontrados = busca.buscar_processos(Processo.objects.all(), termo)
+        return [processo.pk for processo in busca.ordenar_por_relevancia(encontrados, termo)]
+
+    def test_processo_criado_alterado_e_apagado(self):
+        processo = self.processo('ABC-1', 'Ação de usucapião')
+        self.assertEqual(self.documentos(), [(2 * processo.pk, processo.pk)])
+        self.assertEqual(self.buscar('usucapião'), [processo.pk])
+
+        processo.descricao = 'Ação de despejo'
+        processo.save()
+        self.assertEqual(self.documentos(), [(2 * processo.pk, processo.pk)])
+        self.assertEqual(self.buscar('usucapião'), [])
+        self.assertEqual(self.buscar('despejo'), [processo.pk])
+
+        processo.delete()
+        self.assertEqual(self.documentos(), [])
+        self.assertEqual(self.buscar('despejo'), [])
+
+    def test_andamento_criado_alterado_e_apagado(self):
+        processo = self.processo('ABC-1', 'Ação de cobrança')
+        andamento = self.andamento(processo, 'Pedido de penhora')
+        self.assertEqual(self.documentos(), [
+            (2 * processo.pk, processo.pk),
+            (2 * andamento.pk + 1, processo.pk),
+        ])
+        self.assertEqual(self.buscar('penhora'), [processo.pk])
+
+        andamento.descricao = 'Pedido de arresto'
+        andamento.save()
+        self.assertEqual(self.buscar('penhora'), [])
+        self.assertEqual(self.buscar('arresto'), [processo.pk])
+
+        andamento.delete()
+        self.assertEqual(self.documentos(), [(2 * processo.pk, processo.pk)])
+        self.assertEqual(self.buscar('arresto'), [])
+        self.assertEqual(self.buscar('cobrança'), [processo.pk])
+
+    def test_ordem_por_bm25_acompanha_as_alteracoes(self):
+        pelo_cliente = self.processo('ABC-1', 'Ação de cobrança', cliente=Cliente.objects.create(
+            nome='Construtora Aurora', cpf_cnpj='12345678902', telefone='1',
+            advogado_responsavel=self.dono, area_direito='CIVIL',
+        ))
+        pela_descricao = self.processo('ABC-2', 'Contrato com a Aurora')
+        pelo_andamento = self.processo('ABC-3', 'Ação de cobrança')
+        andamento = self.andamento(
+            pelo_andamento, 'Juntada de documentos ' * 20 + 'da Aurora'
+        )
+        # Cliente pesa mais que o texto; no texto, o documento curto vence o longo
+        self.assertEqual(self.buscar('aurora'), [pelo_cliente.pk, pela_descricao.pk, pelo_andamento.pk])
+
+        andamento.descricao = 'Aurora'
+        andamento.save()
+        self.assertEqual(self.buscar('aurora'), [pelo_cliente.pk, pelo_andamento.pk, pela_descricao.pk])
+
+        pelo_cliente.cliente.nome = 'Construtora Boreal'
+        pelo_cliente.cliente.save()
+        self.assertEqual(self.buscar('aurora'), [pelo_andamento.pk, pela_descricao.pk])
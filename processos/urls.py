@@ -7,10 +7,16 @@ urlpatterns = [
     path('', views.ProcessoListView.as_view(), name='lista_processos'),
     path('arquivados/', views.ProcessosArquivadosListView.as_view(), name='arquivados'),
     path('novo/', views.ProcessoCreateView.as_view(), name='novo_processo'),
+    path('importar/', views.ImportarProcessosView.as_view(), name='importar_processos'),
     path('<int:pk>/', views.ProcessoDetailView.as_view(), name='detalhe_processo'),
     path('<int:pk>/editar/', views.ProcessoUpdateView.as_view(), name='editar_processo'),
     path('<int:pk>/arquivar/', views.arquivar_processo, name='arquivar'),
     path('<int:pk>/desarquivar/', views.desarquivar_processo, name='desarquivar'),
+    path('acoes-em-lote/', views.acao_em_lote, name='acao_em_lote'),
     
     path('<int:processo_id>/andamento/novo/', views.AndamentoCreateView.as_view(), name='novo_andamento'),
+    path('andamentos/<int:pk>/arquivo/', views.arquivo_andamento, name='arquivo_andamento'),
+    path('andamentos/<int:pk>/previa/<str:tamanho>/', views.previa_andamento, name='previa_andamento'),
+    path('uploads/', views.iniciar_upload, name='iniciar_upload'),
+    path('uploads/<uuid:upload_id>/', views.parte_upload, name='parte_upload'),
 ]
\ No newline at end of file
@@ -1,23 +1,45 @@
-from django.views.generic import ListView, CreateView, UpdateView, DetailView
+from django.views.generic import ListView, CreateView, UpdateView, DetailView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
 from django.contrib import messages
 from django.utils.decorators import method_decorator
-from django.db.models import Q
+from django.db.models import F, Q
 
 from usuarios.utils import exige_permissao, advogado_dono
 from usuarios.models import PermissaoColaborador
-from .models import Processo, Andamento
+from .models import Processo, Andamento, UploadParcial
+from . import armazenamento, previas
+from .importacao import ErroImportacao, importar_processos, ler_processos
+from .status import alterar_status
 from .forms import ProcessoForm, AndamentoForm
+from core.models import ConflitoDeVersao
+from .busca import buscar_processos, ordenar_por_relevancia
+from .facetas import facetas_da_lista
+from .contadores import dias_parado, filtro_parados
 
-from django.shortcuts import get_object_or_404, redirect
+from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.urls import reverse
 from django.views.generic.edit import FormMixin # 1. IMPORTE O FORMMIXIN
 
 from django.views.generic import DetailView
+import json
+import os
+import re
 
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_http_methods, require_POST, require_safe
+from core.downloads import resposta_arquivo
+
+
+MENSAGEM_CONFLITO_VERSAO = (
+    "Este processo foi alterado por outra pessoa enquanto você editava. "
+    "Recarregue a página para ver a versão atual antes de salvar."
+)
+
+# Prévias com o hash no endereço não mudam: um ano no cache do navegador
+PREVIA_CACHE_SEGUNDOS = 365 * 24 * 60 * 60
 
 
 @method_decorator(exige_permissao('cadastrar_processo'), name='dispatch')
@@ -47,6 +69,15 @@ class ProcessoUpdateView(UpdateView):
     def get_queryset(self):
         """Filtra apenas processos do advogado responsável"""
         return super().get_queryset().filter(advogado_responsavel=advogado_dono(self.request))
+
+    def form_valid(self, form):
+        try:
+            return super().form_valid(form)
+        except ConflitoDeVersao:
+            form.add_error(None, MENSAGEM_CONFLITO_VERSAO)
+            response = self.form_invalid(form)
+            response.status_code = 409
+            return response
     
     def get_success_url(self):
         messages.success(self.request, "Processo atualizado com sucesso!")
@@ -72,7 +103,8 @@ class ProcessoDetailView(LoginRequiredMixin, FormMixin, DetailView): # 3. ADICIO
         context = super().get_context_data(**kwargs)
         processo = self.get_object()
         
-        context['andamentos'] = processo.andamentos.all().order_by('-criado_em')
+        # conteudo traz o estado das prévias sem uma consulta por andamento
+        context['andamentos'] = processo.andamentos.select_related('conteudo', 'usuario').order_by('-criado_em')
         #context['andamento_form'] = self.get_form() # Adiciona o formulário ao contexto
         return context
 
@@ -90,12 +122,16 @@ class ProcessoDetailView(LoginRequiredMixin, FormMixin, DetailView): # 3. ADICIO
             # Se for inválido, re-renderiza a página com os erros
             return self.form_invalid(form)
 
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['request'] = self.request
+        return kwargs
+
     def form_valid(self, form):
         # Salva o novo andamento associado ao processo e ao usuário
-        andamento = form.save(commit=False)
-        andamento.processo = self.object
-        andamento.usuario = self.request.user
-        andamento.save()
+        form.instance.processo = self.object
+        form.instance.usuario = self.request.user
+        form.save()
         messages.success(self.request, "Andamento adicionado com sucesso!")
         return super().form_valid(form)
 
@@ -109,8 +145,59 @@ class ProcessoDetailView(LoginRequiredMixin, FormMixin, DetailView): # 3. ADICIO
 
 
 
+def filtrar_processos(dono, parametros, arquivados=False):
+    """Processos do escritório com os filtros da lista (área, parados e busca textual)."""
+    status = ['ARQUIVADO'] if arquivados else ['ANDAMENTO', 'CONCLUIDO']
+    queryset = Processo.objects.filter(advogado_responsavel=dono, status__in=status)
+
+    # Filtro por área de direito
+    area_direito = parametros.get('area_direito')
+    if area_direito:
+        queryset = queryset.filter(area_direito=area_direito)
+
+    # Processos sem movimentação há N dias (índice dono + último andamento)
+    dias = dias_parado(parametros.get('parado'))
+    if dias:
+        queryset = queryset.filter(filtro_parados(dias))
+
+    # Busca textual (índice FTS5), ordenada por relevância
+    query = parametros.get('q', '').strip()
+    if query:
+        queryset = buscar_processos(queryset, query)
+
+    if parametros.get('ordem') == 'movimento':
+        # Os mais parados primeiro; sem andamento algum vem antes de todos
+        return queryset.order_by(F('ultimo_andamento_em').asc(nulls_first=True), 'data_cadastro')
+    # Com busca, a ordem por relevância fica para a lista (processos_da_lista)
+    return queryset if query else queryset.order_by('-data_cadastro')
+
+
+def processos_da_lista(dono, parametros, arquivados=False):
+    """filtrar_processos na ordem de exibição: com busca, do mais relevante ao menos, por página."""
+    queryset = filtrar_processos(dono, parametros, arquivados=arquivados)
+    query = parametros.get('q', '').strip()
+    if query and parametros.get('ordem') != 'movimento':
+        return ordenar_por_relevancia(queryset, query)
+    return queryset
+
+
+PROCESSOS_POR_PAGINA = 25
+
+
+class ListaProcessosMixin:
+    """Paginação das listas de processos, mantendo os filtros nos links."""
+    paginate_by = PROCESSOS_POR_PAGINA
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        parametros = self.request.GET.copy()
+        parametros.pop('page', None)
+        context['parametros_filtro'] = parametros.urlencode()
+        return context
+
+
 @method_decorator(exige_permissao('listar_processos'), name='dispatch')
-class ProcessoListView(LoginRequiredMixin, ListView):
+class ProcessoListView(LoginRequiredMixin, ListaProcessosMixin, ListView):
     model = Processo
     template_name = 'processos/processo_list.html'
     context_object_name = 'processos'
@@ -120,27 +207,12 @@ class ProcessoListView(LoginRequiredMixin, ListView):
         # Adiciona as áreas de direito ao contexto
         context['AREAS_DIREITO'] = Processo.AREAS_DIREITO
         context['selected_area_direito'] = self.request.GET.get('area_direito', '')
+        # Contagens por área e status da busca atual (uma agregação, em cache)
+        context['facetas'] = facetas_da_lista(advogado_dono(self.request), self.request.GET, arquivados=False)
         return context
 
     def get_queryset(self):
-        dono = advogado_dono(self.request)
-        queryset = Processo.objects.filter(advogado_responsavel=dono, status__in=['ANDAMENTO', 'CONCLUIDO'])
-        
-        # Filtro por área de direito
-        area_direito = self.request.GET.get('area_direito')
-        if area_direito:
-            queryset = queryset.filter(area_direito=area_direito)
-        
-        # Filtro por busca textual
-        query = self.request.GET.get('q')
-        if query:
-            queryset = queryset.filter(
-                Q(numero__icontains=query) |
-                Q(cliente__nome__icontains=query) |
-                Q(descricao__icontains=query)
-            )
-        
-        return queryset.order_by('-data_cadastro')
+        return processos_da_lista(advogado_dono(self.request), self.request.GET, arquivados=False)
 
 
 class AndamentoCreateView(LoginRequiredMixin, CreateView):
@@ -172,6 +244,11 @@ class AndamentoCreateView(LoginRequiredMixin, CreateView):
         # 4. Retorna o contexto modificado para o template.
         return context
 
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['request'] = self.request
+        return kwargs
+
     def form_valid(self, form):
         # Busca o processo novamente para associar ao novo andamento.
         processo = get_object_or_404(Processo, pk=self.kwargs['processo_id'])
@@ -193,15 +270,14 @@ def arquivar_processo(request, pk):
         messages.error(request, "Você não tem permissão para arquivar este processo.")
         return redirect('processos:lista')
 
-    processo.status = 'ARQUIVADO'
-    processo.save()
+    alterar_status(Processo.objects.filter(pk=processo.pk), 'ARQUIVADO', request.user)
 
     messages.success(request, f"O processo {processo.numero} foi arquivado com sucesso.")
     return redirect('processos:detalhe_processo', pk=pk)
 
 # processos/views.py
 @method_decorator(exige_permissao('listar_processos'), name='dispatch')
-class ProcessosArquivadosListView(LoginRequiredMixin, ListView):
+class ProcessosArquivadosListView(LoginRequiredMixin, ListaProcessosMixin, ListView):
     model = Processo
     template_name = 'processos/processos_arquivados.html'
     context_object_name = 'processos'
@@ -210,31 +286,12 @@ class ProcessosArquivadosListView(LoginRequiredMixin, ListView):
         context = super().get_context_data(**kwargs)
         context['AREAS_DIREITO'] = Processo.AREAS_DIREITO
         context['selected_area_direito'] = self.request.GET.get('area_direito', '')
+        context['facetas'] = facetas_da_lista(advogado_dono(self.request), self.request.GET, arquivados=True)
         return context
 
     def get_queryset(self):
-        dono = advogado_dono(self.request)
         # Filtra apenas processos arquivados
-        queryset = Processo.objects.filter(
-            advogado_responsavel=dono,
-            status='ARQUIVADO'
-        )
-        
-        # Filtro por área de direito
-        area_direito = self.request.GET.get('area_direito')
-        if area_direito:
-            queryset = queryset.filter(area_direito=area_direito)
-        
-        # Filtro por busca textual
-        query = self.request.GET.get('q')
-        if query:
-            queryset = queryset.filter(
-                Q(numero__icontains=query) |
-                Q(cliente__nome__icontains=query) |
-                Q(descricao__icontains=query)
-            )
-        
-        return queryset.order_by('-data_cadastro')
+        return processos_da_lista(advogado_dono(self.request), self.request.GET, arquivados=True)
     
     # processos/views.py
 @login_required
@@ -245,8 +302,203 @@ def desarquivar_processo(request, pk):
         messages.error(request, "Você não tem permissão para desarquivar este processo.")
         return redirect('processos:arquivados')
 
-    processo.status = 'CONCLUIDO'  # Ou outro status desejado
-    processo.save()
+    alterar_status(Processo.objects.filter(pk=processo.pk), 'CONCLUIDO', request.user)  # Ou outro status desejado
 
     messages.success(request, f"O processo {processo.numero} foi desarquivado com sucesso.")
-    return redirect('processos:arquivados')
\ No newline at end of file
+    return redirect('processos:arquivados')
+
+
+def _andamento_com_arquivo(request, **filtro):
+    """Andamento do escritório com anexo, ou 404 (sem revelar se o arquivo existe)."""
+    # Um mesmo conteúdo pode estar em vários andamentos: vale qualquer um do escritório
+    andamento = Andamento.objects.filter(
+        processo__advogado_responsavel=advogado_dono(request),
+        **filtro,
+    ).exclude(arquivo='').exclude(arquivo__isnull=True).first()
+    if andamento is None:
+        raise Http404("Arquivo não encontrado.")
+    return andamento
+
+
+@login_required
+@exige_permissao('download_documento')
+@require_safe
+def arquivo_andamento(request, pk):
+    andamento = _andamento_com_arquivo(request, pk=pk)
+    try:
+        return resposta_arquivo(
+            request,
+            andamento.arquivo,
+            nome_download=andamento.nome_arquivo or None,
+            anexo=request.GET.get('baixar') == '1',
+        )
+    except FileNotFoundError:
+        raise Http404("Arquivo não encontrado.")
+
+
+@login_required
+@exige_permissao('download_documento')
+@require_safe
+def previa_andamento(request, pk, tamanho):
+    """
+    Miniatura ou prévia da primeira página do anexo (ver previas.py). O link
+    leva o começo do hash do conteúdo em `v`; quando confere, a imagem pode
+    ficar no cache do navegador sem revalidação.
+    """
+    andamento = _andamento_com_arquivo(request, pk=pk)
+    conteudo = andamento.conteudo
+    if tamanho not in previas.TAMANHOS or conteudo is None or conteudo.status_previa != 'CONCLUIDA':
+        raise Http404("Prévia não disponível.")
+    versao_confere = request.GET.get('v') == conteudo.sha256[:16]
+    try:
+        return resposta_arquivo(
+            request,
+            previas.arquivo_previa(conteudo, tamanho),
+            nome_download=f'{os.path.splitext(andamento.nome_arquivo or "previa")[0]}-{tamanho}.jpg',
+            max_age=PREVIA_CACHE_SEGUNDOS if versao_confere else None,
+        )
+    except FileNotFoundError:
+        raise Http404("Prévia não encontrada.")
+
+
+@login_required
+@exige_permissao('download_documento')
+@require_safe
+def arquivo_andamento_por_caminho(request, pasta, caminho):
+    """Links diretos para MEDIA_URL/andamentos/... e conteudo/... passam pela mesma checagem de acesso."""
+    andamento = _andamento_com_arquivo(request, arquivo=f'{pasta}/{caminho}')
+    return redirect('processos:arquivo_andamento', pk=andamento.pk)
+
+
+# --- Envio de anexos em partes (retomável) ---
+
+def _resposta_upload(upload, status=200):
+    return JsonResponse({
+        'status': 'ok',
+        'upload': str(upload.pk),
+        'recebido': upload.recebido,
+        'tamanho': upload.tamanho,
+        'concluido': upload.concluido,
+        'tamanho_parte': armazenamento.TAMANHO_MAXIMO_PARTE,
+    }, status=status)
+
+
+@login_required
+@exige_permissao('upload_documento')
+@require_POST
+def iniciar_upload(request):
+    try:
+        dados = json.loads(request.body)
+        upload = armazenamento.iniciar_upload(request.user, dados.get('nome', ''), int(dados.get('tamanho', 0)))
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'status': 'erro', 'mensagem': 'Dados do arquivo inválidos.'}, status=400)
+    except armazenamento.ErroUpload as erro:
+        return JsonResponse({'status': 'erro', 'mensagem': str(erro)}, status=400)
+    return _resposta_upload(upload, status=201)
+
+
+@login_required
+@exige_permissao('upload_documento')
+@require_http_methods(['GET', 'POST'])
+def parte_upload(request, upload_id):
+    """
+    GET informa quantos bytes já chegaram (para retomar); POST grava uma
+    parte, com os bytes no corpo e `Content-Range: bytes inicio-fim/total`.
+    """
+    upload = get_object_or_404(UploadParcial, pk=upload_id, usuario=request.user)
+    if request.method == 'GET':
+        return _resposta_upload(upload)
+
+    intervalo = re.match(r'^bytes (\d+)-(\d+)/(\d+)$', request.headers.get('Content-Range', ''))
+    if not intervalo or int(intervalo.group(3)) != upload.tamanho:
+        return JsonResponse({'status': 'erro', 'mensagem': 'Cabeçalho Content-Range inválido.'}, status=400)
+    inicio, fim = int(intervalo.group(1)), int(intervalo.group(2))
+    try:
+        # O corpo é lido do fluxo em blocos, sem passar por request.body
+        upload = armazenamento.receber_parte(upload.pk, inicio, request, fim - inicio + 1)
+    except armazenamento.ParteForaDeOrdem as erro:
+        return JsonResponse({'status': 'erro', 'mensagem': str(erro), 'recebido': erro.recebido}, status=409)
+    except armazenamento.ErroUpload as erro:
+        return JsonResponse({'status': 'erro', 'mensagem': str(erro)}, status=400)
+    return _resposta_upload(upload)
+
+
+# --- Importação em lote ---
+
+IMPORTACAO_TAMANHO_MAXIMO = 100 * 1024 * 1024
+
+
+@method_decorator(exige_permissao('cadastrar_processo'), name='dispatch')
+class ImportarProcessosView(LoginRequiredMixin, View):
+    """Upload de planilha/exportação (CSV, JSON Lines ou JSON) com a carteira de processos."""
+    template_name = 'processos/importar_processos.html'
+
+    def get(self, request):
+        return render(request, self.template_name)
+
+    def post(self, request):
+        arquivo = request.FILES.get('arquivo')
+        if arquivo is None:
+            messages.error(request, 'Selecione o arquivo com os processos.')
+            return render(request, self.template_name)
+        if arquivo.size > IMPORTACAO_TAMANHO_MAXIMO:
+            messages.error(request, 'Arquivo muito grande (máximo de 100 MB).')
+            return render(request, self.template_name)
+
+        try:
+            # O upload já está em disco (ou na memória, se pequeno) e é lido em fluxo
+            registros = ler_processos(arquivo.file, arquivo.name)
+            resultado = importar_processos(registros, advogado_dono(request))
+        except ErroImportacao as erro:
+            messages.error(request, str(erro))
+            return render(request, self.template_name)
+
+        if resultado.criados:
+            messages.success(
+                request,
+                f'{resultado.criados} processo(s) importado(s) e {resultado.clientes_criados} cliente(s) cadastrado(s).'
+            )
+        return render(request, self.template_name, {'resultado': resultado})
+
+
+# --- Ações em lote ---
+
+# Ação do formulário -> novo status
+ACOES_EM_LOTE = {
+    'arquivar': 'ARQUIVADO',
+    'desarquivar': 'CONCLUIDO',
+    'concluir': 'CONCLUIDO',
+    'reabrir': 'ANDAMENTO',
+}
+
+
+@login_required
+@exige_permissao('atualizar_status_processo')
+@require_POST
+def acao_em_lote(request):
+    """
+    Muda o status dos processos marcados (`ids`) ou, com `todos=1`, de todos
+    os que casam com os filtros da lista de origem, num único UPDATE.
+    """
+    arquivados = request.POST.get('origem') == 'arquivados'
+    destino = 'processos:arquivados' if arquivados else 'processos:lista_processos'
+    novo_status = ACOES_EM_LOTE.get(request.POST.get('acao'))
+    if novo_status is None:
+        messages.error(request, "Selecione uma ação.")
+        return redirect(destino)
+
+    queryset = filtrar_processos(advogado_dono(request), request.POST, arquivados=arquivados)
+    if request.POST.get('todos') != '1':
+        ids = [valor for valor in request.POST.getlist('ids') if valor.isdigit()]
+        queryset = queryset.filter(pk__in=ids)
+    # Só os ids, para o UPDATE não carregar a ordenação por relevância da busca
+    total = alterar_status(Processo.objects.filter(pk__in=queryset.order_by().values('pk')), novo_status, request.user)
+
+    if 'application/json' in request.headers.get('Accept', ''):
+        return JsonResponse({'status': 'ok', 'alterados': total})
+    if total:
+        messages.success(request, f"{total} processo(s) atualizado(s) para {dict(Processo.STATUS_CHOICES)[novo_status]}.")
+    else:
+        messages.info(request, "Nenhum processo foi alterado.")
+    return redirect(destino)
+
@@ -7,6 +7,24 @@ from django.shortcuts import redirect
 # ----------------------------------------------------------------
 # Função 1: exige_permissao (Versão limpa, sem diagnóstico)
 # ----------------------------------------------------------------
+def tem_permissao(user, permissao_necessaria):
+    """
+    Indica se o usuário tem a permissão informada.
+    Advogados têm acesso completo; colaboradores dependem de PermissaoColaborador.
+    """
+    if not user.is_authenticated:
+        return False
+
+    if user.tipo_usuario == 'ADV':
+        return True
+
+    if user.tipo_usuario == 'COLAB':
+        colaborador = getattr(user, 'colaborador_vinculado', None)
+        return bool(colaborador and getattr(colaborador.permissoes, permissao_necessaria, False))
+
+    return False
+
+
 def exige_permissao(permissao_necessaria, redirect_to='core:dashboard'):
     """
     Decorator que verifica permissões de forma mais robusta
@@ -22,18 +40,9 @@ def exige_permissao(permissao_necessaria, redirect_to='core:dashboard'):
                 messages.error(request, 'Sessão inválida')
                 return redirect(redirect_to)
             
-            user = request.user
-            
-            # Advogados têm acesso completo
-            if user.is_authenticated and user.tipo_usuario == 'ADV':
+            if tem_permissao(request.user, permissao_necessaria):
                 return view_func(request, *args, **kwargs)
             
-            # Verificação para colaboradores
-            if user.is_authenticated and user.tipo_usuario == 'COLAB':
-                colaborador = getattr(user, 'colaborador_vinculado', None)
-                if colaborador and getattr(colaborador.permissoes, permissao_necessaria, False):
-                    return view_func(request, *args, **kwargs)
-            
             messages.error(request, f'Acesso negado. Permissão requerida: {permissao_necessaria}')
             return redirect(redirect_to)
         
@@ -43,17 +52,21 @@ def exige_permissao(permissao_necessaria, redirect_to='core:dashboard'):
 # ----------------------------------------------------------------
 # Função 2: advogado_dono (LÓGICA CORRIGIDA E SIMPLIFICADA)
 # ----------------------------------------------------------------
-def advogado_dono(request):
+def advogado_do_usuario(user):
     """
-    Retorna o usuário do advogado principal,
-    seja o usuário logado um advogado ou um colaborador.
+    Retorna o advogado principal de um usuário (ele mesmo ou o
+    advogado do colaborador). Útil fora de um request, ex.: feeds por token.
     """
-    user = request.user
-
-    # Se o usuário logado for um colaborador, retorne o advogado responsável por ele.
     # O related_name 'colaborador_vinculado' no modelo User nos dá acesso ao objeto Colaborador.
     if hasattr(user, 'colaborador_vinculado'):
         return user.colaborador_vinculado.advogado_responsavel
-    
-    # Se não for um colaborador (ou seja, é o próprio advogado), retorne o usuário logado.
+
     return user
+
+
+def advogado_dono(request):
+    """
+    Retorna o usuário do advogado principal,
+    seja o usuário logado um advogado ou um colaborador.
+    """
+    return advogado_do_usuario(request.user)